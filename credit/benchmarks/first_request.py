@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Benchmark the first requests a freshly started worker serves, with and without start-up warm-up.
+
+Each run starts a new Python process that sets Django up (running CoreConfig.ready, so with
+WARMUP_ON_START=True the warm-up in core/warmup.py) and then sends the same GET twice through the
+full middleware stack with Django's test client, on the thread that ran the warm-up as in a sync
+gunicorn worker. Reports the median start-up time and first and second request latency of each
+mode. Needs the configured database; use a path that exists in it.
+
+    python benchmarks/first_request.py --path /api/view-loan-customer/1/ --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child(path, host):
+    started = time.perf_counter()
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit.settings')
+    import django
+    django.setup()
+    startup = time.perf_counter() - started
+
+    from django.test import Client
+
+    client = Client(HTTP_HOST=host)
+    timings = []
+    for _ in range(2):
+        started = time.perf_counter()
+        response = client.get(path)
+        timings.append(time.perf_counter() - started)
+    print(json.dumps({"startup": startup, "first": timings[0], "second": timings[1], "status": response.status_code}))
+
+
+def run(path, host, warm):
+    env = {**os.environ, 'WARMUP_ON_START': str(warm)}
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', '--path', path, '--host', host],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', default='/api/view-loan-customer/1/')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.path, args.host)
+        return
+
+    print(f"GET {args.path}, {args.runs} fresh processes per mode")
+    medians = {}
+    for warm in (False, True):
+        results = [run(args.path, args.host, warm) for _ in range(args.runs)]
+        medians[warm] = {key: statistics.median(result[key] for result in results) for key in ('startup', 'first', 'second')}
+        print(f"{'warm-up' if warm else 'cold':<8} status {results[-1]['status']}   "
+              f"start-up {medians[warm]['startup'] * 1000:8.1f} ms   "
+              f"first request {medians[warm]['first'] * 1000:8.1f} ms   "
+              f"second request {medians[warm]['second'] * 1000:8.1f} ms")
+    print(f"first-request speed-up {medians[False]['first'] / medians[True]['first']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Benchmark current-year credit-score aggregates on a plain vs. a yearly-partitioned loan table.
+
+Builds two scratch tables (bench_loan_plain, bench_loan_partitioned) with the same synthetic rows
+via generate_series, then times the per-customer aggregate `calculate_credit_score` runs, restricted
+to the current year, against both. Requires PostgreSQL; core_loan is not touched.
+
+    python benchmarks/loan_partitioning.py --rows 50000000 --customers 10000000 --queries 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit.settings')
+django.setup()
+
+from django.db import connection
+
+FIRST_YEAR = 2005
+
+CREATE_ROWS = """
+INSERT INTO {table} (id, customer_id, loan_amount, tenure, emis_paid_on_time, approval_date)
+SELECT g,
+       1 + (g * 7919) %% %(customers)s,
+       10000 + (g %% 500) * 1000,
+       12 + (g %% 5) * 12,
+       g %% 60,
+       DATE '{first_year}-01-01' + ((g * 31) %% ((%(this_year)s - {first_year} + 1) * 365))::int
+FROM generate_series(1, %(rows)s) AS g
+"""
+
+SCORE_QUERY = """
+SELECT COUNT(*), SUM(loan_amount), SUM(emis_paid_on_time), SUM(tenure)
+FROM {table}
+WHERE customer_id = %s AND approval_date >= %s AND approval_date < %s
+"""
+
+
+def setup_tables(cursor, rows, customers):
+    this_year = date.today().year
+    columns = "(id bigint, customer_id bigint, loan_amount double precision, tenure int, emis_paid_on_time int, approval_date date)"
+    cursor.execute("DROP TABLE IF EXISTS bench_loan_plain, bench_loan_partitioned CASCADE")
+    cursor.execute(f"CREATE TABLE bench_loan_plain {columns}")
+    cursor.execute(f"CREATE TABLE bench_loan_partitioned {columns} PARTITION BY RANGE (approval_date)")
+    for year in range(FIRST_YEAR, this_year + 2):
+        cursor.execute(
+            f"CREATE TABLE bench_loan_partitioned_p{year} PARTITION OF bench_loan_partitioned "
+            f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+        )
+    params = {"rows": rows, "customers": customers, "this_year": this_year}
+    for table in ("bench_loan_plain", "bench_loan_partitioned"):
+        started = time.perf_counter()
+        cursor.execute(CREATE_ROWS.format(table=table, first_year=FIRST_YEAR), params)
+        cursor.execute(f"CREATE INDEX ON {table} (customer_id)")
+        cursor.execute(f"ANALYZE {table}")
+        print(f"Loaded {table}: {rows:,} rows in {time.perf_counter() - started:.1f}s")
+
+
+def run_queries(cursor, table, customers, queries):
+    this_year = date.today().year
+    bounds = (date(this_year, 1, 1), date(this_year + 1, 1, 1))
+    rng = random.Random(42)
+    timings = []
+    for _ in range(queries):
+        started = time.perf_counter()
+        cursor.execute(SCORE_QUERY.format(table=table), [rng.randint(1, customers), *bounds])
+        cursor.fetchall()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    print(f"{table}: p50 {timings[len(timings) // 2] * 1000:.2f} ms, "
+          f"p99 {timings[int(len(timings) * 0.99)] * 1000:.2f} ms over {queries} queries")
+
+    cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + SCORE_QUERY.format(table=table), [1, *bounds])
+    print("\n".join(row[0] for row in cursor.fetchall()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50_000_000)
+    parser.add_argument('--customers', type=int, default=10_000_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--keep', action='store_true', help="Keep the scratch tables afterwards")
+    args = parser.parse_args()
+
+    if connection.vendor != 'postgresql':
+        sys.exit("This benchmark requires PostgreSQL")
+
+    with connection.cursor() as cursor:
+        setup_tables(cursor, args.rows, args.customers)
+        for table in ("bench_loan_plain", "bench_loan_partitioned"):
+            run_queries(cursor, table, args.customers, args.queries)
+        if not args.keep:
+            cursor.execute("DROP TABLE bench_loan_plain, bench_loan_partitioned CASCADE")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+Benchmark building and rendering a large `view-loan-customer` response.
+
+Compares the previous path (Loan model instances, one `calculate_emi` call per loan, DRF's
+JSONRenderer) with the current one (`values_list` tuples, `loan_list_payload` with the cached
+integer EMI, ORJSONRenderer)
+on synthetic rows, so no database is needed. Reports the median time per response and the peak
+memory allocated while producing it (tracemalloc).
+
+    python benchmarks/loan_rendering.py --loans 10000 --repeat 20
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit.settings')
+django.setup()
+
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Loan
+from core.renderers import ORJSONRenderer, orjson
+from core.utils import calculate_emi
+from core.views import loan_list_payload
+
+
+def synthetic_rows(count):
+    rng = random.Random(42)
+    today = date.today()
+    return [
+        (
+            loan_id,
+            rng.randrange(10_000, 5_000_000, 1000) * 100,
+            rng.choice((0, 850, 1000, 1200, 1450, 1800)),
+            rng.choice((6, 12, 24, 36, 60, 120)),
+            today + timedelta(days=rng.randrange(-365, 3650)),
+        )
+        for loan_id in range(1, count + 1)
+    ]
+
+
+def model_path(rows):
+    loans = [
+        Loan(id=loan_id, loan_amount_paise=amount, interest_rate_bp=rate, tenure=tenure, end_date=end_date)
+        for loan_id, amount, rate, tenure, end_date in rows
+    ]
+    loans_data = []
+    for loan in loans:
+        today = datetime.today()
+        repayments_left = max(0, (loan.end_date.year - today.year) * 12 + (loan.end_date.month - today.month))
+        loans_data.append({
+            "loan_id": loan.pk,
+            "loan_amount": loan.loan_amount,
+            "interest_rate": loan.interest_rate,
+            "monthly_installment": calculate_emi(loan.loan_amount, loan.interest_rate, loan.tenure),
+            "repayments_left": repayments_left
+        })
+    return JSONRenderer().render(loans_data)
+
+
+def tuple_path(rows):
+    return ORJSONRenderer().render(loan_list_payload(rows, datetime.today()))
+
+
+def measure(name, func, rows, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = func(rows)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    func(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<30} median {statistics.median(timings) * 1000:8.2f} ms   "
+          f"peak alloc {peak / 2**20:7.2f} MiB   body {len(body) / 2**10:7.1f} KiB")
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--loans', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.loans)
+    print(f"{args.loans:,} loans, orjson {'installed' if orjson else 'NOT installed (stdlib json fallback)'}")
+    before = measure("models + JSONRenderer", model_path, rows, args.repeat)
+    after = measure("tuples + ORJSONRenderer", tuple_path, rows, args.repeat)
+    print(f"speed-up {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,44 @@
-#!/usr/bin/env python
-import pandas as pd
-
-def check_excel_files():
-    print("Checking customer_data.xlsx columns:")
-    try:
-        df_customer = pd.read_excel(r'C:\Users\chakr\OneDrive\Desktop\django_pro\credit\media\customer_data.xlsx')
-        print("Customer data columns:", df_customer.columns.tolist())
-        print("Customer data shape:", df_customer.shape)
-        print("First few rows:")
-        print(df_customer.head())
-    except Exception as e:
-        print(f"Error reading customer data: {e}")
-    
-    print("\n" + "="*50 + "\n")
-    
-    print("Checking loan_data.xlsx columns:")
-    try:
-        df_loan = pd.read_excel(r'C:\Users\chakr\OneDrive\Desktop\django_pro\credit\media\loan_data.xlsx')
-        print("Loan data columns:", df_loan.columns.tolist())
-        print("Loan data shape:", df_loan.shape)
-        print("First few rows:")
-        print(df_loan.head())
-    except Exception as e:
-        print(f"Error reading loan data: {e}")
-
-if __name__ == "__main__":
-    check_excel_files()
+#!/usr/bin/env python
+"""
+Print the columns, shape and first rows of the customer and loan Excel files.
+
+Usage: python check_excel.py [customer_data.xlsx] [loan_data.xlsx]
+Paths default to CUSTOMER_DATA_PATH / LOAN_DATA_PATH (as used by the ingestion tasks), then to
+media/customer_data.xlsx and media/loan_data.xlsx next to this script.
+"""
+import os
+import sys
+
+import pandas as pd
+from decouple import config
+
+MEDIA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'media')
+
+
+def check_excel_files(customer_path=None, loan_path=None):
+    customer_path = customer_path or config('CUSTOMER_DATA_PATH', default=os.path.join(MEDIA_DIR, 'customer_data.xlsx'))
+    loan_path = loan_path or config('LOAN_DATA_PATH', default=os.path.join(MEDIA_DIR, 'loan_data.xlsx'))
+    print(f"Checking {customer_path} columns:")
+    try:
+        df_customer = pd.read_excel(customer_path)
+        print("Customer data columns:", df_customer.columns.tolist())
+        print("Customer data shape:", df_customer.shape)
+        print("First few rows:")
+        print(df_customer.head())
+    except Exception as e:
+        print(f"Error reading customer data: {e}")
+    
+    print("\n" + "="*50 + "\n")
+    
+    print(f"Checking {loan_path} columns:")
+    try:
+        df_loan = pd.read_excel(loan_path)
+        print("Loan data columns:", df_loan.columns.tolist())
+        print("Loan data shape:", df_loan.shape)
+        print("First few rows:")
+        print(df_loan.head())
+    except Exception as e:
+        print(f"Error reading loan data: {e}")
+
+if __name__ == "__main__":
+    check_excel_files(*sys.argv[1:3])
@@ -0,0 +1,133 @@
+"""
+Admission control for the scoring endpoints (check-eligibility and create-loan).
+
+Two layers, both kept in the Django cache so they are shared by every worker once CACHE_URL points
+at Redis (per process with the default local-memory cache):
+
+- `TokenBucketThrottle`: each API client gets a bucket of RATE_LIMIT_BURST tokens refilled at
+  RATE_LIMIT_RATE per second; a request without a token gets 429 with `Retry-After`.
+- `limit_concurrency`: once more than SCORING_MAX_IN_FLIGHT scoring requests are running, new ones
+  are shed with 503 and `Retry-After` instead of queueing behind a saturated database.
+
+Every decision bumps a counter (see `admission_counters` and `manage.py admission_report`).
+"""
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
+
+SCOPE = 'scoring'
+OUTCOMES = ('admitted', 'throttled', 'shed')
+# The in-flight counter expires after this many seconds without a new scoring request (every
+# increment renews it), so increments lost to a killed worker cannot shed load forever.
+IN_FLIGHT_TTL = 300
+
+
+def _counter_key(scope, name):
+    return f"admission:{scope}:{name}"
+
+
+def _incr(key, timeout=None):
+    try:
+        value = cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, timeout=timeout):
+            return 1
+        value = cache.incr(key)
+    if timeout is not None:
+        cache.touch(key, timeout)
+    return value
+
+
+def _decr_to_zero(key):
+    """
+    Decrement a counter, adding back anything it went below zero: a request that started before
+    the counter expired must not count the new counter's requests out.
+    """
+    try:
+        value = cache.decr(key)
+    except ValueError:
+        return 0  # Expired and not recreated since.
+    if value < 0:
+        cache.incr(key, -value)
+    return max(value, 0)
+
+
+def record(scope, outcome):
+    _incr(_counter_key(scope, outcome))
+
+
+def admission_counters(scope=SCOPE):
+    counters = {outcome: cache.get(_counter_key(scope, outcome), 0) for outcome in OUTCOMES}
+    counters['in_flight'] = max(0, cache.get(_counter_key(scope, 'in_flight'), 0))
+    return counters
+
+
+def reset_counters(scope=SCOPE):
+    cache.delete_many([_counter_key(scope, outcome) for outcome in OUTCOMES])
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Per-client token bucket; clients are the authenticated user or, failing that, the client IP.
+
+    The bucket is read and written back without a lock, so concurrent requests from one client can
+    occasionally both spend the last token; the limit is approximate by at most the concurrency of
+    that client.
+    """
+    scope = SCOPE
+
+    def allow_request(self, request, view):
+        rate, burst = settings.RATE_LIMIT_RATE, settings.RATE_LIMIT_BURST
+        if rate <= 0:
+            return True
+
+        user = getattr(request, 'user', None)
+        ident = f"user-{user.pk}" if user is not None and user.is_authenticated else self.get_ident(request)
+        key = _counter_key(self.scope, f"bucket:{ident}")
+        now = time.time()
+        tokens, updated = cache.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        if tokens < 1:
+            self.retry_after = (1 - tokens) / rate
+            record(self.scope, 'throttled')
+            return False
+        cache.set(key, (tokens - 1, now), timeout=math.ceil(burst / rate) + 1)
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+
+def limit_concurrency(view_method):
+    """
+    Shed the request with 503 when SCORING_MAX_IN_FLIGHT scoring requests are already running.
+    A limit of 0 disables the check.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        limit = settings.SCORING_MAX_IN_FLIGHT
+        if not limit:
+            return view_method(self, request, *args, **kwargs)
+
+        key = _counter_key(SCOPE, 'in_flight')
+        in_flight = _incr(key, timeout=IN_FLIGHT_TTL)
+        try:
+            if in_flight > limit:
+                record(SCOPE, 'shed')
+                response = Response({
+                    "error": "Too many loan requests in progress, retry shortly"
+                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+                response['Retry-After'] = str(settings.SCORING_RETRY_AFTER)
+                return response
+            record(SCOPE, 'admitted')
+            return view_method(self, request, *args, **kwargs)
+        finally:
+            _decr_to_zero(key)
+
+    return wrapper
@@ -0,0 +1,103 @@
+from collections import defaultdict
+from datetime import date
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Customer, Loan, LoanArchive, LoanHistorySummary
+from .sharding import all_shards
+
+ARCHIVE_BATCH_SIZE = 1000
+ARCHIVED_FIELDS = [
+    'customer_id', 'loan_amount_paise', 'tenure', 'interest_rate_bp', 'monthly_installment_paise',
+    'emis_paid_on_time', 'approval_date', 'end_date',
+]
+
+
+def archivable_loans(today=None, shard=None):
+    """
+    Fully repaid loans (every EMI paid on time) whose end date has passed and that were approved
+    before the current year, so moving them out cannot change the current-year part of the credit
+    score. Loans with EMIs outstanding stay in the hot table, where eligibility counts their
+    installments against the salary limit.
+    """
+    today = today or date.today()
+    return Loan.objects.using(shard).filter(
+        end_date__lt=today, approval_date__lt=date(today.year, 1, 1), emis_paid_on_time__gte=F('tenure')
+    )
+
+
+def archive_batch(batch_size=ARCHIVE_BATCH_SIZE, today=None, shard=None):
+    """
+    Move one batch of closed loans on `shard` to `LoanArchive` in a single transaction, folding
+    their credit-score inputs into `LoanHistorySummary` and bumping their customers' `updated_at`,
+    which conditional loan-list reads use as Last-Modified. Rows locked by another archiver are
+    skipped. Returns the number of loans moved.
+    """
+    with transaction.atomic(using=shard):
+        loans = list(
+            archivable_loans(today, shard).select_for_update(skip_locked=True).order_by('id')[:batch_size]
+        )
+        if not loans:
+            return 0
+        loan_ids = [loan.pk for loan in loans]
+        already_archived = set(LoanArchive.objects.using(shard).filter(id__in=loan_ids).values_list('id', flat=True))
+
+        LoanArchive.objects.using(shard).bulk_create(
+            [LoanArchive(id=loan.pk, **{field: getattr(loan, field) for field in ARCHIVED_FIELDS}) for loan in loans],
+            update_conflicts=True,
+            unique_fields=['id'],
+            update_fields=ARCHIVED_FIELDS[1:],
+        )
+
+        totals = defaultdict(lambda: [0, 0, 0, 0])
+        for loan in loans:
+            if loan.pk in already_archived:
+                continue
+            customer_totals = totals[loan.customer_id]
+            customer_totals[0] += 1
+            customer_totals[1] += loan.loan_amount_paise
+            customer_totals[2] += loan.emis_paid_on_time
+            customer_totals[3] += loan.tenure
+
+        LoanHistorySummary.objects.using(shard).bulk_create(
+            [LoanHistorySummary(customer_id=customer_id) for customer_id in totals],
+            ignore_conflicts=True,
+        )
+        summaries = list(LoanHistorySummary.objects.using(shard).select_for_update().filter(customer_id__in=list(totals)))
+        now = timezone.now()
+        for summary in summaries:
+            loan_count, loan_amount, emis_paid, tenure = totals[summary.customer_id]
+            summary.loan_count += loan_count
+            summary.total_loan_amount_paise += loan_amount
+            summary.total_emis_paid += emis_paid
+            summary.total_tenure += tenure
+            summary.updated_at = now
+        LoanHistorySummary.objects.using(shard).bulk_update(
+            summaries, ['loan_count', 'total_loan_amount_paise', 'total_emis_paid', 'total_tenure', 'updated_at']
+        )
+
+        Loan.objects.using(shard).filter(pk__in=loan_ids).delete()
+        Customer.objects.using(shard).filter(id__in={loan.customer_id for loan in loans}).update(updated_at=now)
+        return len(loans)
+
+
+def archive_closed_loans(batch_size=ARCHIVE_BATCH_SIZE, max_batches=None, today=None, progress=None):
+    """
+    Archive closed loans batch by batch until none are left (or `max_batches` have run), shard by
+    shard. Each batch commits on its own, so locks stay short and progress survives interruption.
+    `progress(shard, batch_number, count, moved)` is called after every batch.
+    """
+    moved = 0
+    for shard in all_shards():
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            count = archive_batch(batch_size, today, shard)
+            if not count:
+                break
+            moved += count
+            batches += 1
+            if progress:
+                progress(shard, batches, count, moved)
+    return moved
@@ -0,0 +1,110 @@
+"""
+Conditional GET for the loan read endpoints.
+
+Each endpoint has a version lookup that reads only the timestamps and counts its response depends
+on, never the loans themselves. The version becomes a strong ETag and a Last-Modified date, and a
+client sending `If-None-Match` / `If-Modified-Since` for an unchanged version gets an empty 304
+without the payload being queried, built or sent.
+"""
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import Customer, Loan, LoanArchive
+from .sharding import loan_shards, shard_for_id
+
+
+@dataclass(frozen=True)
+class ResponseVersion:
+    etag: str
+    last_modified: datetime
+
+
+def make_version(*parts):
+    """
+    Version from the values a response depends on; the newest datetime among them is Last-Modified.
+    """
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    last_modified = max(part for part in parts if isinstance(part, datetime))
+    return ResponseVersion(etag=quote_etag(digest), last_modified=last_modified)
+
+
+def loan_list_version(customer_id, history):
+    """
+    Version of a customer's loan list: the customer's own timestamp, the count and newest
+    `updated_at` of their loans, the same for the archive with `include_history`, and the current
+    month, since `repayments_left` counts down every month. None if the customer does not exist.
+
+    Removing a loan changes the count, and so the ETag, but not the newest loan timestamp, so
+    whatever removes loans must bump the customer's `updated_at` (as `archival.archive_batch` does)
+    for Last-Modified to move forward too.
+    """
+    shard = shard_for_id(customer_id)
+    row = (
+        Customer.objects.using(shard).filter(id=customer_id)
+        .annotate(loan_count=Count('loans'), latest=Max('loans__updated_at'))
+        .values_list('updated_at', 'loan_count', 'latest')
+        .first()
+    )
+    if row is None:
+        return None
+    month_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    parts = [customer_id, *row, month_start]
+    if history:
+        archive = LoanArchive.objects.using(shard).filter(customer_id=customer_id).aggregate(
+            count=Count('id'), latest=Max('archived_at')
+        )
+        parts += [archive['count'], archive['latest']]
+    return make_version(*parts)
+
+
+def loan_detail_version(loan_id, history):
+    """
+    Version of one loan's detail response: the loan's and its customer's timestamps. Archived loans
+    are immutable, so their archive time stands in for `updated_at`. None if the loan does not exist.
+    """
+    for shard in loan_shards(loan_id):
+        row = Loan.objects.using(shard).filter(id=loan_id).values_list('updated_at', 'customer__updated_at').first()
+        archived = False
+        if row is None and history:
+            row = LoanArchive.objects.using(shard).filter(id=loan_id).values_list('archived_at', 'customer__updated_at').first()
+            archived = True
+        if row is not None:
+            break
+    else:
+        return None
+    return make_version(loan_id, history, archived, *row)
+
+
+def conditional(version_func):
+    """
+    Answer GET/HEAD with 304 when the client's validators match `version_func(request, **kwargs)`,
+    and add ETag / Last-Modified to full responses. A None version skips both.
+    Like django.views.decorators.http.condition, but with one lookup per request for both validators.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            version = version_func(request, **kwargs)
+            if version is None:
+                return view_method(self, request, *args, **kwargs)
+
+            last_modified = int(version.last_modified.timestamp())
+            not_modified = get_conditional_response(request, etag=version.etag, last_modified=last_modified)
+            if not_modified is not None:
+                return not_modified
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                response.headers.setdefault('ETag', version.etag)
+                response.headers.setdefault('Last-Modified', http_date(last_modified))
+            return response
+
+        return wrapper
+    return decorator
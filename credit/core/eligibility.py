@@ -0,0 +1,217 @@
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+from rest_framework import status
+
+from .models import Customer, Loan
+from .outbox import record_loan_created
+from .sharding import allocate_ids, shard_atomic, shard_for_id
+from .snapshot import customer_aggregates, database_aggregates
+from .utils import MAX_INTEREST_RATE, MAX_TENURE_MONTHS, MINOR_UNITS, calculate_emi_paise, max_principal_paise, to_minor_units
+
+# (lowest credit score, exclusive; minimum interest rate in basis points), highest band first.
+# Scores at or below the last band's bound are not eligible. Applied by assess_loan.
+RATE_FLOORS_BP = ((50, 0), (30, 1200), (10, 1600))
+
+
+def rate_floor_bp(credit_score):
+    """
+    Minimum interest rate in basis points for a credit score, or None when the score is too low for any loan.
+    """
+    for lower_bound, floor in RATE_FLOORS_BP:
+        if credit_score > lower_bound:
+            return floor
+    return None
+
+
+def parse_loan_terms(data):
+    """
+    (loan_amount_paise, interest_rate_bp, tenure) from request data. Raises ValueError, with the
+    message for a 400 response, when a term is missing or malformed, or outside what
+    `calculate_emi_paise` accepts.
+    """
+    try:
+        loan_amount_paise = to_minor_units(float(data['loan_amount']))
+        interest_rate_bp = to_minor_units(float(data['interest_rate']))
+        tenure = int(data['tenure'])
+    except (KeyError, ValueError, TypeError, ArithmeticError):
+        raise ValueError("Invalid loan_amount, interest_rate, or tenure format")
+    if (loan_amount_paise <= 0 or not 0 <= interest_rate_bp <= MAX_INTEREST_RATE * MINOR_UNITS
+            or not 1 <= tenure <= MAX_TENURE_MONTHS):
+        raise ValueError(
+            f"loan_amount must be at least 0.01, interest_rate between 0 and {MAX_INTEREST_RATE}% "
+            f"and tenure between 1 and {MAX_TENURE_MONTHS} months"
+        )
+    return loan_amount_paise, interest_rate_bp, tenure
+
+
+def check_eligibility(data):
+    """
+    Run the /check-eligibility/ flow on request data and return the response body and HTTP status.
+    Shared by the synchronous view and the `score_eligibility` Celery task.
+    """
+    try:
+        customer_id = data.get('customer_id')
+        loan_amount = data.get('loan_amount')
+        interest_rate = data.get('interest_rate')
+        tenure = data.get('tenure')
+        
+        # Check for missing required fields
+        missing_fields = []
+        if not customer_id:
+            missing_fields.append('customer_id')
+        if not loan_amount:
+            missing_fields.append('loan_amount')
+        if not interest_rate:
+            missing_fields.append('interest_rate')
+        if not tenure:
+            missing_fields.append('tenure')
+        
+        if missing_fields:
+            return {
+                "error": f"Missing required fields: {', '.join(missing_fields)}",
+                "received_data": dict(data) if hasattr(data, 'items') else str(data)
+            }, status.HTTP_400_BAD_REQUEST
+        
+        aggregates = customer_aggregates(int(customer_id))
+        if aggregates is None:
+            raise Customer.DoesNotExist
+    except Customer.DoesNotExist:
+        return {
+            "error": f"Customer with id {customer_id} does not exist"
+        }, status.HTTP_404_NOT_FOUND
+    except ValueError:
+        return {
+            "error": "Invalid customer_id format"
+        }, status.HTTP_400_BAD_REQUEST
+
+    try:
+        loan_amount_paise, interest_rate_bp, tenure = parse_loan_terms(data)
+    except ValueError as e:
+        return {"error": str(e)}, status.HTTP_400_BAD_REQUEST
+    
+    loan_approved, final_interest_rate, new_emi, message = assess_loan(
+        aggregates, loan_amount_paise, interest_rate_bp, tenure
+    )
+    loan_id = None
+
+    # If loan is approved, create the loan record and get loan_id
+    if loan_approved:
+        try:
+            # We need to set approval_date and end_date for the loan
+            approval_date = date.today()
+            end_date = approval_date + relativedelta(months=tenure)
+            
+            shard = shard_for_id(aggregates.customer_id)
+            with shard_atomic(aggregates.customer_id):
+                # The snapshot is only trusted to reject: it can be up to CREDIT_SNAPSHOT_MAX_AGE
+                # seconds old, so approve on the primary's aggregates with the customer row locked.
+                aggregates = locked_aggregates(aggregates.customer_id, shard)
+                loan_approved, final_interest_rate, new_emi, message = assess_loan(
+                    aggregates, loan_amount_paise, interest_rate_bp, tenure
+                )
+                if loan_approved:
+                    [loan_id] = allocate_ids(Loan, shard)
+                    loan = Loan.objects.using(shard).create(
+                        id=loan_id,
+                        customer_id=aggregates.customer_id,
+                        loan_amount_paise=loan_amount_paise,
+                        interest_rate_bp=final_interest_rate,
+                        tenure=tenure,
+                        monthly_installment_paise=new_emi,
+                        emis_paid_on_time=0,  # Start with 0
+                        approval_date=approval_date,
+                        end_date=end_date
+                    )
+                    record_loan_created(loan, shard)
+            loan_id = loan.pk if loan_approved else None
+        except Exception as e:
+            return {
+                "loan_id": None,
+                "customer_id": aggregates.customer_id,
+                "loan_approved": False,
+                "message": f"Error creating loan: {str(e)}",
+                "monthly_installment": new_emi / MINOR_UNITS
+            }, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    return {
+        "loan_id": loan_id,
+        "customer_id": aggregates.customer_id,
+        "loan_approved": loan_approved,
+        "message": message,
+        "monthly_installment": new_emi / MINOR_UNITS
+    }, status.HTTP_200_OK
+
+
+def assess_loan(aggregates, loan_amount_paise, interest_rate_bp, tenure):
+    """
+    Apply the salary check and the score-band rules to one request. Returns (loan_approved,
+    interest_rate_bp, monthly_installment_paise, message); an approved rate is raised to the band's floor.
+    """
+    # Existing EMIs are the installments stored on the customer's loans. All money below is in
+    # paise and rates in basis points, so the salary check is exact at the 50% boundary.
+    new_emi = calculate_emi_paise(loan_amount_paise, interest_rate_bp, tenure)
+
+    # Hard reject if EMIs exceed 50% of salary
+    if 2 * (aggregates.emi_total_paise + new_emi) > aggregates.monthly_salary * MINOR_UNITS:
+        return False, interest_rate_bp, new_emi, "Loan not approved: EMI exceeds 50% of monthly salary"
+
+    credit_score = aggregates.credit_score
+    floor = rate_floor_bp(credit_score)
+    if floor is None:
+        return False, interest_rate_bp, new_emi, f"Loan not approved: Credit score too low ({credit_score})"
+    if interest_rate_bp >= floor:
+        return True, interest_rate_bp, new_emi, "Loan approved"
+    corrected_emi = calculate_emi_paise(loan_amount_paise, floor, tenure)
+    return True, floor, corrected_emi, f"Loan approved with corrected interest rate: {floor // MINOR_UNITS}%"
+
+
+def locked_aggregates(customer_id, shard):
+    """
+    `database_aggregates` for a customer whose row is locked until the surrounding `shard_atomic`
+    block ends. PostgreSQL cannot lock the rows of an aggregate query, so the customer row is locked
+    on its own first. Raises Customer.DoesNotExist.
+    """
+    Customer.objects.using(shard).select_for_update().values_list('id', flat=True).get(id=customer_id)
+    return database_aggregates(customer_id)
+
+
+def max_eligible_quote(aggregates, interest_rate_bp, tenures):
+    """
+    Largest loan the customer would be approved for at each tenure, without scoring a request per
+    amount or writing anything. The rate is the requested one raised to the customer's score-band
+    floor, and the EMI at that rate must fit the headroom left under 50% of the monthly salary.
+    """
+    headroom = aggregates.monthly_salary * MINOR_UNITS // 2 - aggregates.emi_total_paise
+    credit_score = aggregates.credit_score
+    floor = rate_floor_bp(credit_score)
+    body = {
+        "customer_id": aggregates.customer_id,
+        "credit_score": credit_score,
+        "current_emis": aggregates.emi_total_paise / MINOR_UNITS,
+        "emi_headroom": max(headroom, 0) / MINOR_UNITS,
+        "interest_rate": None,
+        "eligible": False,
+        "quotes": [],
+    }
+    if floor is None:
+        body["message"] = f"Not eligible: Credit score too low ({credit_score})"
+        return body
+    if headroom <= 0:
+        body["message"] = "Not eligible: existing EMIs already use 50% of monthly salary"
+        return body
+
+    rate = max(interest_rate_bp, floor)
+    body["interest_rate"] = rate / MINOR_UNITS
+    for tenure in tenures:
+        principal = max_principal_paise(headroom, rate, tenure)
+        body["quotes"].append({
+            "tenure": tenure,
+            "max_loan_amount": principal / MINOR_UNITS,
+            "monthly_installment": calculate_emi_paise(principal, rate, tenure) / MINOR_UNITS if principal else 0.0,
+        })
+    body["eligible"] = any(quote["max_loan_amount"] > 0 for quote in body["quotes"])
+    body["message"] = "Eligible" if body["eligible"] else "Not eligible: no headroom for a loan at this rate"
+    if body["eligible"] and rate != interest_rate_bp:
+        body["message"] += f" at corrected interest rate: {rate // MINOR_UNITS}%"
+    return body
@@ -0,0 +1,286 @@
+"""
+Risk-exposure report over the whole book.
+
+One row per customer: outstanding principal on running loans against `approved_limit`, the EMIs of
+running loans against monthly salary, and the credit score `calculate_credit_score` gives (from
+the same inputs, archived loans included) with its band, A-C for the RATE_FLOORS_BP tiers of
+eligibility and D for scores no loan is approved at.
+
+The customer id range is cut into partitions spread over a process pool. A worker loads its
+partition's customers from every shard, then streams their loans ordered by customer id and folds
+each chunk into per-customer NumPy accumulators, so it holds one partition of customers and one
+chunk of loans at a time. It writes its rows to a part file; the parts are concatenated in id
+order into the report, so the parent never holds more than a copy buffer.
+"""
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+from django.db import connections
+from django.db.models import F, Max, Min
+from django.db.models.functions import Coalesce
+
+from .eligibility import RATE_FLOORS_BP
+from .models import Customer, Loan
+from .sharding import all_shards, scatter_gather
+from .snapshot import load_columns
+from .utils import MINOR_UNITS
+
+REPORT_CHUNK_SIZE = 50000
+PARTITIONS_PER_WORKER = 4
+SCORE_BANDS = ('A', 'B', 'C')
+REPORT_COLUMNS = [
+    'customer_id', 'monthly_salary', 'approved_limit', 'running_loans', 'outstanding_principal',
+    'limit_utilisation', 'monthly_emi', 'emi_to_salary', 'credit_score', 'score_band',
+]
+CUSTOMER_COLUMNS = {
+    'customer_id': np.int64,
+    'monthly_salary': np.int64,
+    'approved_limit': np.int64,
+    'archived_count': np.int64,
+    'archived_amount_paise': np.int64,
+    'archived_emis_paid': np.int64,
+    'archived_tenure': np.int64,
+}
+LOAN_COLUMNS = {
+    'customer_id': np.int64,
+    'loan_amount_paise': np.int64,
+    'interest_rate_bp': np.int64,
+    'monthly_installment_paise': np.int64,
+    'tenure': np.int64,
+    'emis_paid_on_time': np.int64,
+    'approval_date': 'datetime64[D]',
+    'end_date': 'datetime64[D]',
+}
+
+
+def credit_scores(approved_limit, loan_count, total_loan_amount_paise, total_emis_paid, total_tenure, current_year_loans):
+    """
+    `utils.credit_score_from_aggregates` over arrays, adding the terms in the same order so the
+    float results, and hence the rounding, match it exactly.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        emi_score = np.where(total_tenure > 0, total_emis_paid / total_tenure * 100, 0)
+    score = (
+        emi_score
+        + np.minimum(loan_count * 4, 100)
+        + np.minimum(current_year_loans * 10, 20)
+        + np.minimum(total_loan_amount_paise / (100000 * MINOR_UNITS), 20)
+    )
+    score = np.round(score).astype(np.int64)
+    score = np.where(loan_count == 0, 100, score)
+    return np.where(total_loan_amount_paise > approved_limit * MINOR_UNITS, 0, score)
+
+
+def score_bands(scores):
+    conditions = [scores > lower_bound for lower_bound, _ in RATE_FLOORS_BP]
+    return np.select(conditions, SCORE_BANDS, default='D')
+
+
+def outstanding_principal_paise(loan_amount_paise, interest_rate_bp, installment_paise, tenure, months_left):
+    """
+    Balance after the installments due so far, B_k = P(1+r)^k - EMI((1+r)^k - 1)/r with k the
+    months elapsed (`tenure - months_left`), using the stored installment. Clipped to [0, P].
+    """
+    paid = np.clip(tenure - months_left, 0, tenure)
+    rate = interest_rate_bp / (12 * 100 * MINOR_UNITS)
+    growth = (1 + rate) ** paid
+    with np.errstate(divide='ignore', invalid='ignore'):
+        balance = np.where(
+            rate > 0,
+            loan_amount_paise * growth - installment_paise * (growth - 1) / rate,
+            loan_amount_paise - installment_paise * paid,
+        )
+    return np.clip(np.round(balance), 0, loan_amount_paise).astype(np.int64)
+
+
+def id_partitions(partitions):
+    """
+    Split the customer id range of all shards into up to `partitions` half-open [start, stop) spans.
+    """
+    bounds = scatter_gather(lambda shard: Customer.objects.using(shard).aggregate(low=Min('id'), high=Max('id')))
+    lows = [bound['low'] for bound in bounds if bound['low'] is not None]
+    if not lows:
+        return []
+    low, high = min(lows), max(bound['high'] for bound in bounds if bound['high'] is not None)
+    edges = np.unique(np.linspace(low, high + 1, partitions + 1).astype(np.int64))
+    return [(int(start), int(stop)) for start, stop in zip(edges[:-1], edges[1:])]
+
+
+def customer_queryset(start, stop):
+    return Customer.objects.filter(id__gte=start, id__lt=stop).order_by('id').values_list(
+        'id', 'monthly_salary', 'approved_limit',
+        Coalesce(F('loan_history__loan_count'), 0),
+        Coalesce(F('loan_history__total_loan_amount_paise'), 0),
+        Coalesce(F('loan_history__total_emis_paid'), 0),
+        Coalesce(F('loan_history__total_tenure'), 0),
+    )
+
+
+def loan_chunks(queryset, chunk_size):
+    """
+    Yield `queryset` rows as dicts of LOAN_COLUMNS arrays, `chunk_size` rows at a time.
+    """
+    rows = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        yield {name: np.array(values, dtype=dtype) for (name, dtype), values in zip(LOAN_COLUMNS.items(), zip(*chunk))}
+
+
+def partition_metrics(start, stop, today, chunk_size=REPORT_CHUNK_SIZE):
+    """
+    Report rows for customers with ids in [start, stop), sorted by id, and (read, compute) seconds.
+    """
+    read = compute = 0.0
+    started = time.perf_counter()
+    parts = [load_columns(customer_queryset(start, stop).using(shard), chunk_size, CUSTOMER_COLUMNS) for shard in all_shards()]
+    customers = {name: np.concatenate([part[name] for part in parts]) for name in CUSTOMER_COLUMNS}
+    order = np.argsort(customers['customer_id'], kind='stable')
+    customers = {name: column[order] for name, column in customers.items()}
+    ids = customers['customer_id']
+    read += time.perf_counter() - started
+
+    size = len(ids)
+    totals = {name: np.zeros(size, dtype=np.int64) for name in (
+        'loan_count', 'amount', 'emis_paid', 'tenure', 'current_year', 'running', 'outstanding', 'emi'
+    )}
+    this_month = np.datetime64(today, 'M').astype(np.int64)
+    this_year = np.datetime64(today, 'Y')
+
+    def add(name, positions, weights=None):
+        counts = np.bincount(positions, weights=weights, minlength=size)
+        totals[name] += np.round(counts).astype(np.int64)
+
+    for shard in all_shards():
+        queryset = Loan.objects.using(shard).filter(customer_id__gte=start, customer_id__lt=stop).order_by('customer_id')
+        chunks = loan_chunks(queryset.values_list(*LOAN_COLUMNS), chunk_size)
+        while True:
+            started = time.perf_counter()
+            loans = next(chunks, None)
+            read += time.perf_counter() - started
+            if loans is None:
+                break
+            started = time.perf_counter()
+            positions = np.searchsorted(ids, loans['customer_id'])
+            months_left = np.maximum(loans['end_date'].astype('datetime64[M]').astype(np.int64) - this_month, 0)
+            running = months_left > 0
+            outstanding = outstanding_principal_paise(
+                loans['loan_amount_paise'], loans['interest_rate_bp'], loans['monthly_installment_paise'],
+                loans['tenure'], months_left,
+            )
+            add('loan_count', positions)
+            add('amount', positions, loans['loan_amount_paise'])
+            add('emis_paid', positions, loans['emis_paid_on_time'])
+            add('tenure', positions, loans['tenure'])
+            add('current_year', positions[loans['approval_date'].astype('datetime64[Y]') == this_year])
+            add('running', positions[running])
+            add('outstanding', positions[running], outstanding[running])
+            add('emi', positions[running], loans['monthly_installment_paise'][running])
+            compute += time.perf_counter() - started
+
+    started = time.perf_counter()
+    salary = customers['monthly_salary']
+    limit = customers['approved_limit']
+    scores = credit_scores(
+        limit,
+        totals['loan_count'] + customers['archived_count'],
+        totals['amount'] + customers['archived_amount_paise'],
+        totals['emis_paid'] + customers['archived_emis_paid'],
+        totals['tenure'] + customers['archived_tenure'],
+        totals['current_year'],
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        utilisation = np.where(limit > 0, totals['outstanding'] / (limit * MINOR_UNITS), np.nan)
+        emi_to_salary = np.where(salary > 0, totals['emi'] / (salary * MINOR_UNITS), np.nan)
+    rows = pd.DataFrame({
+        'customer_id': ids,
+        'monthly_salary': salary,
+        'approved_limit': limit,
+        'running_loans': totals['running'],
+        'outstanding_principal': totals['outstanding'] / MINOR_UNITS,
+        'limit_utilisation': np.round(utilisation, 4),
+        'monthly_emi': totals['emi'] / MINOR_UNITS,
+        'emi_to_salary': np.round(emi_to_salary, 4),
+        'credit_score': scores,
+        'score_band': score_bands(scores),
+    }, columns=REPORT_COLUMNS)
+    compute += time.perf_counter() - started
+    return rows, read, compute
+
+
+def write_partition(index, start, stop, directory, today, chunk_size=REPORT_CHUNK_SIZE):
+    """
+    Compute one partition into `directory`/part-<index>.csv (no header). Runs in a pool worker.
+    Returns (path, rows, {stage: seconds}).
+    """
+    rows, read, compute = partition_metrics(start, stop, today, chunk_size)
+    started = time.perf_counter()
+    path = os.path.join(directory, f"part-{index:05d}.csv")
+    rows.to_csv(path, header=False, index=False)
+    return path, len(rows), {"read": read, "compute": compute, "write": time.perf_counter() - started}
+
+
+def _init_worker():
+    # Forked workers inherit a configured Django with the parent's connections already closed, so
+    # each opens its own; spawned workers (Windows, macOS) start from scratch and need setting up.
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def build_exposure_report(output, workers=1, partitions=None, chunk_size=REPORT_CHUNK_SIZE, today=None):
+    """
+    Write the report for `today` to `output` (replaced atomically) and return a summary with the
+    customer count and per-stage timings in seconds: `plan` (partitioning the id range), `compute`
+    (wall time of the pool; `read`/`compute`/`write` inside it are summed over workers), `merge`
+    and `total`. With `workers` <= 1 the partitions run in this process.
+    """
+    today = today or date.today()
+    partitions = partitions or max(workers, 1) * PARTITIONS_PER_WORKER
+    timings = {}
+    started = total_started = time.perf_counter()
+    spans = id_partitions(partitions)
+    timings['plan'] = time.perf_counter() - started
+
+    directory = os.path.dirname(os.path.abspath(output))
+    os.makedirs(directory, exist_ok=True)
+    scratch = tempfile.mkdtemp(prefix='exposure-', dir=directory)
+    try:
+        started = time.perf_counter()
+        jobs = [(index, start, stop, scratch, today, chunk_size) for index, (start, stop) in enumerate(spans)]
+        if workers <= 1:
+            results = [write_partition(*job) for job in jobs]
+        else:
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                results = list(pool.map(write_partition, *zip(*jobs))) if jobs else []
+        timings['compute'] = time.perf_counter() - started
+        for stage in ('read', 'compute', 'write'):
+            timings[f"worker_{stage}"] = sum(result[2][stage] for result in results)
+
+        started = time.perf_counter()
+        merged = os.path.join(scratch, 'report.csv')
+        with open(merged, 'w', newline='') as report_file:
+            report_file.write(','.join(REPORT_COLUMNS) + '\n')
+            for path, _, _ in results:
+                with open(path, newline='') as part_file:
+                    shutil.copyfileobj(part_file, report_file)
+        os.replace(merged, output)
+        timings['merge'] = time.perf_counter() - started
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    timings['total'] = time.perf_counter() - total_started
+    return {
+        "customers": sum(result[1] for result in results),
+        "partitions": len(spans),
+        "timings": timings,
+    }
@@ -0,0 +1,71 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+
+def _request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def idempotency_cutoff():
+    return timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+
+
+def idempotent(view_method):
+    """
+    Replay the stored response for a repeated `Idempotency-Key` header.
+
+    The key row is locked for the whole view call, so concurrent retries with
+    the same key wait for the first request and then get its response instead
+    of scoring again or creating a second loan. Reusing a key with a different
+    body is rejected with 422, and 5xx responses are never stored. Requests
+    without the header are untouched.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+
+        fingerprint = _request_fingerprint(request)
+        with transaction.atomic():
+            record, created = IdempotencyKey.objects.select_for_update().get_or_create(
+                key=key[:255],
+                path=request.path[:255],
+                defaults={"request_hash": fingerprint},
+            )
+            if not created and record.created_at >= idempotency_cutoff():
+                if record.request_hash != fingerprint:
+                    return Response({
+                        "error": "Idempotency-Key was already used with a different request body"
+                    }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+                if record.status_code is not None:
+                    response = Response(record.response_body, status=record.status_code)
+                    response['Idempotent-Replayed'] = 'true'
+                    return response
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code >= 500:
+                # Leave the key unresolved so the client's retry is computed again.
+                return response
+
+            record.request_hash = fingerprint
+            record.status_code = response.status_code
+            record.response_body = response.data
+            record.created_at = timezone.now()
+            record.save(update_fields=['request_hash', 'status_code', 'response_body', 'created_at'])
+            return response
+
+    return wrapper
@@ -0,0 +1,210 @@
+import hashlib
+import itertools
+import os
+
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Customer, IngestionJob, IngestionState, IngestedRowHash, Loan
+from .sharding import shard_for_id
+from .validation import RejectedRowsReport, known_customer_ids, validate_customers, validate_loans
+
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+ROW_HASH_BATCH_SIZE = 5000
+INGEST_CHUNK_SIZE = 5000
+LOAD_BATCH_SIZE = 1000
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source_file:
+        for chunk in iter(lambda: source_file.read(CHECKSUM_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_unchanged(source, checksum):
+    return IngestionState.objects.filter(source=source, file_checksum=checksum).exists()
+
+
+def mark_file_ingested(source, checksum):
+    IngestionState.objects.update_or_create(source=source, defaults={"file_checksum": checksum})
+
+
+def lock_ingestion_state(source):
+    """
+    The IngestionState row for `source`, created if missing and locked until the surrounding
+    transaction ends, so concurrent runs on one file check and record its checksum one at a time.
+    """
+    state, _ = IngestionState.objects.select_for_update().get_or_create(source=source, defaults={"file_checksum": ""})
+    return state
+
+
+def row_hashes(df):
+    """
+    One signed 64-bit content hash per row, computed over all columns in a single vectorized pass.
+    """
+    return pd.util.hash_pandas_object(df, index=False).astype('int64')
+
+
+def changed_rows(source, df, key_column):
+    """
+    Return the rows of `df` whose content hash differs from the one stored for `source`,
+    together with their new hashes. Rows never seen before count as changed.
+    """
+    hashes = row_hashes(df)
+    stored = pd.Series(
+        dict(IngestedRowHash.objects.filter(source=source).values_list('row_key', 'row_hash').iterator(chunk_size=ROW_HASH_BATCH_SIZE)),
+        dtype='Int64',
+    )
+    previous = stored.reindex(df[key_column].to_numpy())
+    mask = previous.ne(hashes.to_numpy()).fillna(True).to_numpy(dtype=bool)
+    return df[mask], hashes[mask]
+
+
+def record_row_hashes(source, df, hashes, key_column):
+    IngestedRowHash.objects.bulk_create(
+        [
+            IngestedRowHash(source=source, row_key=int(key), row_hash=int(row_hash))
+            for key, row_hash in zip(df[key_column], hashes)
+        ],
+        batch_size=ROW_HASH_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['source', 'row_key'],
+        update_fields=['row_hash'],
+    )
+
+
+def bulk_load(model, rows, shard_column):
+    """
+    Insert or update validated rows (model field values including `id`) on the shard of each row's
+    `shard_column`, in one transaction per shard: one lookup of which ids exist, then bulk_create
+    for the new rows and bulk_update for the rest. Not ON CONFLICT, which the partitioned loan
+    table (keyed on id and approval_date) cannot use on id alone. Returns the number of rows.
+    """
+    if rows.empty:
+        return 0
+    now = timezone.now()
+    fields = [column for column in rows.columns if column != 'id'] + ['updated_at']
+    shards = [shard_for_id(value) for value in rows[shard_column]]
+    for shard in dict.fromkeys(shards):
+        objects = [
+            model(updated_at=now, **record)
+            for record in rows[[row_shard == shard for row_shard in shards]].to_dict('records')
+        ]
+        with transaction.atomic(using=shard):
+            existing = set()
+            for start in range(0, len(objects), LOAD_BATCH_SIZE):
+                batch = [obj.pk for obj in objects[start:start + LOAD_BATCH_SIZE]]
+                existing.update(model.objects.using(shard).filter(id__in=batch).values_list('id', flat=True))
+            model.objects.using(shard).bulk_create(
+                [obj for obj in objects if obj.pk not in existing], batch_size=LOAD_BATCH_SIZE
+            )
+            model.objects.using(shard).bulk_update(
+                [obj for obj in objects if obj.pk in existing], fields, batch_size=LOAD_BATCH_SIZE
+            )
+    return len(rows)
+
+
+def load_customer_rows(df):
+    """
+    Validate customer rows and bulk load the valid ones. Returns (loaded rows, rejected rows).
+    """
+    clean, rejected = validate_customers(df)
+    bulk_load(Customer, clean, 'id')
+    return clean, rejected
+
+
+def load_loan_rows(df, customer_ids=None):
+    """
+    Validate loan rows against `customer_ids` (all customers when None) and bulk load the valid
+    ones on their customer's shard. Returns (loaded rows, rejected rows).
+    """
+    clean, rejected = validate_loans(df, known_customer_ids() if customer_ids is None else customer_ids)
+    bulk_load(Loan, clean, 'customer_id')
+    return clean, rejected
+
+
+def rejects_report(name):
+    return RejectedRowsReport(os.path.join(settings.INGEST_REJECTS_DIR, f"{name}.csv"))
+
+
+def is_excel(path):
+    return str(path).lower().endswith(('.xlsx', '.xlsm'))
+
+
+def count_data_rows(path):
+    """
+    Data rows in a CSV (newlines minus the header) or an xlsx sheet (its recorded dimension), read
+    without parsing the file; used for progress and ETA only.
+    """
+    if is_excel(path):
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True)
+        try:
+            return max((workbook.active.max_row or 1) - 1, 0)
+        finally:
+            workbook.close()
+    newlines = 0
+    last = b'\n'
+    with open(path, 'rb') as source_file:
+        for chunk in iter(lambda: source_file.read(CHECKSUM_CHUNK_SIZE), b''):
+            newlines += chunk.count(b'\n')
+            last = chunk[-1:]
+    return max(newlines + (last != b'\n') - 1, 0)
+
+
+def read_chunks(path, chunk_size=INGEST_CHUNK_SIZE):
+    """
+    Yield an xlsx or CSV file as DataFrames of at most `chunk_size` rows, indexed by data row
+    number across the whole file. CSVs are streamed by pandas; xlsx rows are streamed from
+    openpyxl's read-only reader, so neither is loaded whole.
+    """
+    if not is_excel(path):
+        yield from pd.read_csv(path, chunksize=chunk_size)
+        return
+
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(name).strip() for name in next(rows, ())]
+        offset = 0
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                break
+            yield pd.DataFrame(chunk, columns=header, index=range(offset, offset + len(chunk)))
+            offset += len(chunk)
+    finally:
+        workbook.close()
+
+
+def run_ingestion_job(job, chunk_size=INGEST_CHUNK_SIZE):
+    """
+    Load an uploaded file chunk by chunk, updating the job's counters after every chunk so
+    /ingest/<job_id>/ can report throughput and an ETA while it runs. Each chunk commits on its own;
+    rejected rows go to the job's report under INGEST_REJECTS_DIR instead of stopping the run.
+    """
+    job.total_rows = count_data_rows(job.path)
+    job.status = IngestionJob.RUNNING
+    job.started_at = timezone.now()
+    job.save(update_fields=['total_rows', 'status', 'started_at'])
+
+    customer_ids = known_customer_ids() if job.kind == IngestionJob.LOANS else None
+    report = rejects_report(job.pk)
+    for chunk in read_chunks(job.path, chunk_size):
+        if job.kind == IngestionJob.CUSTOMERS:
+            _, rejected = load_customer_rows(chunk)
+        else:
+            _, rejected = load_loan_rows(chunk, customer_ids)
+        report.write(rejected)
+        IngestionJob.objects.filter(pk=job.pk).update(
+            rows_processed=F('rows_processed') + len(chunk),
+            rows_rejected=F('rows_rejected') + len(rejected),
+            rejects_path=report.path if report.rows else '',
+            updated_at=timezone.now(),
+        )
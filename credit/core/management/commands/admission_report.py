@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.admission import admission_counters, reset_counters
+
+
+class Command(BaseCommand):
+    help = "Show admission-control counters for the scoring endpoints, to tune rate and concurrency limits"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Zero the counters after printing them")
+
+    def handle(self, *args, **options):
+        counters = admission_counters()
+        handled = counters['admitted'] + counters['throttled'] + counters['shed']
+        self.stdout.write(
+            f"Limits: {settings.RATE_LIMIT_RATE:g}/s per client (burst {settings.RATE_LIMIT_BURST}), "
+            f"{settings.SCORING_MAX_IN_FLIGHT} in flight"
+        )
+        for outcome in ('admitted', 'throttled', 'shed'):
+            share = counters[outcome] / handled * 100 if handled else 0
+            self.stdout.write(f"{outcome.capitalize()}: {counters[outcome]} ({share:.1f}%)")
+        self.stdout.write(f"In flight now: {counters['in_flight']}")
+        if not settings.CACHE_URL:
+            self.stdout.write("Note: CACHE_URL is not set, so counters are per process and the web workers' counts are not visible here.")
+        if options['reset']:
+            reset_counters()
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.archival import ARCHIVE_BATCH_SIZE, archive_closed_loans
+
+
+class Command(BaseCommand):
+    help = "Move fully repaid, closed loans from the hot loan table to the archive in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help="Stop after this many batches (default: until nothing is left)")
+
+    def handle(self, *args, **options):
+        def progress(shard, batches, count, moved):
+            self.stdout.write(f"{shard or 'default'} batch {batches}: archived {count} loans ({moved} total)")
+
+        started = time.perf_counter()
+        moved = archive_closed_loans(options['batch_size'], options['max_batches'], progress=progress)
+        self.stdout.write(f"Archived {moved} loans in {time.perf_counter() - started:.1f}s")
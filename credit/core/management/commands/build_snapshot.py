@@ -0,0 +1,34 @@
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.snapshot import CustomerSnapshot
+
+
+class Command(BaseCommand):
+    help = "Build the customer scoring snapshot and publish it as a memory-mapped generation for web workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=settings.CREDIT_SNAPSHOT_PATH,
+                            help="Snapshot directory (defaults to CREDIT_SNAPSHOT_PATH)")
+        parser.add_argument('--interval', type=int, default=0,
+                            help="Keep running and publish a refreshed generation every N seconds")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not path:
+            raise CommandError("Set CREDIT_SNAPSHOT_PATH or pass --path")
+
+        snapshot = CustomerSnapshot.build()
+        while True:
+            generation = snapshot.save(path)
+            self.stdout.write(f"Published {generation}: {len(snapshot)} customers, {snapshot.nbytes / 2**20:.1f} MiB")
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+            if snapshot.year != date.today().year:
+                snapshot = CustomerSnapshot.build()
+            else:
+                snapshot.refresh()
@@ -0,0 +1,48 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from core.partitioning import (
+    INTERVALS, convert_loan_table, create_partitions, detach_partitions_before, is_partitioned, period_start,
+)
+
+
+class Command(BaseCommand):
+    help = "Create core_loan partitions ahead of time, and optionally convert the table or detach old partitions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', default=settings.LOAN_PARTITION_INTERVAL, choices=sorted(INTERVALS),
+                            help="Partition width (defaults to LOAN_PARTITION_INTERVAL)")
+        parser.add_argument('--ahead', type=int, default=settings.LOAN_PARTITIONS_AHEAD,
+                            help="Number of future periods to create partitions for")
+        parser.add_argument('--convert', action='store_true',
+                            help="Rebuild core_loan as a partitioned table if it is not one yet")
+        parser.add_argument('--detach-before', type=date.fromisoformat,
+                            help="Detach partitions whose range ends on or before this date (YYYY-MM-DD)")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help="Database alias to run on; run once per shard when sharded")
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        connection = connections[options['database']]
+        if connection.vendor != 'postgresql':
+            raise CommandError("Loan partitioning requires PostgreSQL")
+        if not interval:
+            raise CommandError("Set LOAN_PARTITION_INTERVAL or pass --interval")
+
+        with transaction.atomic(using=options['database']):
+            if not is_partitioned(connection):
+                if not options['convert']:
+                    raise CommandError("core_loan is not partitioned; pass --convert to rebuild it")
+                convert_loan_table(connection, interval, options['ahead'])
+                self.stdout.write("Converted core_loan to a partitioned table")
+
+            last_day = period_start(date.today(), interval) + INTERVALS[interval] * options['ahead']
+            for name in create_partitions(connection, date.today(), last_day, interval):
+                self.stdout.write(f"Created {name}")
+
+            if options['detach_before']:
+                for name in detach_partitions_before(connection, options['detach_before'], interval):
+                    self.stdout.write(f"Detached {name}")
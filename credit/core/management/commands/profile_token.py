@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.profiling import sign_profile_token
+
+
+class Command(BaseCommand):
+    help = "Print a signed X-Profile-Token header value that makes one request write a profile"
+
+    def handle(self, *args, **options):
+        if not settings.PROFILING_ALLOW_HEADER:
+            self.stderr.write("PROFILING_ALLOW_HEADER is off; the server will ignore this token.")
+        self.stdout.write(sign_profile_token())
+        self.stderr.write(f"Valid for {settings.PROFILING_TOKEN_MAX_AGE} seconds, e.g. "
+                          f"curl -H 'X-Profile-Token: <token>' ...; profiles go to {settings.PROFILING_DIR}")
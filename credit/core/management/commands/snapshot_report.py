@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.snapshot import COLUMNS, CustomerSnapshot
+
+
+class Command(BaseCommand):
+    help = "Build the customer scoring snapshot and report its size and memory footprint"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, default=10_000_000,
+                            help="Customer count to project memory usage for")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        snapshot = CustomerSnapshot.build()
+        elapsed = time.perf_counter() - started
+
+        per_customer = sum(dtype().itemsize for dtype in COLUMNS.values())
+        projected = per_customer * options['project']
+        self.stdout.write(f"Customers: {len(snapshot)}")
+        self.stdout.write(f"Build time: {elapsed:.2f}s")
+        self.stdout.write(f"Memory: {snapshot.nbytes / 2**20:.2f} MiB ({per_customer} bytes per customer)")
+        self.stdout.write(f"Projected for {options['project']:,} customers: {projected / 2**20:.1f} MiB")
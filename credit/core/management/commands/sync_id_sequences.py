@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Customer, IdSequence, Loan
+from core.sharding import all_shards, is_sharded, sync_id_sequences
+
+
+class Command(BaseCommand):
+    help = "Move each shard's customer and loan id counters past ids inserted explicitly (e.g. by imports)"
+
+    def handle(self, *args, **options):
+        if not is_sharded():
+            raise CommandError("SHARD_DATABASES is not set; fix_sequences.py resets the single database's sequences")
+        for shard in all_shards():
+            sync_id_sequences([Customer, Loan], shard)
+            for sequence in IdSequence.objects.using(shard).order_by('name'):
+                self.stdout.write(f"{shard}: {sequence.name} next id block {sequence.next_value}")
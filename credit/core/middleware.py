@@ -0,0 +1,105 @@
+import re
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from .profiling import FORMATS, RequestSampler, valid_profile_token, write_profile
+from .routers import has_written, routing_scope
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+PIN_COOKIE = 'pin_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+re_accepts_brotli = re.compile(r'\bbr\b')
+
+
+class ReplicaPinningMiddleware:
+    """
+    Read-your-writes for the primary/replica router.
+
+    Unsafe requests are pinned to the primary for their whole duration. Once a request has written,
+    a short-lived cookie keeps the same client's next requests on the primary for
+    REPLICA_LAG_TOLERANCE seconds, until the replica has caught up.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = request.method not in SAFE_METHODS or PIN_COOKIE in request.COOKIES
+        with routing_scope(pinned):
+            response = self.get_response(request)
+            if has_written() and settings.REPLICA_LAG_TOLERANCE:
+                response.set_cookie(
+                    PIN_COOKIE, '1', max_age=settings.REPLICA_LAG_TOLERANCE, httponly=True, samesite='Lax'
+                )
+        return response
+
+
+class SamplingProfilerMiddleware:
+    """
+    Profile requests with `core.profiling.RequestSampler`.
+
+    With PROFILING_ENABLED every request is sampled and those slower than PROFILING_THRESHOLD_MS
+    are written to PROFILING_DIR. With PROFILING_ALLOW_HEADER a single request can opt in by
+    sending a token from `manage.py profile_token` in the X-Profile-Token header; its profile is
+    always written and named in the X-Profile response header. With neither set the middleware
+    removes itself at startup, so the hot path pays nothing.
+    """
+    TOKEN_HEADER = 'X-Profile-Token'
+
+    def __init__(self, get_response):
+        if not (settings.PROFILING_ENABLED or settings.PROFILING_ALLOW_HEADER):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = settings.PROFILING_THRESHOLD_MS / 1000
+        self.interval = settings.PROFILING_INTERVAL_MS / 1000
+        self.formats = [fmt for fmt in settings.PROFILING_FORMATS if fmt in FORMATS]
+
+    def __call__(self, request):
+        token = request.headers.get(self.TOKEN_HEADER) if settings.PROFILING_ALLOW_HEADER else None
+        requested = token is not None and valid_profile_token(token, settings.PROFILING_TOKEN_MAX_AGE)
+        if not (requested or settings.PROFILING_ENABLED):
+            return self.get_response(request)
+
+        with RequestSampler(self.interval) as sampler:
+            response = self.get_response(request)
+        if requested or sampler.elapsed >= self.threshold:
+            name = write_profile(sampler, request, settings.PROFILING_DIR, self.formats, settings.PROFILING_KEEP)
+            if requested:
+                response['X-Profile'] = name
+        return response
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Brotli or gzip for responses of at least COMPRESSION_MIN_BYTES.
+
+    Brotli (at BROTLI_QUALITY, tuned for on-the-fly compression) is used when the optional `brotli`
+    package is installed and the client accepts `br`; otherwise Django's GZipMiddleware handles
+    the response. Small bodies are sent as they are, since compressing them costs more than it saves.
+    """
+    def process_response(self, request, response):
+        if response.streaming:
+            return super().process_response(request, response)
+        if len(response.content) < settings.COMPRESSION_MIN_BYTES or response.has_header('Content-Encoding'):
+            return response
+        if brotli is None or not re_accepts_brotli.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=settings.BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            # The encoded body differs byte for byte from the identity one, as GZipMiddleware notes.
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
@@ -1,41 +1,41 @@
-# Generated by Django 5.2.4 on 2025-08-04 14:01
-
-import django.db.models.deletion
-from django.db import migrations, models
-
-
-class Migration(migrations.Migration):
-
-    initial = True
-
-    dependencies = [
-    ]
-
-    operations = [
-        migrations.CreateModel(
-            name='Customer',
-            fields=[
-                ('id', models.IntegerField(primary_key=True, serialize=False)),
-                ('first_name', models.CharField(max_length=30)),
-                ('last_name', models.CharField(max_length=30)),
-                ('age', models.PositiveIntegerField()),
-                ('phone_number', models.CharField(max_length=15, unique=True)),
-                ('monthly_salary', models.IntegerField()),
-                ('approved_limit', models.IntegerField()),
-            ],
-        ),
-        migrations.CreateModel(
-            name='Loan',
-            fields=[
-                ('id', models.IntegerField(primary_key=True, serialize=False)),
-                ('loan_amount', models.FloatField()),
-                ('tenure', models.IntegerField()),
-                ('interest_rate', models.FloatField()),
-                ('monthly_installment', models.FloatField()),
-                ('emis_paid_on_time', models.IntegerField()),
-                ('approval_date', models.DateField()),
-                ('end_date', models.DateField()),
-                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loans', to='core.customer')),
-            ],
-        ),
-    ]
+# Generated by Django 5.2.4 on 2025-08-04 14:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Customer',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('first_name', models.CharField(max_length=30)),
+                ('last_name', models.CharField(max_length=30)),
+                ('age', models.PositiveIntegerField()),
+                ('phone_number', models.CharField(max_length=15, unique=True)),
+                ('monthly_salary', models.IntegerField()),
+                ('approved_limit', models.IntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Loan',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('loan_amount', models.FloatField()),
+                ('tenure', models.IntegerField()),
+                ('interest_rate', models.FloatField()),
+                ('monthly_installment', models.FloatField()),
+                ('emis_paid_on_time', models.IntegerField()),
+                ('approval_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loans', to='core.customer')),
+            ],
+        ),
+    ]
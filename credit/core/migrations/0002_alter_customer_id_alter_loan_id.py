@@ -1,23 +1,23 @@
-# Generated by Django 5.2.4 on 2025-08-05 05:50
-
-from django.db import migrations, models
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ('core', '0001_initial'),
-    ]
-
-    operations = [
-        migrations.AlterField(
-            model_name='customer',
-            name='id',
-            field=models.AutoField(primary_key=True, serialize=False),
-        ),
-        migrations.AlterField(
-            model_name='loan',
-            name='id',
-            field=models.AutoField(primary_key=True, serialize=False),
-        ),
-    ]
+# Generated by Django 5.2.4 on 2025-08-05 05:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customer',
+            name='id',
+            field=models.AutoField(primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='loan',
+            name='id',
+            field=models.AutoField(primary_key=True, serialize=False),
+        ),
+    ]
@@ -1,18 +1,18 @@
-# Generated by Django 5.2.4 on 2025-08-05 05:57
-
-from django.db import migrations, models
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ('core', '0003_alter_customer_id'),
-    ]
-
-    operations = [
-        migrations.AlterField(
-            model_name='customer',
-            name='id',
-            field=models.AutoField(primary_key=True, serialize=False),
-        ),
-    ]
+# Generated by Django 5.2.4 on 2025-08-05 05:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_alter_customer_id'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customer',
+            name='id',
+            field=models.AutoField(primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestionState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=50, unique=True)),
+                ('file_checksum', models.CharField(max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='IngestedRowHash',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=50)),
+                ('row_key', models.BigIntegerField()),
+                ('row_hash', models.BigIntegerField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('source', 'row_key'), name='unique_ingested_row_per_source')],
+            },
+        ),
+    ]
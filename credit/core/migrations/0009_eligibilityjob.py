@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:41
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_loan_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EligibilityJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('request_data', models.JSONField()),
+                ('result', models.JSONField(null=True)),
+                ('status_code', models.PositiveSmallIntegerField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.db import migrations
+
+from core.partitioning import INTERVALS, convert_loan_table, is_partitioned, revert_loan_table
+
+
+def partition_loans(apps, schema_editor):
+    interval = settings.LOAN_PARTITION_INTERVAL
+    connection = schema_editor.connection
+    if not interval or connection.vendor != 'postgresql' or is_partitioned(connection):
+        return
+    if interval not in INTERVALS:
+        raise ValueError(f"LOAN_PARTITION_INTERVAL must be one of {sorted(INTERVALS)}, got {interval!r}")
+    convert_loan_table(connection, interval, settings.LOAN_PARTITIONS_AHEAD)
+
+
+def unpartition_loans(apps, schema_editor):
+    if is_partitioned(schema_editor.connection):
+        revert_loan_table(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_eligibilityjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_loans, unpartition_loans),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_partition_loan_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanHistorySummary',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='loan_history', serialize=False, to='core.customer')),
+                ('loan_count', models.IntegerField(default=0)),
+                ('total_loan_amount', models.FloatField(default=0)),
+                ('total_emis_paid', models.IntegerField(default=0)),
+                ('total_tenure', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LoanArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('loan_amount', models.FloatField()),
+                ('tenure', models.IntegerField()),
+                ('interest_rate', models.FloatField()),
+                ('monthly_installment', models.FloatField()),
+                ('emis_paid_on_time', models.IntegerField()),
+                ('approval_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_loans', to='core.customer')),
+            ],
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.4 on 2026-10-19 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_loanarchive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loan',
+            name='loan_amount_paise',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='interest_rate_bp',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='monthly_installment_paise',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='loanarchive',
+            name='loan_amount_paise',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='loanarchive',
+            name='interest_rate_bp',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='loanarchive',
+            name='monthly_installment_paise',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='loanhistorysummary',
+            name='total_loan_amount_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        # The float columns become nullable here, so that unapplying 0014 can re-add them before 0013 refills them.
+        migrations.AlterField(
+            model_name='loan',
+            name='loan_amount',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='loan',
+            name='interest_rate',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='loan',
+            name='monthly_installment',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='loanarchive',
+            name='loan_amount',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='loanarchive',
+            name='interest_rate',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='loanarchive',
+            name='monthly_installment',
+            field=models.FloatField(null=True),
+        ),
+    ]
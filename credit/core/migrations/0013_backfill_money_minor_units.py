@@ -0,0 +1,61 @@
+from django.db import migrations, models, transaction
+from django.db.models import ExpressionWrapper, F, Max, Min
+from django.db.models.functions import Cast, Round
+
+BATCH_SIZE = 50000
+# Model -> (float column, integer column in hundredths)
+MONEY_COLUMNS = {
+    'loan': [
+        ('loan_amount', 'loan_amount_paise'),
+        ('interest_rate', 'interest_rate_bp'),
+        ('monthly_installment', 'monthly_installment_paise'),
+    ],
+    'loanarchive': [
+        ('loan_amount', 'loan_amount_paise'),
+        ('interest_rate', 'interest_rate_bp'),
+        ('monthly_installment', 'monthly_installment_paise'),
+    ],
+    'loanhistorysummary': [
+        ('total_loan_amount', 'total_loan_amount_paise'),
+    ],
+}
+
+
+def batched_update(apps, schema_editor, updates):
+    """
+    Apply `updates(columns)` to every row, one primary-key range of BATCH_SIZE per transaction, so
+    large tables are not rewritten under a single long-running lock.
+    """
+    alias = schema_editor.connection.alias
+    for model_name, columns in MONEY_COLUMNS.items():
+        model = apps.get_model('core', model_name)
+        bounds = model.objects.using(alias).aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            continue
+        for start in range(bounds['low'], bounds['high'] + 1, BATCH_SIZE):
+            with transaction.atomic(using=alias):
+                model.objects.using(alias).filter(pk__gte=start, pk__lt=start + BATCH_SIZE).update(**updates(columns))
+
+
+def to_minor_units(apps, schema_editor):
+    batched_update(apps, schema_editor, lambda columns: {
+        target: Cast(Round(F(source) * 100), models.BigIntegerField()) for source, target in columns
+    })
+
+
+def to_float(apps, schema_editor):
+    batched_update(apps, schema_editor, lambda columns: {
+        source: ExpressionWrapper(F(target) / 100.0, output_field=models.FloatField()) for source, target in columns
+    })
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0012_money_minor_units'),
+    ]
+
+    operations = [
+        migrations.RunPython(to_minor_units, to_float),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.4 on 2026-10-19 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_backfill_money_minor_units'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='loan',
+            name='loan_amount_paise',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='loan',
+            name='interest_rate_bp',
+            field=models.IntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='loan',
+            name='monthly_installment_paise',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='loanarchive',
+            name='loan_amount_paise',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='loanarchive',
+            name='interest_rate_bp',
+            field=models.IntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='loanarchive',
+            name='monthly_installment_paise',
+            field=models.BigIntegerField(),
+        ),
+        migrations.RemoveField(
+            model_name='loan',
+            name='loan_amount',
+        ),
+        migrations.RemoveField(
+            model_name='loan',
+            name='interest_rate',
+        ),
+        migrations.RemoveField(
+            model_name='loan',
+            name='monthly_installment',
+        ),
+        migrations.RemoveField(
+            model_name='loanarchive',
+            name='loan_amount',
+        ),
+        migrations.RemoveField(
+            model_name='loanarchive',
+            name='interest_rate',
+        ),
+        migrations.RemoveField(
+            model_name='loanarchive',
+            name='monthly_installment',
+        ),
+        migrations.RemoveField(
+            model_name='loanhistorysummary',
+            name='total_loan_amount',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-20 00:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_ingestionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestionjob',
+            name='rejects_path',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+    ]
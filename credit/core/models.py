@@ -1,30 +1,221 @@
-from django.db import models
-from pandas import unique
-
-# Create your models here.
-
-class Customer(models.Model):
-    # id = models.AutoField(primary_key=True)
-    first_name = models.CharField(max_length=30)
-    last_name = models.CharField(max_length=30)
-    age = models.PositiveIntegerField()
-    phone_number = models.CharField(max_length=15, unique=True)
-    monthly_salary = models.IntegerField()
-    approved_limit = models.IntegerField()
-
-    def __str__(self):
-        return f"{self.first_name} {self.last_name}"
-    
-class Loan(models.Model):
-    # id = models.AutoField(primary_key=True)
-    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='loans')
-    loan_amount = models.FloatField()
-    tenure = models.IntegerField()
-    interest_rate = models.FloatField()
-    monthly_installment = models.FloatField()
-    emis_paid_on_time = models.IntegerField()
-    approval_date = models.DateField()
-    end_date = models.DateField()
-
-    def __str__(self) -> str:
-        return f"Loan {self.pk} for {self.customer.first_name} {self.customer.last_name}"
\ No newline at end of file
+import uuid
+from django.db import models
+from pandas import unique
+
+from .utils import MINOR_UNITS, to_minor_units
+
+# Create your models here.
+
+def minor_units_property(field_name):
+    """
+    Float view (rupees or percent) of an integer column stored in hundredths (paise or basis points).
+    Assigning a float rounds it onto the column, so `Loan(loan_amount=...)` keeps working.
+    """
+    def getter(self):
+        value = getattr(self, field_name)
+        return None if value is None else value / MINOR_UNITS
+
+    def setter(self, value):
+        setattr(self, field_name, to_minor_units(value))
+
+    return property(getter, setter)
+
+class Customer(models.Model):
+    # id = models.AutoField(primary_key=True)
+    first_name = models.CharField(max_length=30)
+    last_name = models.CharField(max_length=30)
+    age = models.PositiveIntegerField()
+    phone_number = models.CharField(max_length=15, unique=True)
+    monthly_salary = models.IntegerField()
+    approved_limit = models.IntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.first_name} {self.last_name}"
+    
+class Loan(models.Model):
+    """
+    Amounts are stored in paise and the interest rate in basis points, so sums and comparisons are
+    exact integers; `loan_amount`, `interest_rate` and `monthly_installment` give rupees and percent.
+    """
+    # id = models.AutoField(primary_key=True)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='loans')
+    loan_amount_paise = models.BigIntegerField()
+    tenure = models.IntegerField()
+    interest_rate_bp = models.IntegerField()
+    monthly_installment_paise = models.BigIntegerField()
+    emis_paid_on_time = models.IntegerField()
+    approval_date = models.DateField()
+    end_date = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    loan_amount = minor_units_property('loan_amount_paise')
+    interest_rate = minor_units_property('interest_rate_bp')
+    monthly_installment = minor_units_property('monthly_installment_paise')
+
+    def __str__(self) -> str:
+        return f"Loan {self.pk} for {self.customer.first_name} {self.customer.last_name}"
+
+
+class LoanArchive(models.Model):
+    """
+    Closed loans moved out of `Loan` by `core.archival`. Keeps the original loan id.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='archived_loans')
+    loan_amount_paise = models.BigIntegerField()
+    tenure = models.IntegerField()
+    interest_rate_bp = models.IntegerField()
+    monthly_installment_paise = models.BigIntegerField()
+    emis_paid_on_time = models.IntegerField()
+    approval_date = models.DateField()
+    end_date = models.DateField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    loan_amount = minor_units_property('loan_amount_paise')
+    interest_rate = minor_units_property('interest_rate_bp')
+    monthly_installment = minor_units_property('monthly_installment_paise')
+
+    def __str__(self) -> str:
+        return f"Archived loan {self.pk}"
+
+
+class LoanHistorySummary(models.Model):
+    """
+    Per-customer totals over archived loans, so credit scoring does not need to read the archive.
+    """
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True, related_name='loan_history')
+    loan_count = models.IntegerField(default=0)
+    total_loan_amount_paise = models.BigIntegerField(default=0)
+    total_emis_paid = models.IntegerField(default=0)
+    total_tenure = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    total_loan_amount = minor_units_property('total_loan_amount_paise')
+
+    def __str__(self) -> str:
+        return f"Loan history for customer {self.customer_id}"
+
+
+class IdempotencyKey(models.Model):
+    key = models.CharField(max_length=255)
+    path = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response_body = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'path'], name='unique_idempotency_key_per_path'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.path} [{self.key}]"
+
+
+class IngestionState(models.Model):
+    source = models.CharField(max_length=50, unique=True)
+    file_checksum = models.CharField(max_length=64)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.source} ({self.file_checksum[:12]})"
+
+
+class IngestedRowHash(models.Model):
+    source = models.CharField(max_length=50)
+    row_key = models.BigIntegerField()
+    row_hash = models.BigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'row_key'], name='unique_ingested_row_per_source'),
+        ]
+
+
+
+class EligibilityJob(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    request_data = models.JSONField()
+    result = models.JSONField(null=True)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True)
+
+    def __str__(self) -> str:
+        return f"Eligibility job {self.pk} ({self.status})"
+
+
+class IngestionJob(models.Model):
+    """
+    An uploaded customer or loan file being loaded in chunks; see core.ingestion.run_ingestion_job.
+    """
+    CUSTOMERS = 'customers'
+    LOANS = 'loans'
+    KIND_CHOICES = [
+        (CUSTOMERS, 'Customers'),
+        (LOANS, 'Loans'),
+    ]
+    STATUS_CHOICES = EligibilityJob.STATUS_CHOICES
+    PENDING = EligibilityJob.PENDING
+    RUNNING = EligibilityJob.RUNNING
+    DONE = EligibilityJob.DONE
+    FAILED = EligibilityJob.FAILED
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    file_name = models.CharField(max_length=255)
+    path = models.CharField(max_length=500)
+    total_rows = models.PositiveIntegerField(null=True)
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_rejected = models.PositiveIntegerField(default=0)
+    rejects_path = models.CharField(max_length=500, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True)
+
+    def __str__(self) -> str:
+        return f"Ingestion job {self.pk} ({self.kind}, {self.status})"
+
+
+class IdSequence(models.Model):
+    """
+    Per-shard id counter for a sharded model; see core.sharding.allocate_ids.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    next_value = models.BigIntegerField()
+
+    def __str__(self) -> str:
+        return f"{self.name} -> {self.next_value}"
+
+
+class OutboxEvent(models.Model):
+    """
+    An event written in the same transaction as the change it announces and deleted once a sink
+    has accepted it; see core.outbox. Lives on the same shard as that change.
+    """
+    LOAN_CREATED = 'loan.created'
+
+    topic = models.CharField(max_length=50)
+    key = models.CharField(max_length=50)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.topic} {self.key} (#{self.pk})"
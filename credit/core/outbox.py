@@ -0,0 +1,161 @@
+"""
+Transactional outbox for loan events.
+
+The request that creates a loan also inserts an `OutboxEvent` in the same transaction, on the same
+shard, and never talks to downstream systems itself. `drain_outbox` (run by the
+`dispatch_outbox_events` Celery task every OUTBOX_DRAIN_INTERVAL seconds) then moves events to
+the configured sink in batches:
+
+    SELECT ... ORDER BY id LIMIT n FOR UPDATE SKIP LOCKED -> sink.send(batch) -> DELETE
+
+all in one transaction. An event is deleted only after the sink accepted it, so delivery is
+at-least-once: a crash between send and commit sends the batch again.
+
+Each batch transaction first takes the shard's drain lock (`pg_try_advisory_xact_lock` on
+PostgreSQL, a per-process lock elsewhere); an overlapping run that cannot get it stops, so one
+drainer per shard sends batches in id order, each after the previous one committed.
+
+Events for one key (a customer) are written under that customer's row lock, so they commit in id
+order and are delivered in id order. Across keys, ids are assigned when the event is inserted,
+not when its transaction commits, and a transaction that commits late can deliver a lower id after
+higher ones have gone out. Consumers must therefore deduplicate by (shard, id), e.g. with a table
+of processed ids, and order by id only within a key, never skip ids below a highest-id-seen mark.
+
+Sinks are classes with a `send(events)` method taking a list of envelope dicts, named by the
+OUTBOX_SINK setting.
+"""
+import json
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils.module_loading import import_string
+
+from .models import OutboxEvent
+
+OUTBOX_BATCH_SIZE = 1000
+# Advisory lock key held by the shard's drainer on PostgreSQL ('outbox' in ASCII)
+OUTBOX_LOCK_KEY = int.from_bytes(b'outbox', 'big')
+
+_drain_locks = {}
+
+
+def record_event(topic, key, payload, using=None):
+    """
+    Add an event to the outbox on `using`; call it inside the transaction that makes the change.
+    """
+    return OutboxEvent.objects.using(using).create(topic=topic, key=str(key), payload=payload)
+
+
+def loan_created_payload(loan):
+    return {
+        "loan_id": loan.pk,
+        "customer_id": loan.customer_id,
+        "loan_amount": loan.loan_amount,
+        "interest_rate": loan.interest_rate,
+        "tenure": loan.tenure,
+        "monthly_installment": loan.monthly_installment,
+        "approval_date": loan.approval_date.isoformat(),
+        "end_date": loan.end_date.isoformat(),
+    }
+
+
+def record_loan_created(loan, using=None):
+    return record_event(OutboxEvent.LOAN_CREATED, loan.customer_id, loan_created_payload(loan), using)
+
+
+def envelope(event, shard):
+    """
+    The event as delivered. (`shard`, `id`) identifies it for deduplication; ids follow commit
+    order only within a `key`, so they are not a delivery cursor across keys.
+    """
+    return {
+        "id": event.pk,
+        "shard": shard or 'default',
+        "topic": event.topic,
+        "key": event.key,
+        "created_at": event.created_at.isoformat(),
+        "payload": event.payload,
+    }
+
+
+class FileSink:
+    """
+    Append events as JSON lines to OUTBOX_FILE, synced to disk once per batch.
+    """
+    def __init__(self, path=None):
+        self.path = path or settings.OUTBOX_FILE
+
+    def send(self, events):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a') as outbox_file:
+            outbox_file.write(''.join(json.dumps(event) + '\n' for event in events))
+            outbox_file.flush()
+            os.fsync(outbox_file.fileno())
+
+
+class LocalQueueSink:
+    """
+    In-process queue standing in for a message broker in development and tests.
+    """
+    queue = queue.Queue()
+
+    def send(self, events):
+        for event in events:
+            self.queue.put(event)
+
+
+def get_sink():
+    return import_string(settings.OUTBOX_SINK)()
+
+
+@contextmanager
+def drain_transaction(shard):
+    """
+    A transaction on `shard`, yielding whether it holds the shard's drain lock. The lock is
+    released when the transaction ends.
+    """
+    connection = connections[shard or DEFAULT_DB_ALIAS]
+    with transaction.atomic(using=shard):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", [OUTBOX_LOCK_KEY])
+                locked = cursor.fetchone()[0]
+            yield locked
+            return
+        lock = _drain_locks.setdefault(shard, threading.Lock())
+        if not lock.acquire(blocking=False):
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            lock.release()
+
+
+def drain_outbox(sink=None, batch_size=OUTBOX_BATCH_SIZE, max_batches=None, shard=None):
+    """
+    Send outbox events on `shard` to `sink` (OUTBOX_SINK by default) in batches of `batch_size`,
+    oldest first, until none are left, `max_batches` have gone or another run holds the shard's
+    drain lock. Returns the number sent.
+    """
+    sink = sink or get_sink()
+    sent = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with drain_transaction(shard) as locked:
+            if not locked:
+                break
+            events = list(
+                OutboxEvent.objects.using(shard).select_for_update(skip_locked=True).order_by('id')[:batch_size]
+            )
+            if not events:
+                break
+            sink.send([envelope(event, shard) for event in events])
+            OutboxEvent.objects.using(shard).filter(id__in=[event.pk for event in events]).delete()
+        sent += len(events)
+        batches += 1
+    return sent
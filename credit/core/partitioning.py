@@ -0,0 +1,168 @@
+"""
+Optional PostgreSQL declarative range partitioning of `core_loan` by `approval_date`.
+
+Enabled by setting LOAN_PARTITION_INTERVAL to 'year' or 'month' before running migration 0010.
+Partitions are named core_loan_p2024 (yearly) or core_loan_p2024_03 (monthly); a DEFAULT
+partition catches rows outside every range so inserts never fail. Future partitions must exist
+before rows for that period arrive (see `manage.py create_loan_partitions`), otherwise those rows
+land in the default partition and block creating the proper one.
+"""
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+
+LOAN_TABLE = 'core_loan'
+DEFAULT_PARTITION = 'core_loan_default'
+INTERVALS = {
+    'year': relativedelta(years=1),
+    'month': relativedelta(months=1),
+}
+
+
+def period_start(day, interval):
+    return date(day.year, 1, 1) if interval == 'year' else date(day.year, day.month, 1)
+
+
+def partition_name(start, interval):
+    suffix = f"{start.year}" if interval == 'year' else f"{start.year}_{start.month:02d}"
+    return f"{LOAN_TABLE}_p{suffix}"
+
+
+def partition_ranges(first_day, last_day, interval):
+    """
+    (name, start, end) for every period from the one containing `first_day` to the one containing `last_day`.
+    """
+    start = period_start(first_day, interval)
+    while start <= last_day:
+        end = start + INTERVALS[interval]
+        yield partition_name(start, interval), start, end
+        start = end
+
+
+def is_partitioned(connection):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [LOAN_TABLE])
+        return cursor.fetchone() is not None
+
+
+def existing_partitions(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = %s",
+            [LOAN_TABLE],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def create_partitions(connection, first_day, last_day, interval):
+    """
+    Create the missing partitions covering [first_day, last_day]. Returns the names created.
+    """
+    existing = existing_partitions(connection)
+    created = []
+    with connection.cursor() as cursor:
+        for name, start, end in partition_ranges(first_day, last_day, interval):
+            if name in existing:
+                continue
+            cursor.execute(
+                f"CREATE TABLE {name} PARTITION OF {LOAN_TABLE} FOR VALUES FROM (%s) TO (%s)",
+                [start, end],
+            )
+            created.append(name)
+    return created
+
+
+def detach_partitions_before(connection, cutoff, interval):
+    """
+    Detach partitions whose whole range ends on or before `cutoff`. The detached tables keep their
+    rows and can be archived, vacuumed or dropped independently. Returns the names detached.
+    """
+    detached = []
+    with connection.cursor() as cursor:
+        for name in sorted(existing_partitions(connection) - {DEFAULT_PARTITION}):
+            cursor.execute(
+                "SELECT pg_get_expr(relpartbound, oid) FROM pg_class WHERE relname = %s", [name]
+            )
+            bound = cursor.fetchone()[0]
+            upper = date.fromisoformat(bound.split("TO ('")[1][:10])
+            if upper <= cutoff:
+                cursor.execute(f"ALTER TABLE {LOAN_TABLE} DETACH PARTITION {name}")
+                detached.append(name)
+    return detached
+
+
+def convert_loan_table(connection, interval, periods_ahead):
+    """
+    Rebuild `core_loan` as a table partitioned by RANGE (approval_date), copying every row.
+
+    The primary key becomes (id, approval_date), as PostgreSQL requires the partition key in it;
+    ids stay unique through the identity sequence, which keeps its name and current value.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT MIN(approval_date) FROM {LOAN_TABLE}")
+        first_day = cursor.fetchone()[0] or date.today()
+        cursor.execute(f"SELECT pg_get_serial_sequence('{LOAN_TABLE}', 'id')")
+        sequence = cursor.fetchone()[0]
+
+        cursor.execute(f"ALTER TABLE {LOAN_TABLE} RENAME TO {LOAN_TABLE}_unpartitioned")
+        cursor.execute(f"ALTER TABLE {LOAN_TABLE}_unpartitioned RENAME CONSTRAINT {LOAN_TABLE}_pkey TO {LOAN_TABLE}_unpartitioned_pkey")
+        cursor.execute(
+            f"CREATE TABLE {LOAN_TABLE} (LIKE {LOAN_TABLE}_unpartitioned INCLUDING DEFAULTS INCLUDING IDENTITY) "
+            f"PARTITION BY RANGE (approval_date)"
+        )
+        cursor.execute(f"ALTER TABLE {LOAN_TABLE} ADD CONSTRAINT {LOAN_TABLE}_pkey PRIMARY KEY (id, approval_date)")
+        cursor.execute(
+            f"ALTER TABLE {LOAN_TABLE} ADD CONSTRAINT {LOAN_TABLE}_customer_id_fk "
+            f"FOREIGN KEY (customer_id) REFERENCES core_customer (id) DEFERRABLE INITIALLY DEFERRED"
+        )
+        cursor.execute(f"CREATE INDEX {LOAN_TABLE}_customer_id_idx ON {LOAN_TABLE} (customer_id)")
+        cursor.execute(f"CREATE INDEX {LOAN_TABLE}_updated_at_idx ON {LOAN_TABLE} (updated_at)")
+        cursor.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {LOAN_TABLE} DEFAULT")
+
+    last_day = period_start(date.today(), interval) + INTERVALS[interval] * periods_ahead
+    create_partitions(connection, first_day, last_day, interval)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {LOAN_TABLE} SELECT * FROM {LOAN_TABLE}_unpartitioned")
+        cursor.execute(f"DROP TABLE {LOAN_TABLE}_unpartitioned")
+        cursor.execute(f"SELECT pg_get_serial_sequence('{LOAN_TABLE}', 'id')")
+        new_sequence = cursor.fetchone()[0]
+        cursor.execute(f"SELECT setval('{new_sequence}', COALESCE(MAX(id), 0) + 1, false) FROM {LOAN_TABLE}")
+        if sequence and new_sequence != sequence:
+            cursor.execute(f"ALTER SEQUENCE {new_sequence} RENAME TO {sequence.split('.')[-1]}")
+
+
+def revert_loan_table(connection):
+    """
+    Turn a partitioned `core_loan` back into a plain table with the original single-column primary key.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT pg_get_serial_sequence('{LOAN_TABLE}', 'id')")
+        sequence = cursor.fetchone()[0]
+        cursor.execute(f"ALTER TABLE {LOAN_TABLE} RENAME TO {LOAN_TABLE}_partitioned")
+        cursor.execute(f"ALTER TABLE {LOAN_TABLE}_partitioned RENAME CONSTRAINT {LOAN_TABLE}_pkey TO {LOAN_TABLE}_partitioned_pkey")
+        cursor.execute(f"ALTER TABLE {LOAN_TABLE}_partitioned RENAME CONSTRAINT {LOAN_TABLE}_customer_id_fk TO {LOAN_TABLE}_partitioned_customer_id_fk")
+        cursor.execute(f"ALTER INDEX {LOAN_TABLE}_customer_id_idx RENAME TO {LOAN_TABLE}_partitioned_customer_id_idx")
+        cursor.execute(f"ALTER INDEX {LOAN_TABLE}_updated_at_idx RENAME TO {LOAN_TABLE}_partitioned_updated_at_idx")
+        cursor.execute(
+            f"CREATE TABLE {LOAN_TABLE} (LIKE {LOAN_TABLE}_partitioned INCLUDING DEFAULTS INCLUDING IDENTITY)"
+        )
+        cursor.execute(f"ALTER TABLE {LOAN_TABLE} ADD CONSTRAINT {LOAN_TABLE}_pkey PRIMARY KEY (id)")
+        cursor.execute(
+            f"ALTER TABLE {LOAN_TABLE} ADD CONSTRAINT {LOAN_TABLE}_customer_id_fk "
+            f"FOREIGN KEY (customer_id) REFERENCES core_customer (id) DEFERRABLE INITIALLY DEFERRED"
+        )
+        cursor.execute(f"CREATE INDEX {LOAN_TABLE}_customer_id_idx ON {LOAN_TABLE} (customer_id)")
+        cursor.execute(f"CREATE INDEX {LOAN_TABLE}_updated_at_idx ON {LOAN_TABLE} (updated_at)")
+        cursor.execute(f"INSERT INTO {LOAN_TABLE} SELECT * FROM {LOAN_TABLE}_partitioned")
+        cursor.execute(f"DROP TABLE {LOAN_TABLE}_partitioned CASCADE")
+        cursor.execute(f"SELECT pg_get_serial_sequence('{LOAN_TABLE}', 'id')")
+        new_sequence = cursor.fetchone()[0]
+        cursor.execute(f"SELECT setval('{new_sequence}', COALESCE(MAX(id), 0) + 1, false) FROM {LOAN_TABLE}")
+        if sequence and new_sequence != sequence:
+            cursor.execute(f"ALTER SEQUENCE {new_sequence} RENAME TO {sequence.split('.')[-1]}")
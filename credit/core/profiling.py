@@ -0,0 +1,149 @@
+"""
+Low-overhead sampling profiler for individual requests.
+
+A daemon thread snapshots the request thread's stack every PROFILING_INTERVAL_MS via
+`sys._current_frames()`. While a query is running the SQL statement is appended as a leaf frame,
+so time spent in the database shows up under the ORM call that issued it. Samples are written
+as collapsed stacks (`.folded`, for flamegraph.pl / inferno) and/or speedscope JSON.
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+import itertools
+
+from django.core import signing
+from django.db import connections
+
+TOKEN_SALT = 'core.profiling'
+FORMATS = ('collapsed', 'speedscope')
+SQL_PREVIEW = 80
+_sequence = itertools.count(1)
+
+
+def sign_profile_token():
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def valid_profile_token(token, max_age):
+    try:
+        return signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=max_age) == 'profile'
+    except signing.BadSignature:
+        return False
+
+
+class RequestSampler:
+    """
+    Context manager sampling the stack of the thread that created it for the duration of the block.
+    """
+    def __init__(self, interval):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.samples = Counter()
+        self.started = self.elapsed = None
+        self._sql = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-sampler', daemon=True)
+
+    def __enter__(self):
+        self._wrappers = [connection.execute_wrapper(self._track_sql) for connection in connections.all()]
+        for wrapper in self._wrappers:
+            wrapper.__enter__()
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.started
+        self._stop.set()
+        self._thread.join()
+        for wrapper in reversed(self._wrappers):
+            wrapper.__exit__(*exc_info)
+
+    def _track_sql(self, execute, sql, params, many, context):
+        self._sql = ' '.join(sql.split())[:SQL_PREVIEW]
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self._sql = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_qualname, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            stack.reverse()
+            sql = self._sql
+            if sql:
+                stack.append((f"SQL {sql}", '<database>', 0))
+            self.samples[tuple(stack)] += 1
+
+    def collapsed(self):
+        lines = []
+        for stack, count in self.samples.most_common():
+            names = ';'.join(f"{name} ({os.path.basename(filename)}:{line})" for name, filename, line in stack)
+            lines.append(f"{names} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def speedscope(self, name):
+        frames, index = [], {}
+        samples, weights = [], []
+        for stack, count in self.samples.items():
+            sample = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                sample.append(index[frame])
+            samples.append(sample)
+            weights.append(count * self.interval * 1000)
+        return json.dumps({
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": self.elapsed * 1000,
+                "samples": samples,
+                "weights": weights,
+            }],
+        })
+
+
+def write_profile(sampler, request, directory, formats, keep):
+    """
+    Write the sampler's profile for `request` in each of `formats`, then delete all but the newest
+    `keep` profiles in `directory`. Returns the base file name.
+    """
+    os.makedirs(directory, exist_ok=True)
+    elapsed_ms = round(sampler.elapsed * 1000)
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root'
+    base = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{next(_sequence)}-{request.method}-{slug}-{elapsed_ms}ms"
+    title = f"{request.method} {request.path} ({elapsed_ms} ms)"
+    for fmt in formats:
+        if fmt == 'collapsed':
+            path, content = os.path.join(directory, f"{base}.folded"), sampler.collapsed()
+        else:
+            path, content = os.path.join(directory, f"{base}.speedscope.json"), sampler.speedscope(title)
+        with open(path, 'w') as profile_file:
+            profile_file.write(content)
+
+    profiles = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith(('.folded', '.speedscope.json'))),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    per_request = max(len(formats), 1)
+    for stale in profiles[:-keep * per_request]:
+        try:
+            os.remove(stale.path)
+        except FileNotFoundError:
+            pass
+    return base
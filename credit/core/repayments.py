@@ -0,0 +1,191 @@
+"""
+Bulk repayment posting.
+
+Payments are cleaned, classified and aggregated per loan with pandas, then applied to
+`Loan.emis_paid_on_time` with one set-based UPDATE per batch of loans. A loan's monthly EMI
+counts as paid on time when the payments made up to its due day (the approval day of the month,
+clipped to the month's length, plus REPAYMENT_GRACE_DAYS) cover `monthly_installment`; if the
+month's payments only cover it afterwards it is late, otherwise underpaid. Payments are grouped by
+calendar month within one posting, so an installment split across two postings is not combined.
+"""
+import itertools
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from .models import Loan
+from .sharding import scatter_gather
+from .utils import MAX_BIGINT, MINOR_UNITS
+
+REPAYMENT_BATCH_SIZE = 5000
+FILE_CHUNK_SIZE = 500_000
+# Daily file header -> internal column; the API takes the internal names directly.
+FILE_COLUMNS = {'Loan ID': 'loan_id', 'Payment Date': 'payment_date', 'Amount': 'amount'}
+REQUIRED_COLUMNS = ('loan_id', 'payment_date', 'amount')
+
+
+def clean_repayments(df):
+    """
+    Coerce raw rows to (loan_id, payment_date, amount_paise). Returns the clean frame and the
+    index labels of rows rejected for a missing or malformed value or an amount that is not
+    positive or too large to hold in paise.
+    """
+    loan_id = pd.to_numeric(df['loan_id'], errors='coerce')
+    amount = pd.to_numeric(df['amount'], errors='coerce')
+    paid_on = pd.to_datetime(df['payment_date'], errors='coerce')
+    valid = (
+        loan_id.gt(0) & loan_id.lt(MAX_BIGINT) & (loan_id % 1 == 0)
+        & amount.gt(0) & amount.lt(MAX_BIGINT / MINOR_UNITS) & paid_on.notna()
+    )
+    clean = pd.DataFrame({
+        'loan_id': loan_id[valid].astype('int64'),
+        'payment_date': paid_on[valid].dt.normalize(),
+        'amount_paise': (amount[valid] * MINOR_UNITS).round().astype('int64'),
+    })
+    return clean, df.index[~valid]
+
+
+def load_loans(loan_ids):
+    """
+    Terms needed for classification and the shard each loan lives on, indexed by loan id, read in
+    batches of REPAYMENT_BATCH_SIZE ids from every shard in parallel.
+    """
+    def shard_rows(shard):
+        rows = []
+        for start in range(0, len(loan_ids), REPAYMENT_BATCH_SIZE):
+            batch = [int(loan_id) for loan_id in loan_ids[start:start + REPAYMENT_BATCH_SIZE]]
+            rows.extend(
+                row + (shard,) for row in
+                Loan.objects.using(shard).filter(id__in=batch).values_list('id', 'approval_date', 'monthly_installment_paise')
+            )
+        return rows
+
+    rows = list(itertools.chain.from_iterable(scatter_gather(shard_rows)))
+    loans = pd.DataFrame(rows, columns=['loan_id', 'approval_date', 'installment_paise', 'shard'])
+    loans['approval_date'] = pd.to_datetime(loans['approval_date'])
+    return loans.set_index('loan_id')
+
+
+def monthly_totals(payments, loans, grace_days):
+    """
+    Per (loan_id, month): the total paid, the part paid by the due day, and the installment due.
+    Payments for unknown loans are dropped.
+    """
+    merged = payments.join(loans, on='loan_id', how='inner')
+    paid_on = merged['payment_date']
+    due_day = np.minimum(merged['approval_date'].dt.day, paid_on.dt.days_in_month)
+    month_start = paid_on.dt.to_period('M').dt.to_timestamp()
+    due = month_start + pd.to_timedelta(due_day - 1 + grace_days, unit='D')
+    merged = merged.assign(
+        month=month_start,
+        paid_by_due=merged['amount_paise'].where(paid_on <= due, 0),
+    )
+    return merged.groupby(['loan_id', 'month'], sort=False).agg(
+        paid=('amount_paise', 'sum'),
+        paid_by_due=('paid_by_due', 'sum'),
+        installment=('installment_paise', 'first'),
+    )
+
+
+def classify_installments(months):
+    """
+    One row per loan with its number of on-time, late and underpaid monthly installments.
+    """
+    on_time = months['paid_by_due'] >= months['installment']
+    late = ~on_time & (months['paid'] >= months['installment'])
+    return pd.DataFrame({
+        'on_time': on_time.astype('int64'),
+        'late': late.astype('int64'),
+        'underpaid': (~on_time & ~late).astype('int64'),
+    }).groupby(level='loan_id').sum()
+
+
+def apply_on_time_emis(counts, shard=None):
+    """
+    Add each loan's on-time installments to `emis_paid_on_time` (capped at the tenure), one
+    UPDATE per batch on `shard`: `UPDATE ... FROM (VALUES ...)` on PostgreSQL, a CASE expression
+    elsewhere. `updated_at` is bumped so snapshot refreshes pick the loans up. Returns the number
+    of loans updated.
+    """
+    rows = [(int(loan_id), int(on_time)) for loan_id, on_time in counts.items() if on_time]
+    updated = 0
+    now = timezone.now()
+    connection = connections[shard or DEFAULT_DB_ALIAS]
+    for start in range(0, len(rows), REPAYMENT_BATCH_SIZE):
+        batch = rows[start:start + REPAYMENT_BATCH_SIZE]
+        with transaction.atomic(using=shard):
+            if connection.vendor == 'postgresql':
+                values = ', '.join(['(%s, %s)'] * len(batch))
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"UPDATE {Loan._meta.db_table} AS loan "
+                        f"SET emis_paid_on_time = LEAST(loan.emis_paid_on_time + v.on_time, loan.tenure), updated_at = %s "
+                        f"FROM (VALUES {values}) AS v(id, on_time) WHERE loan.id = v.id",
+                        [now, *itertools.chain.from_iterable(batch)],
+                    )
+                    updated += cursor.rowcount
+            else:
+                increments = Case(*(When(id=loan_id, then=Value(on_time)) for loan_id, on_time in batch), default=Value(0))
+                updated += Loan.objects.using(shard).filter(id__in=[loan_id for loan_id, _ in batch]).update(
+                    emis_paid_on_time=Least(F('emis_paid_on_time') + increments, F('tenure')),
+                    updated_at=now,
+                )
+    return updated
+
+
+def post_repayments(frames):
+    """
+    Post an iterable of raw repayment DataFrames (columns loan_id, payment_date, amount), e.g. the
+    chunks of one file, and return a summary. Monthly totals are combined across all frames before
+    classification, so chunk boundaries do not split an installment. With several shards, wrap the
+    call in `all_shards_atomic()` to post all or nothing.
+    """
+    summary = {"rows": 0, "rejected": 0, "unknown_loans": 0, "loans_updated": 0, "on_time": 0, "late": 0, "underpaid": 0}
+    rejected_rows = []
+    unknown_loans = set()
+    parts = []
+    loan_shards = {}
+    for df in frames:
+        payments, rejected = clean_repayments(df)
+        rejected_rows.extend(summary["rows"] + int(position) for position in df.index.get_indexer(rejected))
+        summary["rows"] += len(df)
+        summary["rejected"] += len(rejected)
+
+        loan_ids = payments['loan_id'].unique()
+        loans = load_loans(loan_ids)
+        unknown_loans.update(loan_ids[~np.isin(loan_ids, loans.index)].tolist())
+        loan_shards.update(loans['shard'].items())
+        parts.append(monthly_totals(payments, loans, settings.REPAYMENT_GRACE_DAYS))
+
+    if parts:
+        months = pd.concat(parts).groupby(level=['loan_id', 'month'], sort=False).agg(
+            {'paid': 'sum', 'paid_by_due': 'sum', 'installment': 'first'}
+        )
+        counts = classify_installments(months)
+        for column in ('on_time', 'late', 'underpaid'):
+            summary[column] = int(counts[column].sum())
+        shards = [loan_shards[loan_id] for loan_id in counts.index]
+        for shard in dict.fromkeys(shards):
+            in_shard = [loan_shard == shard for loan_shard in shards]
+            summary["loans_updated"] += apply_on_time_emis(counts['on_time'][in_shard], shard)
+    summary["unknown_loans"] = len(unknown_loans)
+    summary["rejected_rows"] = rejected_rows[:100]
+    return summary
+
+
+def read_repayment_file(path, chunk_size=FILE_CHUNK_SIZE):
+    """
+    Yield a daily repayment file (CSV, or Excel) as DataFrames with the internal column names.
+    CSV files are streamed in chunks of `chunk_size` rows.
+    """
+    if str(path).lower().endswith(('.xlsx', '.xls')):
+        chunks = [pd.read_excel(path, engine='openpyxl', usecols=list(FILE_COLUMNS))]
+    else:
+        chunks = pd.read_csv(path, usecols=list(FILE_COLUMNS), chunksize=chunk_size)
+    for chunk in chunks:
+        yield chunk.rename(columns=FILE_COLUMNS)
@@ -0,0 +1,99 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+PRIMARY = 'default'
+
+_scoped = ContextVar('routing_scope_active', default=False)
+_pinned = ContextVar('pinned_to_primary', default=False)
+_wrote = ContextVar('wrote_to_primary', default=False)
+_replica_lag = {"checked_at": 0.0, "healthy": True}
+
+
+def is_pinned():
+    return _pinned.get()
+
+
+def has_written():
+    return _wrote.get()
+
+
+@contextmanager
+def routing_scope(pinned=False):
+    """
+    Start a fresh routing state (pinned or not, nothing written yet) for one request or job.
+    Writes only pin reads to the primary inside a scope; outside one (a worker thread, a management
+    command) a write would otherwise pin the whole thread for good.
+    """
+    tokens = (_scoped.set(True), _pinned.set(pinned), _wrote.set(False))
+    try:
+        yield
+    finally:
+        _scoped.reset(tokens[0])
+        _pinned.reset(tokens[1])
+        _wrote.reset(tokens[2])
+
+
+def use_primary():
+    """
+    Send every query in the block to the primary, e.g. for background jobs that read rows just written.
+    """
+    return routing_scope(pinned=True)
+
+
+def replica_within_lag():
+    """
+    Whether the replica's replay lag is within REPLICA_LAG_TOLERANCE seconds. Checked at most every
+    REPLICA_LAG_CHECK_INTERVAL seconds (0 disables the check); an unreachable replica counts as lagging.
+    """
+    interval = settings.REPLICA_LAG_CHECK_INTERVAL
+    if not interval:
+        return True
+    now = time.monotonic()
+    if now - _replica_lag["checked_at"] >= interval:
+        _replica_lag["checked_at"] = now
+        try:
+            with connections[settings.READ_REPLICA_ALIAS].cursor() as cursor:
+                cursor.execute(
+                    "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+                )
+                lag = cursor.fetchone()[0]
+            _replica_lag["healthy"] = lag <= settings.REPLICA_LAG_TOLERANCE
+        except DatabaseError:
+            _replica_lag["healthy"] = False
+    return _replica_lag["healthy"]
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads to the READ_REPLICA_ALIAS database and writes to `default`.
+
+    Reads stay on the primary when no replica is configured, inside a transaction on the primary,
+    once the current request (or a recent one from the same client, see ReplicaPinningMiddleware)
+    has written, or while the replica lags more than REPLICA_LAG_TOLERANCE seconds.
+    """
+    def db_for_read(self, model, **hints):
+        replica = settings.READ_REPLICA_ALIAS
+        if (
+            not replica
+            or is_pinned()
+            or connections[PRIMARY].in_atomic_block
+            or not replica_within_lag()
+        ):
+            return PRIMARY
+        return replica
+
+    def db_for_write(self, model, **hints):
+        if _scoped.get():
+            _pinned.set(True)
+            _wrote.set(True)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != settings.READ_REPLICA_ALIAS
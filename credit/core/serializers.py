@@ -1,31 +1,149 @@
-from wsgiref import validate
-from rest_framework import serializers
-from .models import Customer, Loan
-
-class CustomerSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Customer
-        fields = ['first_name', 'last_name', 'age','phone_number', 'monthly_salary']
-
-    def create(self, validated_data):
-        income = validated_data.pop('monthly_salary')
-        approval_limit = round((income *36)/100000) * 100000
-
-        customer = Customer.objects.create(
-            approved_limit = approval_limit,
-            monthly_salary = income,
-            **validated_data
-        )
-
-        return customer
-    def to_representation(self, instance):
-        return {
-            "id":instance.id,
-            "first_name": instance.first_name,
-            "last_name": instance.last_name,
-            "age": instance.age,
-            "phone_number": instance.phone_number,
-            "monthly_salary": instance.monthly_salary,
-            "approved_limit": instance.approved_limit
-        }
-        
+from wsgiref import validate
+import numpy as np
+from rest_framework import serializers
+from .models import Customer, Loan
+from .sharding import allocate_ids, is_sharded, phone_numbers_taken, shard_for_new_customer
+from .utils import MAX_INTEREST_RATE, MAX_TENURE_MONTHS, calculate_approved_limit
+
+class CustomerSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Customer
+        fields = ['first_name', 'last_name', 'age','phone_number', 'monthly_salary']
+
+    def validate_phone_number(self, value):
+        # The model's unique validator only sees the default database.
+        if is_sharded() and phone_numbers_taken([value]):
+            raise serializers.ValidationError("customer with this phone number already exists.")
+        return value
+
+    def create(self, validated_data):
+        income = validated_data.pop('monthly_salary')
+        approval_limit = calculate_approved_limit(income)
+        shard = shard_for_new_customer(validated_data['phone_number'])
+        [customer_id] = allocate_ids(Customer, shard)
+
+        customer = Customer.objects.using(shard).create(
+            id = customer_id,
+            approved_limit = approval_limit,
+            monthly_salary = income,
+            **validated_data
+        )
+
+        return customer
+    def to_representation(self, instance):
+        return {
+            "id":instance.id,
+            "first_name": instance.first_name,
+            "last_name": instance.last_name,
+            "age": instance.age,
+            "phone_number": instance.phone_number,
+            "monthly_salary": instance.monthly_salary,
+            "approved_limit": instance.approved_limit
+        }
+
+
+class BulkCustomerListSerializer(serializers.ListSerializer):
+    """
+    Validates a batch of customers row by row without failing the whole batch.
+
+    Valid rows end up in `validated_data` and their positions in `row_indexes`; invalid rows are
+    reported in `row_errors` keyed by position. Phone numbers are checked for duplicates inside the
+    batch and against the database with a single IN query.
+    """
+    max_batch_size = 10000
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            raise serializers.ValidationError({"non_field_errors": ["Expected a list of customers."]})
+        if len(data) > self.max_batch_size:
+            raise serializers.ValidationError({"non_field_errors": [f"At most {self.max_batch_size} customers per request."]})
+
+        self.row_errors = {}
+        valid = {}
+        for index, item in enumerate(data):
+            try:
+                valid[index] = self.child.run_validation(item)
+            except serializers.ValidationError as exc:
+                self.row_errors[index] = exc.detail
+
+        phones = [row['phone_number'] for row in valid.values()]
+        taken = phone_numbers_taken(phones)
+        seen = set()
+        for index, row in list(valid.items()):
+            phone = row['phone_number']
+            if phone in taken:
+                self.row_errors[index] = {"phone_number": ["customer with this phone number already exists."]}
+            elif phone in seen:
+                self.row_errors[index] = {"phone_number": ["phone number repeated in this batch."]}
+            seen.add(phone)
+            if index in self.row_errors:
+                del valid[index]
+
+        self.row_indexes = list(valid)
+        return list(valid.values())
+
+    def create(self, validated_data):
+        if not validated_data:
+            return []
+        salaries = np.array([row['monthly_salary'] for row in validated_data], dtype=np.int64)
+        limits = calculate_approved_limit(salaries).tolist()
+        customers = [Customer(approved_limit=limit, **row) for row, limit in zip(validated_data, limits)]
+        if not is_sharded():
+            return Customer.objects.bulk_create(customers, batch_size=1000)
+
+        by_shard = {}
+        for customer in customers:
+            by_shard.setdefault(shard_for_new_customer(customer.phone_number), []).append(customer)
+        for shard, shard_customers in by_shard.items():
+            for customer, customer_id in zip(shard_customers, allocate_ids(Customer, shard, len(shard_customers))):
+                customer.id = customer_id
+            Customer.objects.using(shard).bulk_create(shard_customers, batch_size=1000)
+        return customers
+
+
+class BulkCustomerSerializer(CustomerSerializer):
+    class Meta(CustomerSerializer.Meta):
+        list_serializer_class = BulkCustomerListSerializer
+        # Uniqueness is checked once for the whole batch by BulkCustomerListSerializer.
+        extra_kwargs = {'phone_number': {'validators': []}}
+
+    def validate_phone_number(self, value):
+        return value
+
+
+class LoanSimulationSerializer(serializers.Serializer):
+    loan_id = serializers.IntegerField(required=False)
+    loan_amount = serializers.FloatField(required=False, min_value=0.01)
+    interest_rate = serializers.FloatField(required=False, min_value=0, max_value=MAX_INTEREST_RATE)
+    tenure = serializers.IntegerField(required=False, min_value=1, max_value=MAX_TENURE_MONTHS)
+    month = serializers.IntegerField(required=False, default=0, min_value=0)
+    prepayment = serializers.FloatField(required=False, default=0, min_value=0)
+    new_interest_rate = serializers.FloatField(required=False, min_value=0, max_value=MAX_INTEREST_RATE)
+    new_tenure = serializers.IntegerField(required=False, min_value=1, max_value=MAX_TENURE_MONTHS)
+    include_schedule = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, attrs):
+        if 'loan_id' not in attrs and not all(key in attrs for key in ('loan_amount', 'interest_rate', 'tenure')):
+            raise serializers.ValidationError("Provide loan_id, or loan_amount, interest_rate and tenure.")
+        return attrs
+
+
+class MaxEligibleQuerySerializer(serializers.Serializer):
+    """
+    Query string of /customers/<id>/max-eligible/: `interest_rate` and one or more tenures, given as
+    repeated `tenure` parameters and/or comma-separated (`?tenure=12,24&tenure=36`).
+    """
+    max_tenures = 60
+
+    interest_rate = serializers.FloatField(min_value=0, max_value=MAX_INTEREST_RATE)
+    tenure = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=MAX_TENURE_MONTHS),
+        min_length=1,
+        max_length=max_tenures,
+    )
+
+    def to_internal_value(self, data):
+        if hasattr(data, 'getlist'):
+            tenures = [value for param in data.getlist('tenure') for value in param.split(',') if value.strip()]
+            data = {**({'interest_rate': data['interest_rate']} if 'interest_rate' in data else {}), 'tenure': tenures}
+        return super().to_internal_value(data)
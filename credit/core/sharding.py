@@ -0,0 +1,183 @@
+"""
+Horizontal sharding of customers and their loans across database aliases.
+
+SHARDS lists the aliases, `default` first. A customer lives on SHARDS[customer_id % len(SHARDS)]
+together with its loans, archived loans and history summary, so everything one request reads or
+writes is on one database and in one transaction. New ids come from a per-shard `IdSequence` that
+hands out only ids congruent to the shard's position, so an id alone names its shard; ids loaded
+from files keep their value and route the same way. Models that are not sharded (idempotency keys,
+ingestion state, eligibility jobs) stay on `default`.
+
+With a single shard the helpers return None for the alias, so `.using(None)` leaves the choice to
+the primary/replica router exactly as before sharding.
+"""
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Max
+
+from .models import Customer, IdSequence
+
+
+def is_sharded():
+    return len(settings.SHARDS) > 1
+
+
+def all_shards():
+    """
+    Aliases to run a portfolio-wide query on; [None] (router's choice) with a single shard.
+    """
+    return list(settings.SHARDS) if is_sharded() else [None]
+
+
+def shard_for_id(object_id):
+    """
+    Alias holding the customer with this id, or a loan allocated by `allocate_ids`; None unsharded.
+    """
+    if not is_sharded():
+        return None
+    return settings.SHARDS[int(object_id) % len(settings.SHARDS)]
+
+
+def shard_for_new_customer(phone_number):
+    """
+    Shard for a customer being registered. Chosen by phone number, so two concurrent registrations
+    with one number meet on the same shard's unique index.
+    """
+    if not is_sharded():
+        return None
+    return settings.SHARDS[zlib.crc32(str(phone_number).encode()) % len(settings.SHARDS)]
+
+
+def loan_shards(loan_id):
+    """
+    Aliases to look a loan up on, in order: the shard its id points at, then the others, since ids
+    loaded from files need not match their customer's shard.
+    """
+    home = shard_for_id(loan_id)
+    if home is None:
+        return [None]
+    return [home] + [alias for alias in settings.SHARDS if alias != home]
+
+
+def shard_atomic(customer_id):
+    """
+    Transaction on the customer's shard; loan creation never spans databases.
+    """
+    return transaction.atomic(using=shard_for_id(customer_id))
+
+
+@contextmanager
+def all_shards_atomic():
+    """
+    One transaction per shard, committed together when the block exits. A failure inside the block
+    rolls back every shard; only a failure between the commits could leave shards disagreeing.
+    """
+    with ExitStack() as stack:
+        for alias in all_shards():
+            stack.enter_context(transaction.atomic(using=alias))
+        yield
+
+
+def allocate_ids(model, alias, count=1):
+    """
+    Reserve `count` primary keys for `model` on shard `alias`, all congruent to the shard's position
+    modulo the number of shards. With a single shard returns Nones, leaving ids to the database.
+
+    The counter starts above the highest id already on the shard, and replaces the per-table
+    sequences `fix_sequences.py` resets after imports (see `sync_id_sequences`). Inside a transaction
+    the counter stays locked until that transaction ends, so allocate once the rows are sure to be
+    inserted, just before the insert; ids of inserts rolled back on their own are skipped, never reused.
+    """
+    if alias is None:
+        return [None] * count
+    shards = len(settings.SHARDS)
+    position = settings.SHARDS.index(alias)
+    with transaction.atomic(using=alias):
+        sequence, _ = IdSequence.objects.using(alias).select_for_update().get_or_create(
+            name=model._meta.label_lower,
+            defaults={'next_value': lambda: _first_free_value(model, alias)},
+        )
+        first = sequence.next_value
+        sequence.next_value += count
+        sequence.save(update_fields=['next_value'])
+    return [value * shards + position for value in range(first, first + count)]
+
+
+def _first_free_value(model, alias):
+    highest = model._base_manager.using(alias).aggregate(highest=Max('pk'))['highest'] or 0
+    return highest // len(settings.SHARDS) + 1
+
+
+def sync_id_sequences(models, alias):
+    """
+    Move each model's counter on `alias` past ids inserted explicitly, e.g. by ingestion.
+    """
+    for model in models:
+        with transaction.atomic(using=alias):
+            sequence, created = IdSequence.objects.using(alias).select_for_update().get_or_create(
+                name=model._meta.label_lower,
+                defaults={'next_value': lambda: _first_free_value(model, alias)},
+            )
+            if not created:
+                sequence.next_value = max(sequence.next_value, _first_free_value(model, alias))
+                sequence.save(update_fields=['next_value'])
+
+
+def scatter_gather(func, shards=None):
+    """
+    Call `func(alias)` for every shard, in parallel threads when there is more than one, and return
+    the results in shard order. Each thread closes the connections it opened.
+    """
+    shards = all_shards() if shards is None else list(shards)
+    if len(shards) == 1:
+        return [func(shards[0])]
+
+    def run(alias):
+        try:
+            return func(alias)
+        finally:
+            for connection in connections.all(initialized_only=True):
+                connection.close()
+
+    with ThreadPoolExecutor(max_workers=min(len(shards), settings.SHARD_MAX_WORKERS)) as pool:
+        return list(pool.map(run, shards))
+
+
+def phone_numbers_taken(phone_numbers):
+    """
+    The given phone numbers already registered on any shard. Uniqueness is only enforced per
+    database, and customers loaded from files sit on the shard of their id, not of their number.
+    """
+    phone_numbers = list(phone_numbers)
+    taken = scatter_gather(lambda alias: list(
+        Customer.objects.using(alias).filter(phone_number__in=phone_numbers).values_list('phone_number', flat=True)
+    ))
+    return {phone for shard_phones in taken for phone in shard_phones}
+
+
+class ShardRouter:
+    """
+    Keep related-object access (`loan.customer`, `customer.loans`) on the shard the instance was
+    loaded from and refuse relations across shards. Queries name their shard with `.using()`; for
+    everything else this router abstains and PrimaryReplicaRouter decides.
+    """
+    def _instance_shard(self, hints):
+        instance = hints.get('instance')
+        if is_sharded() and instance is not None and instance._state.db in settings.SHARDS:
+            return instance._state.db
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._instance_shard(hints)
+
+    def db_for_write(self, model, **hints):
+        return self._instance_shard(hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if is_sharded() and obj1._state.db in settings.SHARDS and obj2._state.db in settings.SHARDS:
+            return obj1._state.db == obj2._state.db
+        return None
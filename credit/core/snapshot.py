@@ -0,0 +1,314 @@
+import json
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Customer, Loan, LoanHistorySummary
+from .sharding import scatter_gather, shard_for_id
+from .utils import credit_score_from_aggregates
+
+# Column name -> dtype; amounts are in paise. 48 bytes per customer in total, i.e. ~458 MiB for 10M customers.
+COLUMNS = {
+    'customer_id': np.int64,
+    'monthly_salary': np.int32,
+    'approved_limit': np.int32,
+    'loan_count': np.int32,
+    'total_loan_amount_paise': np.int64,
+    'total_emis_paid': np.int32,
+    'total_tenure': np.int32,
+    'current_year_loans': np.int32,
+    'emi_total_paise': np.int64,
+}
+
+BUILD_CHUNK_SIZE = 50000
+CURRENT_LINK = 'current'
+KEEP_GENERATIONS = 2
+# Loans saved shortly before a watermark may commit after it; re-scan this window on every refresh.
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+
+@dataclass(frozen=True)
+class CustomerAggregates:
+    customer_id: int
+    monthly_salary: int
+    approved_limit: int
+    loan_count: int
+    total_loan_amount_paise: int
+    total_emis_paid: int
+    total_tenure: int
+    current_year_loans: int
+    emi_total_paise: int
+
+    @property
+    def credit_score(self):
+        return credit_score_from_aggregates(
+            self.approved_limit,
+            self.loan_count,
+            self.total_loan_amount_paise,
+            self.total_emis_paid,
+            self.total_tenure,
+            self.current_year_loans,
+        )
+
+
+def aggregate_queryset(year):
+    """
+    One row per customer with everything eligibility scoring reads, ordered by customer id.
+    Totals include archived loans through `LoanHistorySummary`.
+    """
+    return Customer.objects.order_by('id').annotate(
+        loan_count=Count('loans') + Coalesce(F('loan_history__loan_count'), 0),
+        total_loan_amount_paise=Coalesce(Sum('loans__loan_amount_paise'), 0) + Coalesce(F('loan_history__total_loan_amount_paise'), 0),
+        total_emis_paid=Coalesce(Sum('loans__emis_paid_on_time'), 0) + Coalesce(F('loan_history__total_emis_paid'), 0),
+        total_tenure=Coalesce(Sum('loans__tenure'), 0) + Coalesce(F('loan_history__total_tenure'), 0),
+        current_year_loans=Count('loans', filter=Q(loans__approval_date__year=year)),
+        emi_total_paise=Coalesce(Sum('loans__monthly_installment_paise'), 0),
+    ).values_list('id', *list(COLUMNS)[1:])
+
+
+def load_columns(queryset, chunk_size=BUILD_CHUNK_SIZE, columns=COLUMNS):
+    """
+    Stream `queryset` rows into typed NumPy `columns` (name -> dtype, in `values_list` order),
+    holding at most one chunk of Python tuples at a time.
+    """
+    rows = queryset.iterator(chunk_size=chunk_size)
+    parts = {name: [] for name in columns}
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        for (name, dtype), values in zip(columns.items(), zip(*chunk)):
+            parts[name].append(np.array(values, dtype=dtype))
+    return {
+        name: np.concatenate(parts[name]) if parts[name] else np.empty(0, dtype=dtype)
+        for name, dtype in columns.items()
+    }
+
+
+def merge_columns(parts):
+    """
+    Concatenate per-shard column sets back into one, sorted by customer id.
+    """
+    merged = {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+    order = np.argsort(merged['customer_id'], kind='stable')
+    return {name: column[order] for name, column in merged.items()}
+
+
+def loan_watermark():
+    latest = []
+    for shard_latest in scatter_gather(lambda shard: [
+        Loan.objects.using(shard).aggregate(latest=Max('updated_at'))['latest'],
+        LoanHistorySummary.objects.using(shard).aggregate(latest=Max('updated_at'))['latest'],
+    ]):
+        latest += shard_latest
+    return max((value for value in latest if value is not None), default=None)
+
+
+def changed_customer_ids(shard, since):
+    changed = Loan.objects.using(shard).all()
+    archived = LoanHistorySummary.objects.using(shard).all()
+    if since is not None:
+        changed = changed.filter(updated_at__gt=since - REFRESH_OVERLAP)
+        archived = archived.filter(updated_at__gt=since - REFRESH_OVERLAP)
+    return list(
+        set(changed.values_list('customer_id', flat=True).distinct()) | set(archived.values_list('customer_id', flat=True))
+    )
+
+
+class CustomerSnapshot:
+    """
+    Read-mostly, column-per-field copy of the per-customer scoring inputs, sorted by customer id.
+
+    Customers are found with a binary search over `customer_id`, so lookups and scoring cost no
+    database queries. `refresh()` re-aggregates only customers whose loans changed since the last
+    build or refresh (by `Loan.updated_at` and, for archived loans, `LoanHistorySummary.updated_at`).
+    Changes to `Customer` rows themselves and otherwise deleted loans are only picked up by a full rebuild.
+
+    A snapshot can be published with `save()` and mapped zero-copy by other processes with `open()`;
+    mapped snapshots are read-only and are replaced by the next published generation, never refreshed.
+    """
+    def __init__(self, columns, watermark, year, refreshed_at=None, generation=None):
+        self.columns = columns
+        self.watermark = watermark
+        self.year = year
+        self.refreshed_at = refreshed_at or time.time()
+        self.generation = generation
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, chunk_size=BUILD_CHUNK_SIZE):
+        year = date.today().year
+        watermark = loan_watermark()
+        parts = scatter_gather(lambda shard: load_columns(aggregate_queryset(year).using(shard), chunk_size))
+        return cls(parts[0] if len(parts) == 1 else merge_columns(parts), watermark, year)
+
+    def __len__(self):
+        return len(self.columns['customer_id'])
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values())
+
+    def is_fresh(self, max_age):
+        return self.year == date.today().year and time.time() - self.refreshed_at <= max_age
+
+    def lookup(self, customer_id):
+        with self._lock:
+            ids = self.columns['customer_id']
+            position = int(np.searchsorted(ids, customer_id))
+            if position == len(ids) or ids[position] != customer_id:
+                return None
+            return CustomerAggregates(*(column[position].item() for column in self.columns.values()))
+
+    def refresh(self):
+        """
+        Re-aggregate customers whose loans changed since the watermark. Returns how many were updated.
+        """
+        watermark = loan_watermark()
+
+        def shard_updates(shard):
+            customer_ids = changed_customer_ids(shard, self.watermark)
+            if not customer_ids:
+                return None
+            return load_columns(aggregate_queryset(self.year).using(shard).filter(id__in=customer_ids))
+
+        parts = [part for part in scatter_gather(shard_updates) if part is not None]
+        updates = merge_columns(parts) if parts else None
+
+        with self._lock:
+            if updates is not None:
+                ids = self.columns['customer_id']
+                positions = np.searchsorted(ids, updates['customer_id'])
+                known = positions < len(ids)
+                known[known] = ids[positions[known]] == updates['customer_id'][known]
+                for name in COLUMNS:
+                    self.columns[name][positions[known]] = updates[name][known]
+                if not known.all():
+                    self.columns = merge_columns([self.columns, {name: updates[name][~known] for name in COLUMNS}])
+            self.watermark = watermark or self.watermark
+            self.refreshed_at = time.time()
+        return len(updates['customer_id']) if updates is not None else 0
+
+    def save(self, directory):
+        """
+        Write this snapshot as a new generation under `directory` and atomically repoint the
+        `current` symlink at it. Readers either still map the previous generation or the complete
+        new one; old generations beyond `KEEP_GENERATIONS` are removed (mapped pages stay valid).
+        """
+        os.makedirs(directory, exist_ok=True)
+        generation = f"gen-{time.time_ns()}-{os.getpid()}"
+        staging = os.path.join(directory, f".{generation}")
+        os.makedirs(staging)
+        with self._lock:
+            for name, column in self.columns.items():
+                np.save(os.path.join(staging, f"{name}.npy"), column)
+            meta = {
+                "watermark": self.watermark.isoformat() if self.watermark else None,
+                "year": self.year,
+                "refreshed_at": self.refreshed_at,
+            }
+        with open(os.path.join(staging, 'meta.json'), 'w') as meta_file:
+            json.dump(meta, meta_file)
+        os.rename(staging, os.path.join(directory, generation))
+
+        link = os.path.join(directory, f".{CURRENT_LINK}-{generation}")
+        os.symlink(generation, link)
+        os.replace(link, os.path.join(directory, CURRENT_LINK))
+
+        generations = sorted(entry for entry in os.listdir(directory) if entry.startswith('gen-'))
+        for stale in generations[:-KEEP_GENERATIONS]:
+            shutil.rmtree(os.path.join(directory, stale), ignore_errors=True)
+        return generation
+
+    @classmethod
+    def open(cls, directory, generation):
+        """
+        Map a saved generation read-only; the columns share the page cache with every other process.
+        """
+        path = os.path.join(directory, generation)
+        with open(os.path.join(path, 'meta.json')) as meta_file:
+            meta = json.load(meta_file)
+        columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in COLUMNS}
+        watermark = datetime.fromisoformat(meta["watermark"]) if meta["watermark"] else None
+        return cls(columns, watermark, meta["year"], meta["refreshed_at"], generation)
+
+
+def current_generation(directory):
+    try:
+        return os.readlink(os.path.join(directory, CURRENT_LINK))
+    except OSError:
+        return None
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot():
+    """
+    Return the snapshot this process should score from, or None to fall back to the database.
+
+    With `CREDIT_SNAPSHOT_PATH` set, the generation published there by `manage.py build_snapshot`
+    is memory-mapped and swapped in as soon as the builder repoints `current`; it is ignored once
+    older than `CREDIT_SNAPSHOT_MAX_AGE` seconds. Otherwise, with `CREDIT_SNAPSHOT_ENABLED` set,
+    the snapshot is built in-process on first use and refreshed incrementally once older than
+    `CREDIT_SNAPSHOT_MAX_AGE` seconds.
+    """
+    global _snapshot
+    if settings.CREDIT_SNAPSHOT_PATH:
+        return _mapped_snapshot(settings.CREDIT_SNAPSHOT_PATH)
+    if not settings.CREDIT_SNAPSHOT_ENABLED:
+        return None
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.year != date.today().year:
+            _snapshot = CustomerSnapshot.build()
+        elif not _snapshot.is_fresh(settings.CREDIT_SNAPSHOT_MAX_AGE):
+            _snapshot.refresh()
+        return _snapshot
+
+
+def _mapped_snapshot(directory):
+    global _snapshot
+    generation = current_generation(directory)
+    if generation is None:
+        return None
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.generation != generation:
+            try:
+                _snapshot = CustomerSnapshot.open(directory, generation)
+            except FileNotFoundError:
+                # The builder pruned this generation between readlink and open; use it next time.
+                return None
+        mapped = _snapshot
+    return mapped if mapped.is_fresh(settings.CREDIT_SNAPSHOT_MAX_AGE) else None
+
+
+def customer_aggregates(customer_id):
+    """
+    Scoring inputs for one customer: from the snapshot when it is enabled and holds the customer,
+    otherwise from a single aggregate query. Returns None if the customer does not exist.
+    """
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        aggregates = snapshot.lookup(customer_id)
+        if aggregates is not None:
+            return aggregates
+    return database_aggregates(customer_id)
+
+
+def database_aggregates(customer_id):
+    """
+    Scoring inputs for one customer from a single aggregate query on its shard, never the snapshot.
+    Returns None if the customer does not exist.
+    """
+    row = aggregate_queryset(date.today().year).using(shard_for_id(customer_id)).filter(id=customer_id).first()
+    return CustomerAggregates(*row) if row is not None else None
@@ -1,42 +1,171 @@
-import pandas as pd
-from celery import shared_task
-from .models import Customer, Loan
-from datetime import datetime
-from decouple import config
-@shared_task
-def ingest_customer_data():
-    df = pd.read_excel(config('CUSTOMER_DATA_PATH'), engine='openpyxl')
-    print("customer started")
-    for _,row in df.iterrows():
-        Customer.objects.update_or_create(
-            phone_number = row['Phone Number'],
-            defaults={
-                "id": row['Customer ID'],
-                "first_name": row['First Name'],
-                "last_name": row['Last Name'],
-                "monthly_salary": row['Monthly Salary'],
-                "approved_limit": row['Approved Limit'],
-                "age": row['Age']
-            }
-        )
-
-@shared_task
-def ingest_loan_data():
-    df = pd.read_excel(config('LOAN_DATA_PATH'), engine='openpyxl')
-    print("loan started")
-    for _,row in df.iterrows():
-        customer = Customer.objects.get(id=row['Customer ID'])
-        Loan.objects.update_or_create(
-            id = row['Loan ID'],
-            defaults={
-                "customer": customer,
-                "loan_amount": row['Loan Amount'],
-                "tenure": row['Tenure'],
-                "interest_rate": row['Interest Rate'],
-                "monthly_installment": row['Monthly payment'],
-                "emis_paid_on_time": row['EMIs paid on Time'],
-                "approval_date": pd.to_datetime(row['Date of Approval']).date(),
-                "end_date": pd.to_datetime(row['End Date']).date(),
-            }
-        )
-
+import pandas as pd
+from celery import shared_task
+from .models import Customer, Loan, IdempotencyKey, EligibilityJob, IngestionJob
+from .eligibility import check_eligibility
+from .idempotency import idempotency_cutoff
+from .ingestion import (
+    file_checksum, file_unchanged, mark_file_ingested, lock_ingestion_state, changed_rows, record_row_hashes,
+    load_customer_rows, load_loan_rows, rejects_report, run_ingestion_job,
+)
+from datetime import date, datetime
+from decouple import config
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from .archival import archive_closed_loans as archive_loans_in_batches
+from .routers import use_primary
+from .repayments import post_repayments, read_repayment_file
+from .partitioning import INTERVALS, create_partitions, is_partitioned, period_start
+from .outbox import drain_outbox
+from .sharding import all_shards, all_shards_atomic, is_sharded, sync_id_sequences
+from django.utils import timezone
+
+
+def report_rejected_rows(name, rejected):
+    if not rejected.empty:
+        report = rejects_report(name)
+        report.write(rejected)
+        print(f"{len(rejected)} rows rejected, see {report.path}")
+
+
+@shared_task
+def ingest_customer_data(path=None):
+    path = path or config('CUSTOMER_DATA_PATH')
+    checksum = file_checksum(path)
+    if file_unchanged('customers', checksum):
+        print("customer file unchanged, skipping")
+        return 0
+    df = pd.read_excel(path, engine='openpyxl')
+    print("customer started")
+    df, hashes = changed_rows('customers', df, 'Customer ID')
+    loaded, rejected = load_customer_rows(df)
+    report_rejected_rows(f"customers-{checksum[:16]}", rejected)
+    if is_sharded():
+        for shard in all_shards():
+            sync_id_sequences([Customer], shard)
+    record_row_hashes('customers', df.loc[loaded.index], hashes.loc[loaded.index], 'Customer ID')
+    mark_file_ingested('customers', checksum)
+    return len(loaded)
+
+@shared_task
+def ingest_loan_data(path=None):
+    path = path or config('LOAN_DATA_PATH')
+    checksum = file_checksum(path)
+    if file_unchanged('loans', checksum):
+        print("loan file unchanged, skipping")
+        return 0
+    df = pd.read_excel(path, engine='openpyxl')
+    print("loan started")
+    df, hashes = changed_rows('loans', df, 'Loan ID')
+    loaded, rejected = load_loan_rows(df)
+    report_rejected_rows(f"loans-{checksum[:16]}", rejected)
+    if is_sharded():
+        for shard in all_shards():
+            sync_id_sequences([Loan], shard)
+    record_row_hashes('loans', df.loc[loaded.index], hashes.loc[loaded.index], 'Loan ID')
+    mark_file_ingested('loans', checksum)
+    return len(loaded)
+
+
+@shared_task
+def process_ingestion_job(job_id):
+    """
+    Load the file behind an IngestionJob created by POST /api/ingest/; progress is on the job row.
+    """
+    with use_primary():
+        job = IngestionJob.objects.get(pk=job_id)
+        try:
+            run_ingestion_job(job, chunk_size=settings.INGEST_CHUNK_SIZE)
+            model = Customer if job.kind == IngestionJob.CUSTOMERS else Loan
+            if is_sharded():
+                for shard in all_shards():
+                    sync_id_sequences([model], shard)
+            job.status = IngestionJob.DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = IngestionJob.FAILED
+            raise
+        finally:
+            job.finished_at = timezone.now()
+            job.save(update_fields=['status', 'error', 'finished_at', 'updated_at'])
+        return job.status
+
+
+@shared_task
+def post_repayment_file(path):
+    """
+    Post a daily repayment file (CSV or Excel with Loan ID, Payment Date and Amount columns).
+    The whole file is applied in one transaction and recorded by checksum, so re-running the task
+    on the same file is a no-op and a failed run leaves nothing half-posted. The checksum is checked
+    and recorded under a lock on the file's IngestionState row, so a second run started while the
+    first is still posting waits for it and then skips the file.
+    """
+    checksum = file_checksum(path)
+    source = f"repayments-{checksum[:32]}"
+    with all_shards_atomic():
+        state = lock_ingestion_state(source)
+        if state.file_checksum == checksum:
+            print("repayment file already posted, skipping")
+            return None
+        summary = post_repayments(read_repayment_file(path))
+        state.file_checksum = checksum
+        state.save(update_fields=['file_checksum', 'updated_at'])
+    return summary
+
+
+@shared_task
+def purge_expired_idempotency_keys():
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=idempotency_cutoff()).delete()
+    return deleted
+
+
+@shared_task
+def score_eligibility(job_id):
+    with use_primary():
+        return _score_eligibility(job_id)
+
+
+def _score_eligibility(job_id):
+    job = EligibilityJob.objects.get(pk=job_id)
+    job.status = EligibilityJob.RUNNING
+    job.save(update_fields=['status'])
+    try:
+        job.result, job.status_code = check_eligibility(job.request_data)
+        job.status = EligibilityJob.DONE
+    except Exception as e:
+        job.result = {"error": str(e)}
+        job.status = EligibilityJob.FAILED
+        raise
+    finally:
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'result', 'status_code', 'finished_at'])
+    return job.status_code
+
+
+@shared_task
+def create_future_loan_partitions():
+    interval = settings.LOAN_PARTITION_INTERVAL
+    if not interval:
+        return []
+    last_day = period_start(date.today(), interval) + INTERVALS[interval] * settings.LOAN_PARTITIONS_AHEAD
+    created = []
+    for shard in all_shards():
+        connection = connections[shard or DEFAULT_DB_ALIAS]
+        if is_partitioned(connection):
+            created += create_partitions(connection, date.today(), last_day, interval)
+    return created
+
+
+@shared_task
+def archive_closed_loans(batch_size=1000, max_batches=None):
+    return archive_loans_in_batches(batch_size=batch_size, max_batches=max_batches)
+
+
+@shared_task
+def dispatch_outbox_events(max_batches=None):
+    """
+    Deliver pending outbox events from every shard to the OUTBOX_SINK; see core.outbox.
+    """
+    return sum(
+        drain_outbox(batch_size=settings.OUTBOX_BATCH_SIZE, max_batches=max_batches, shard=shard)
+        for shard in all_shards()
+    )
@@ -1,103 +1,1521 @@
-from django.test import TestCase
-from rest_framework.test import APIClient
-from rest_framework import status
-from .models import Customer, Loan
-from .utils import calculate_emi
-from datetime import date
-from dateutil.relativedelta import relativedelta
-
-class CreditAPITestCase(TestCase):
-    """
-    TestCase for Credit API endpoints.
-    This test suite covers the following functionalities:
-    - Customer Registration:
-        - `test_register_customer`: Tests the registration endpoint for creating a new customer and verifies the response data.
-    - Loan Eligibility Check:
-        - `test_check_eligibility_approved`: Tests the loan eligibility endpoint to ensure it returns the correct approval status for a valid customer and loan request.
-    - Loan Creation:
-        - `test_create_loan_success`: Tests the loan creation endpoint for a successful loan application, verifying approval and loan ID in the response.
-    - Loan Retrieval:
-        - `test_view_loan_by_id`: Tests retrieval of a specific loan by its ID, ensuring the correct loan details are returned.
-        - `test_view_loans_by_customer`: Tests retrieval of all loans associated with a specific customer, verifying that at least one loan is returned.
-    Setup:
-        - Creates a test customer for use in the test cases.
-    Dependencies:
-        - Assumes existence of Customer and Loan models, and utility function `calculate_emi`.
-        - Uses Django REST Framework's APIClient for API requests.
-    """
-    def setUp(self):
-        self.client = APIClient()
-        self.customer = Customer.objects.create(
-            first_name="Test",
-            last_name="User",
-            age=30,
-            phone_number="1234567890",
-            monthly_salary=60000,
-            approved_limit=300000
-        )
-
-    def test_register_customer(self):
-        payload = {
-            "first_name": "John",
-            "last_name": "Doe",
-            "age": 32,
-            "phone_number": "9876543210",
-            "monthly_salary": 50000,
-            "approved_limit": 250000
-        }
-        response = self.client.post("/api/register/", data=payload)
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        self.assertEqual(response.json()['first_name'], "John")
-
-    def test_check_eligibility_approved(self):
-        data = {
-            "customer_id": self.customer.pk,
-            "loan_amount": 50000,
-            "interest_rate": 15.0,
-            "tenure": 12
-        }
-        response = self.client.post("/api/check-eligibility/", data=data, format='json')
-        self.assertEqual(response.status_code, 200)
-        self.assertIn("loan_approved", response.json())
-
-    def test_create_loan_success(self):
-        payload = {
-            "customer_id": self.customer.pk,
-            "loan_amount": 80000,
-            "interest_rate": 14,
-            "tenure": 12
-        }
-        response = self.client.post("/api/create-loan/", data=payload, format='json')
-        self.assertEqual(response.status_code, 201)
-        self.assertTrue(response.json()["loan_approved"])
-        self.assertIn("loan_id", response.json())
-
-    def test_view_loan_by_id(self):
-        loan = Loan.objects.create(
-            customer=self.customer,
-            loan_amount=70000,
-            interest_rate=14,
-            tenure=12,
-            monthly_installment=calculate_emi(70000, 14, 12),
-            emis_paid_on_time=0,
-            approval_date=date.today(),
-            end_date=date.today() + relativedelta(months=12)
-        )
-        response = self.client.get(f"/api/view-loan/{loan.pk}/")
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json()["loan_id"], loan.pk)
-
-    def test_view_loans_by_customer(self):
-        Loan.objects.create(
-            customer=self.customer,
-            loan_amount=100000,
-            interest_rate=13.5,
-            tenure=24,
-            monthly_installment=calculate_emi(100000, 13.5, 24),
-            emis_paid_on_time=0,
-            approval_date=date.today(),
-            end_date=date.today() + relativedelta(months=24)
-        )
-        response = self.client.get(f"/api/view-loan-customer/{self.customer.pk}/")
-        self.assertEqual(response.status_code, 200)
-        self.assertTrue(len(response.json()) > 0)
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, RequestFactory
+from django.conf import settings
+from unittest import mock
+from django.http import HttpResponse
+from rest_framework.test import APIClient
+from rest_framework import status
+from .models import Customer, IdSequence, IngestionJob, Loan, LoanArchive, LoanHistorySummary, OutboxEvent
+from .utils import calculate_emi, calculate_emi_paise
+from .tasks import ingest_customer_data, ingest_loan_data, post_repayment_file, dispatch_outbox_events
+from .validation import validate_customers, validate_loans
+from .outbox import FileSink, LocalQueueSink, drain_outbox
+from .repayments import post_repayments, read_repayment_file
+from .snapshot import CustomerSnapshot
+from .sharding import allocate_ids, loan_shards, shard_for_id, shard_for_new_customer
+from .partitioning import partition_ranges
+from .archival import archive_closed_loans
+from .utils import amortization_schedule, calculate_credit_score, credit_score_from_aggregates
+from .exposure import build_exposure_report, credit_scores
+from .routers import PrimaryReplicaRouter, routing_scope, use_primary
+from .middleware import ReplicaPinningMiddleware, PIN_COOKIE, SamplingProfilerMiddleware
+from .profiling import sign_profile_token
+from . import warmup
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.uploadedfile import SimpleUploadedFile
+import time
+from .renderers import ORJSONRenderer, ORJSONParser
+from .admission import IN_FLIGHT_TTL, admission_counters, limit_concurrency, _counter_key
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+from decimal import Decimal
+import io
+import json
+from . import snapshot
+from django.test import override_settings
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from django.db import connections
+from celery.contrib.testing.worker import start_worker
+from celery.signals import task_postrun
+from credit.celery import app as celery_app
+from datetime import date, timedelta
+from django.utils import timezone
+import os
+import tempfile
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+class CreditAPITestCase(TestCase):
+    """
+    TestCase for Credit API endpoints.
+    This test suite covers the following functionalities:
+    - Customer Registration:
+        - `test_register_customer`: Tests the registration endpoint for creating a new customer and verifies the response data.
+    - Loan Eligibility Check:
+        - `test_check_eligibility_approved`: Tests the loan eligibility endpoint to ensure it returns the correct approval status for a valid customer and loan request.
+    - Loan Creation:
+        - `test_create_loan_success`: Tests the loan creation endpoint for a successful loan application, verifying approval and loan ID in the response.
+    - Loan Retrieval:
+        - `test_view_loan_by_id`: Tests retrieval of a specific loan by its ID, ensuring the correct loan details are returned.
+        - `test_view_loans_by_customer`: Tests retrieval of all loans associated with a specific customer, verifying that at least one loan is returned.
+    Setup:
+        - Creates a test customer for use in the test cases.
+    Dependencies:
+        - Assumes existence of Customer and Loan models, and utility function `calculate_emi`.
+        - Uses Django REST Framework's APIClient for API requests.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = Customer.objects.create(
+            first_name="Test",
+            last_name="User",
+            age=30,
+            phone_number="1234567890",
+            monthly_salary=60000,
+            approved_limit=300000
+        )
+
+    def test_register_customer(self):
+        payload = {
+            "first_name": "John",
+            "last_name": "Doe",
+            "age": 32,
+            "phone_number": "9876543210",
+            "monthly_salary": 50000,
+            "approved_limit": 250000
+        }
+        response = self.client.post("/api/register/", data=payload)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['first_name'], "John")
+
+    def test_check_eligibility_approved(self):
+        data = {
+            "customer_id": self.customer.pk,
+            "loan_amount": 50000,
+            "interest_rate": 15.0,
+            "tenure": 12
+        }
+        response = self.client.post("/api/check-eligibility/", data=data, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("loan_approved", response.json())
+
+    def test_create_loan_success(self):
+        payload = {
+            "customer_id": self.customer.pk,
+            "loan_amount": 80000,
+            "interest_rate": 14,
+            "tenure": 12
+        }
+        response = self.client.post("/api/create-loan/", data=payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.json()["loan_approved"])
+        self.assertIn("loan_id", response.json())
+
+    def test_view_loan_by_id(self):
+        loan = Loan.objects.create(
+            customer=self.customer,
+            loan_amount=70000,
+            interest_rate=14,
+            tenure=12,
+            monthly_installment=calculate_emi(70000, 14, 12),
+            emis_paid_on_time=0,
+            approval_date=date.today(),
+            end_date=date.today() + relativedelta(months=12)
+        )
+        response = self.client.get(f"/api/view-loan/{loan.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["loan_id"], loan.pk)
+
+    def test_view_loans_by_customer(self):
+        Loan.objects.create(
+            customer=self.customer,
+            loan_amount=100000,
+            interest_rate=13.5,
+            tenure=24,
+            monthly_installment=calculate_emi(100000, 13.5, 24),
+            emis_paid_on_time=0,
+            approval_date=date.today(),
+            end_date=date.today() + relativedelta(months=24)
+        )
+        response = self.client.get(f"/api/view-loan-customer/{self.customer.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(len(response.json()) > 0)
+
+
+class IdempotencyKeyTestCase(TestCase):
+    """
+    Retries carrying the same `Idempotency-Key` replay the first response without creating another loan;
+    a key reused with a different body is rejected.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = Customer.objects.create(
+            first_name="Retry",
+            last_name="User",
+            age=35,
+            phone_number="5550001111",
+            monthly_salary=90000,
+            approved_limit=3200000
+        )
+        self.payload = {
+            "customer_id": self.customer.pk,
+            "loan_amount": 60000,
+            "interest_rate": 14,
+            "tenure": 12
+        }
+
+    def test_create_loan_retry_is_replayed(self):
+        first = self.client.post("/api/create-loan/", data=self.payload, format='json', HTTP_IDEMPOTENCY_KEY="abc-123")
+        second = self.client.post("/api/create-loan/", data=self.payload, format='json', HTTP_IDEMPOTENCY_KEY="abc-123")
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(Loan.objects.filter(customer=self.customer).count(), 1)
+
+    def test_key_reused_with_different_body(self):
+        self.client.post("/api/create-loan/", data=self.payload, format='json', HTTP_IDEMPOTENCY_KEY="abc-456")
+        changed = dict(self.payload, loan_amount=70000)
+        response = self.client.post("/api/create-loan/", data=changed, format='json', HTTP_IDEMPOTENCY_KEY="abc-456")
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Loan.objects.filter(customer=self.customer).count(), 1)
+
+
+class IncrementalIngestionTestCase(TestCase):
+    """
+    Re-ingesting a customer workbook only touches rows whose content changed, and an identical file is skipped.
+    """
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "customers.xlsx")
+        self.df = pd.DataFrame({
+            "Customer ID": [101, 102, 103],
+            "First Name": ["Asha", "Ravi", "Meena"],
+            "Last Name": ["K", "P", "S"],
+            "Age": [30, 41, 29],
+            "Phone Number": [9000000001, 9000000002, 9000000003],
+            "Monthly Salary": [50000, 70000, 45000],
+            "Approved Limit": [1800000, 2500000, 1600000],
+        })
+        self.df.to_excel(self.path, index=False)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_only_changed_rows_are_upserted(self):
+        self.assertEqual(ingest_customer_data(self.path), 3)
+        self.assertEqual(ingest_customer_data(self.path), 0)
+
+        self.df.loc[1, "Monthly Salary"] = 80000
+        self.df.to_excel(self.path, index=False)
+        self.assertEqual(ingest_customer_data(self.path), 1)
+        self.assertEqual(Customer.objects.get(id=102).monthly_salary, 80000)
+        self.assertEqual(Customer.objects.count(), 3)
+
+
+class IngestionValidationTestCase(TestCase):
+    """
+    Bad rows are rejected column by column with their reasons and file row numbers; valid rows load
+    in bulk, and an orphan loan no longer aborts the run.
+    """
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(INGEST_REJECTS_DIR=self.tmpdir.name)
+        self.settings_override.enable()
+        Customer.objects.create(
+            id=401, first_name="Val", last_name="Id", age=44, phone_number="9200000001",
+            monthly_salary=70000, approved_limit=2500000
+        )
+        self.loans = pd.DataFrame({
+            "Customer ID": [401, 999, 401, 401, 401, 401],
+            "Loan ID": [7001, 7002, 7003, 7001, 7005, 7006],
+            "Loan Amount": [100000, 50000, -5, 20000, 30000, 40000],
+            "Tenure": [12, 12, 12, 12, 12, 12],
+            "Interest Rate": [12.5, 14.0, 11.0, 10.0, 9.5, 8.0],
+            "Monthly payment": [8900, 4500, 1000, 1800, 2600, 3500],
+            "EMIs paid on Time": [10, 2, 5, 3, 13, 4],
+            "Date of Approval": ["2024-01-05", "2024-01-05", "2024-01-05", "2024-01-05", "2024-01-05", "2024-03-01"],
+            "End Date": ["2025-01-05", "2025-01-05", "2025-01-05", "2025-01-05", "2025-01-05", "2024-02-01"],
+        })
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmpdir.cleanup()
+
+    def test_loan_checks(self):
+        clean, rejected = validate_loans(self.loans, pd.Index([401]))
+        self.assertEqual(clean["id"].tolist(), [7001])
+        self.assertEqual(clean["loan_amount_paise"].tolist(), [10000000])
+        self.assertEqual(rejected["Row"].tolist(), [3, 4, 5, 6, 7])
+        self.assertEqual(rejected["Reason"].tolist(), [
+            "unknown customer",
+            "invalid Loan Amount",
+            "repeated Loan ID",
+            "EMIs paid on Time out of range",
+            "End Date not after Date of Approval",
+        ])
+
+    def test_infinite_amounts_are_rejected_and_long_tenures_kept(self):
+        loans = self.loans.iloc[[0, 0, 0]].reset_index(drop=True).assign(**{
+            "Loan ID": [7101, 7102, 7103],
+            "Loan Amount": ["inf", 100000, 100000],
+            "Monthly payment": [8900, "-inf", 150],
+            "Tenure": [12, 12, 900],
+        })
+        clean, rejected = validate_loans(loans, pd.Index([401]))
+        self.assertEqual(clean["id"].tolist(), [7103])
+        self.assertEqual(rejected["Reason"].tolist(), ["invalid Loan Amount", "invalid Monthly payment"])
+
+    def test_values_too_large_for_their_columns_are_rejected(self):
+        loans = self.loans.iloc[[0, 0, 0, 0]].reset_index(drop=True).assign(**{
+            "Loan ID": [7201, 1e30, 7203, 7204],
+            "Loan Amount": [1e300, 100000, 100000, 100000],
+            "Monthly payment": [8900, 8900, 1e300, 8900],
+        })
+        clean, rejected = validate_loans(loans, pd.Index([401]))
+        self.assertEqual(clean["id"].tolist(), [7204])
+        self.assertEqual(rejected["Reason"].tolist(), ["invalid Loan Amount", "invalid Loan ID", "invalid Monthly payment"])
+
+        clean, rejected = validate_customers(pd.DataFrame({
+            "Customer ID": [1e30, 411, 412, 413],
+            "First Name": ["Big", "Rich", "Long", "Fine"],
+            "Last Name": ["A", "B", "C", "D"],
+            "Age": [30, 30, 30, 30],
+            "Phone Number": [9200000011, 9200000012, 12345678901234567890, 9200000014],
+            "Monthly Salary": [50000, 1e30, 50000, 50000],
+            "Approved Limit": [1800000, 1800000, 1800000, 1e12],
+        }))
+        self.assertEqual(clean["id"].tolist(), [])
+        self.assertEqual(rejected["Reason"].tolist(), [
+            "invalid Customer ID", "invalid Monthly Salary", "invalid Phone Number", "invalid Approved Limit",
+        ])
+
+    def test_customer_checks(self):
+        clean, rejected = validate_customers(pd.DataFrame({
+            "Customer ID": [402, 403, 404, 405],
+            "First Name": ["Ok", "Dup", "Taken", " "],
+            "Last Name": ["A", "B", "C", "D"],
+            "Age": [30, 41, 29, 12],
+            "Phone Number": [9200000002, 9200000002, 9200000001, 9200000005],
+            "Monthly Salary": [50000, 70000, 45000, 30000],
+            "Approved Limit": [1800000, 2500000, 1600000, 1100000],
+        }))
+        self.assertEqual(clean["id"].tolist(), [402])
+        self.assertEqual(clean["phone_number"].tolist(), ["9200000002"])
+        self.assertEqual(rejected["Reason"].tolist(), [
+            "repeated Phone Number",
+            "Phone Number belongs to another customer",
+            "invalid First Name; Age out of range",
+        ])
+
+    def test_orphan_loans_do_not_abort_ingestion(self):
+        path = os.path.join(self.tmpdir.name, "loans.xlsx")
+        self.loans.to_excel(path, index=False)
+        self.assertEqual(ingest_loan_data(path), 1)
+        self.assertEqual(list(Loan.objects.values_list("id", flat=True)), [7001])
+        report_name, = [name for name in os.listdir(self.tmpdir.name) if name.startswith("loans-")]
+        report = pd.read_csv(os.path.join(self.tmpdir.name, report_name))
+        self.assertEqual(report["Loan ID"].tolist(), [7002, 7003, 7001, 7005, 7006])
+
+
+class IngestUploadTestCase(TestCase):
+    """
+    An uploaded file is stored, loaded in chunks by the task and reported with progress counters;
+    rows with missing values or unknown customers are counted as rejected instead of failing the job.
+    """
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            INGEST_UPLOAD_DIR=self.tmpdir.name, INGEST_REJECTS_DIR=self.tmpdir.name, INGEST_CHUNK_SIZE=2
+        )
+        self.settings_override.enable()
+        self.client = APIClient()
+        self.customer = Customer.objects.create(
+            id=201, first_name="Up", last_name="Load", age=36, phone_number="6660001111",
+            monthly_salary=80000, approved_limit=2900000
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmpdir.cleanup()
+
+    def upload(self, name, content, kind):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post("/api/ingest/", {"kind": kind, "file": SimpleUploadedFile(name, content)}, format='multipart')
+
+    def test_loan_csv_is_loaded_in_chunks(self):
+        df = pd.DataFrame({
+            "Customer ID": [201, 201, 999, 201, 201],
+            "Loan ID": [9001, 9002, 9003, 9004, 9005],
+            "Loan Amount": [100000, 50000, 70000, None, 20000],
+            "Tenure": [12, 24, 12, 6, 6],
+            "Interest Rate": [12.5, 14.0, 11.0, 10.0, 9.5],
+            "Monthly payment": [8900, 2400, 6200, 1000, 3400],
+            "EMIs paid on Time": [10, 20, 5, 6, 3],
+            "Date of Approval": ["2024-01-05"] * 5,
+            "End Date": ["2025-01-05"] * 5,
+        })
+        response = self.upload("loans.csv", df.to_csv(index=False).encode(), "loans")
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["job_id"]
+        self.assertEqual(response["Location"], f"/api/ingest/{job_id}/")
+
+        job = self.client.get(f"/api/ingest/{job_id}/").json()
+        self.assertEqual(job["status"], "done")
+        self.assertEqual((job["total_rows"], job["rows_processed"], job["rows_rejected"]), (5, 5, 2))
+        self.assertEqual(job["eta_seconds"], 0)
+        self.assertEqual(pd.read_csv(job["rejected_report"])["Row"].tolist(), [4, 5])
+        self.assertEqual(sorted(Loan.objects.values_list('id', flat=True)), [9001, 9002, 9005])
+        self.assertTrue(os.path.exists(IngestionJob.objects.get(pk=job_id).path))
+
+    def test_customer_workbook(self):
+        buffer = io.BytesIO()
+        pd.DataFrame({
+            "Customer ID": [301, 302, 303],
+            "First Name": ["Asha", "Ravi", "Meena"],
+            "Last Name": ["K", "P", "S"],
+            "Age": [30, 41, 29],
+            "Phone Number": [9100000001, 9100000002, 9100000003],
+            "Monthly Salary": [50000, 70000, 45000],
+            "Approved Limit": [1800000, 2500000, 1600000],
+        }).to_excel(buffer, index=False)
+        job_id = self.upload("customers.xlsx", buffer.getvalue(), "customers").json()["job_id"]
+
+        job = self.client.get(f"/api/ingest/{job_id}/").json()
+        self.assertEqual((job["status"], job["total_rows"], job["rows_processed"], job["rows_rejected"]), ("done", 3, 3, 0))
+        self.assertEqual(Customer.objects.get(id=302).monthly_salary, 70000)
+
+    def test_rejected_uploads(self):
+        self.assertEqual(self.upload("loans.txt", b"x", "loans").status_code, 400)
+        self.assertEqual(self.upload("loans.csv", b"x", "payments").status_code, 400)
+        self.assertEqual(self.client.get("/api/ingest/00000000-0000-0000-0000-000000000000/").status_code, 404)
+
+
+class CustomerSnapshotTestCase(TestCase):
+    """
+    The columnar snapshot mirrors the database aggregates, picks up new loans on refresh,
+    and lets the eligibility view reject a request without touching the database.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = Customer.objects.create(
+            first_name="Snap",
+            last_name="Shot",
+            age=40,
+            phone_number="7770001111",
+            monthly_salary=40000,
+            approved_limit=1400000
+        )
+        self.loan = Loan.objects.create(
+            customer=self.customer,
+            loan_amount=200000,
+            interest_rate=12,
+            tenure=24,
+            monthly_installment=calculate_emi(200000, 12, 24),
+            emis_paid_on_time=20,
+            approval_date=date.today(),
+            end_date=date.today() + relativedelta(months=24)
+        )
+        snapshot._snapshot = None
+
+    def tearDown(self):
+        snapshot._snapshot = None
+
+    def test_lookup_and_refresh(self):
+        built = CustomerSnapshot.build()
+        self.assertEqual(len(built), 1)
+        with self.assertNumQueries(0):
+            aggregates = built.lookup(self.customer.pk)
+            self.assertIsNone(built.lookup(self.customer.pk + 1))
+        self.assertEqual(aggregates.loan_count, 1)
+        self.assertEqual(aggregates.total_emis_paid, 20)
+
+        Loan.objects.create(
+            customer=self.customer,
+            loan_amount=50000,
+            interest_rate=14,
+            tenure=12,
+            monthly_installment=calculate_emi(50000, 14, 12),
+            emis_paid_on_time=0,
+            approval_date=date.today(),
+            end_date=date.today() + relativedelta(months=12)
+        )
+        self.assertEqual(built.refresh(), 1)
+        aggregates = built.lookup(self.customer.pk)
+        self.assertEqual(aggregates.loan_count, 2)
+        self.assertEqual(aggregates.total_loan_amount_paise, 25000000)
+
+    @override_settings(CREDIT_SNAPSHOT_ENABLED=True, CREDIT_SNAPSHOT_MAX_AGE=60)
+    def test_eligibility_rejection_uses_snapshot(self):
+        snapshot.get_snapshot()
+        data = {
+            "customer_id": self.customer.pk,
+            "loan_amount": 900000,
+            "interest_rate": 12,
+            "tenure": 12
+        }
+        with self.assertNumQueries(0):
+            response = self.client.post("/api/check-eligibility/", data=data, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()["loan_approved"])
+
+    @override_settings(CREDIT_SNAPSHOT_ENABLED=True, CREDIT_SNAPSHOT_MAX_AGE=60)
+    def test_approval_rechecks_the_database(self):
+        snapshot.get_snapshot()
+        # Each loan fits under 50% of the salary on its own, but not both
+        data = {
+            "customer_id": self.customer.pk,
+            "loan_amount": 100000,
+            "interest_rate": 12,
+            "tenure": 12
+        }
+        response = self.client.post("/api/check-eligibility/", data=data, format='json')
+        self.assertTrue(response.json()["loan_approved"])
+        response = self.client.post("/api/check-eligibility/", data=data, format='json')
+        self.assertFalse(response.json()["loan_approved"])
+        self.assertIn("50%", response.json()["message"])
+        self.assertEqual(self.customer.loans.count(), 2)
+
+    def test_published_generation_is_mapped_and_swapped(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(CREDIT_SNAPSHOT_PATH=directory):
+            self.assertIsNone(snapshot.get_snapshot())
+
+            first = CustomerSnapshot.build().save(directory)
+            mapped = snapshot.get_snapshot()
+            self.assertEqual(mapped.generation, first)
+            self.assertFalse(mapped.columns['customer_id'].flags.writeable)
+            self.assertEqual(mapped.lookup(self.customer.pk).loan_count, 1)
+
+            self.loan.delete()
+            second = CustomerSnapshot.build().save(directory)
+            self.assertNotEqual(first, second)
+            self.assertEqual(snapshot.get_snapshot().lookup(self.customer.pk).loan_count, 0)
+
+
+class AmortizationTestCase(TestCase):
+    """
+    Loan schedules close at zero with the EMI from `calculate_emi`, and simulations report the effect of a prepayment.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = Customer.objects.create(
+            first_name="Sched",
+            last_name="Ule",
+            age=45,
+            phone_number="6660001111",
+            monthly_salary=100000,
+            approved_limit=3600000
+        )
+        self.loan = Loan.objects.create(
+            customer=self.customer,
+            loan_amount=100000,
+            interest_rate=12,
+            tenure=12,
+            monthly_installment=calculate_emi(100000, 12, 12),
+            emis_paid_on_time=0,
+            approval_date=date.today(),
+            end_date=date.today() + relativedelta(months=12)
+        )
+
+    def test_schedule(self):
+        response = self.client.get(f"/api/loans/{self.loan.pk}/schedule/")
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(len(body["schedule"]), 12)
+        self.assertEqual(body["monthly_installment"], calculate_emi(100000, 12, 12))
+        self.assertEqual(body["schedule"][-1]["balance"], 0)
+        self.assertAlmostEqual(sum(row["principal"] for row in body["schedule"]), 100000, places=1)
+
+    def test_simulate_prepayment(self):
+        payload = [
+            {"loan_id": self.loan.pk, "month": 6, "prepayment": 20000},
+            {"loan_amount": 100000, "interest_rate": 12, "tenure": 12, "new_interest_rate": 10},
+        ]
+        response = self.client.post("/api/simulate/", data=payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        prepaid, refinanced = response.json()
+        self.assertGreater(prepaid["scenario"]["interest_saved"], 0)
+        self.assertLess(prepaid["scenario"]["monthly_installment"], prepaid["baseline"]["monthly_installment"])
+        self.assertEqual(refinanced["scenario"]["monthly_installment"], calculate_emi(100000, 10, 12))
+
+    def test_simulate_unknown_loan(self):
+        response = self.client.post("/api/simulate/", data={"loan_id": 999999}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_simulate_rejects_tenures_past_the_limit(self):
+        for field in ("tenure", "new_tenure"):
+            payload = {"loan_amount": 100000, "interest_rate": 12, "tenure": 12, field: 5000}
+            response = self.client.post("/api/simulate/", data=payload, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(field, response.json()["0"])
+
+    def test_simulate_rejects_rates_past_the_limit(self):
+        for field in ("interest_rate", "new_interest_rate"):
+            payload = {"loan_amount": 100000, "interest_rate": 12, "tenure": 12, field: 1e6}
+            response = self.client.post("/api/simulate/", data=payload, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(field, response.json()["0"])
+        payload = {"loan_amount": 100000, "interest_rate": 100, "tenure": 12}
+        self.assertEqual(self.client.post("/api/simulate/", data=payload, format='json').status_code, 200)
+
+
+class BulkRegistrationTestCase(TestCase):
+    """
+    Bulk registration inserts the valid rows in one go and reports per-row errors for the rest.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        Customer.objects.create(
+            first_name="Existing",
+            last_name="User",
+            age=50,
+            phone_number="8880000000",
+            monthly_salary=30000,
+            approved_limit=1100000
+        )
+
+    def test_bulk_register(self):
+        rows = [
+            {"first_name": "A", "last_name": "One", "age": 25, "phone_number": "8880000001", "monthly_salary": 50000},
+            {"first_name": "B", "last_name": "Two", "age": 31, "phone_number": "8880000000", "monthly_salary": 40000},
+            {"first_name": "C", "last_name": "Three", "age": 28, "phone_number": "8880000001", "monthly_salary": 45000},
+            {"first_name": "D", "last_name": "Four", "age": "old", "phone_number": "8880000004", "monthly_salary": 45000},
+            {"first_name": "E", "last_name": "Five", "age": 40, "phone_number": "8880000005", "monthly_salary": 72000},
+        ]
+        with self.assertNumQueries(4):
+            response = self.client.post("/api/register/bulk/", data=rows, format='json')
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(body["created"], 2)
+        self.assertEqual(body["failed"], 3)
+        self.assertEqual([row["index"] for row in body["results"]], [0, 1, 2, 3, 4])
+        self.assertIn("id", body["results"][0])
+        self.assertIn("phone_number", body["results"][1]["errors"])
+        self.assertIn("age", body["results"][3]["errors"])
+        self.assertEqual(Customer.objects.get(phone_number="8880000005").approved_limit, 2600000)
+
+
+@override_settings(
+    CELERY_TASK_ALWAYS_EAGER=False,
+    CELERY_WORKER_HIJACK_ROOT_LOGGER=False,
+)
+class AsyncEligibilityTestCase(TransactionTestCase):
+    """
+    Async eligibility requests return a job id immediately; the job result is available once a
+    worker has run the task. Eager mode is switched off, so `.delay()` only enqueues on the
+    in-memory broker and an in-process worker thread consumes it while the client polls.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = Customer.objects.create(
+            first_name="Async",
+            last_name="User",
+            age=33,
+            phone_number="4440001111",
+            monthly_salary=60000,
+            approved_limit=2200000
+        )
+
+    def poll_job(self, job_id, timeout=10):
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.client.get(f"/api/jobs/{job_id}/").json()
+            if job["status"] in ("done", "failed") or time.monotonic() > deadline:
+                return job
+            time.sleep(0.05)
+
+    def test_job_lifecycle(self):
+        data = {
+            "customer_id": self.customer.pk,
+            "loan_amount": 50000,
+            "interest_rate": 15.0,
+            "tenure": 12
+        }
+        response = self.client.post("/api/check-eligibility/async/", data=data, format='json')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["job_id"]
+        self.assertEqual(response["Location"], f"/api/jobs/{job_id}/")
+        # Nothing runs the task until a worker consumes the queue.
+        self.assertEqual(self.client.get(f"/api/jobs/{job_id}/").json()["status"], "pending")
+
+        # The worker thread opens its own database connections; close them after each task so
+        # none outlive the test.
+        task_postrun.connect(close_worker_connections)
+        self.addCleanup(task_postrun.disconnect, close_worker_connections)
+        with start_worker(celery_app, perform_ping_check=False):
+            job = self.poll_job(job_id)
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["status_code"], 200)
+        self.assertTrue(job["result"]["loan_approved"])
+
+    def test_unknown_job(self):
+        response = self.client.get("/api/jobs/00000000-0000-0000-0000-000000000000/")
+        self.assertEqual(response.status_code, 404)
+
+
+def close_worker_connections(**kwargs):
+    connections.close_all()
+
+
+class LoanPartitionRangesTestCase(TestCase):
+    """
+    Partition ranges cover whole periods from the first to the last day requested.
+    """
+    def test_yearly_and_monthly_ranges(self):
+        yearly = list(partition_ranges(date(2023, 6, 15), date(2025, 1, 1), 'year'))
+        self.assertEqual([name for name, _, _ in yearly], ["core_loan_p2023", "core_loan_p2024", "core_loan_p2025"])
+        self.assertEqual(yearly[0][1:], (date(2023, 1, 1), date(2024, 1, 1)))
+
+        monthly = list(partition_ranges(date(2024, 11, 30), date(2025, 1, 2), 'month'))
+        self.assertEqual([name for name, _, _ in monthly], ["core_loan_p2024_11", "core_loan_p2024_12", "core_loan_p2025_01"])
+        self.assertEqual(monthly[-1][1:], (date(2025, 1, 1), date(2025, 2, 1)))
+
+
+class LoanArchivalTestCase(TestCase):
+    """
+    Closed loans move to the archive without changing the customer's credit score, and are only
+    listed when history is requested.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = Customer.objects.create(
+            first_name="Old",
+            last_name="Timer",
+            age=60,
+            phone_number="3330001111",
+            monthly_salary=80000,
+            approved_limit=2900000
+        )
+        self.closed = Loan.objects.create(
+            customer=self.customer,
+            loan_amount=150000,
+            interest_rate=11,
+            tenure=12,
+            monthly_installment=calculate_emi(150000, 11, 12),
+            emis_paid_on_time=12,
+            approval_date=date(2015, 1, 10),
+            end_date=date(2016, 1, 10)
+        )
+        self.active = Loan.objects.create(
+            customer=self.customer,
+            loan_amount=90000,
+            interest_rate=13,
+            tenure=24,
+            monthly_installment=calculate_emi(90000, 13, 24),
+            emis_paid_on_time=3,
+            approval_date=date.today(),
+            end_date=date.today() + relativedelta(months=24)
+        )
+
+    def test_archive_keeps_score_and_hides_history(self):
+        score_before = calculate_credit_score(self.customer)
+        self.assertEqual(archive_closed_loans(batch_size=1), 1)
+        self.assertEqual(archive_closed_loans(), 0)
+
+        self.customer.refresh_from_db()
+        self.assertEqual(calculate_credit_score(self.customer), score_before)
+        self.assertEqual(CustomerSnapshot.build().lookup(self.customer.pk).credit_score, score_before)
+        self.assertFalse(Loan.objects.filter(pk=self.closed.pk).exists())
+        self.assertTrue(LoanArchive.objects.filter(pk=self.closed.pk).exists())
+
+        hot = self.client.get(f"/api/view-loan-customer/{self.customer.pk}/").json()
+        self.assertEqual([loan["loan_id"] for loan in hot], [self.active.pk])
+        history = self.client.get(f"/api/view-loan-customer/{self.customer.pk}/?include_history=true").json()
+        self.assertEqual(sorted(loan["loan_id"] for loan in history), sorted([self.active.pk, self.closed.pk]))
+
+        archived = self.client.get(f"/api/view-loan/{self.closed.pk}/?include_history=true").json()
+        self.assertTrue(archived["archived"])
+
+    def test_loans_with_emis_outstanding_stay_hot(self):
+        defaulted = Loan.objects.create(
+            customer=self.customer, loan_amount=60000, interest_rate=12, tenure=12,
+            monthly_installment=calculate_emi(60000, 12, 12), emis_paid_on_time=7,
+            approval_date=date(2016, 3, 1), end_date=date(2017, 3, 1)
+        )
+        output = io.StringIO()
+        call_command("archive_loans", stdout=output)
+        self.assertIn("archived 1 loans", output.getvalue())
+        self.assertTrue(Loan.objects.filter(pk=defaulted.pk).exists())
+        self.assertFalse(LoanArchive.objects.filter(pk=defaulted.pk).exists())
+
+
+@override_settings(
+    READ_REPLICA_ALIAS='replica',
+    REPLICA_LAG_CHECK_INTERVAL=0,
+    REPLICA_LAG_TOLERANCE=5,
+)
+class ReplicaRoutingTestCase(SimpleTestCase):
+    """
+    Reads go to the replica alias until the request writes; a write pins the client to the primary.
+    Routing decisions only; ReplicaDatabaseTestCase runs the same through the API on two aliases.
+    """
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def test_reads_use_replica_until_a_write(self):
+        with routing_scope():
+            self.assertEqual(self.router.db_for_read(Loan), 'replica')
+            self.assertEqual(self.router.db_for_write(Loan), 'default')
+            self.assertEqual(self.router.db_for_read(Loan), 'default')
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(Loan), 'default')
+        self.assertFalse(self.router.allow_migrate('replica', 'core'))
+
+    def test_writes_outside_a_scope_do_not_pin(self):
+        self.assertEqual(self.router.db_for_write(Loan), 'default')
+        self.assertEqual(self.router.db_for_read(Loan), 'replica')
+
+    def test_middleware_pins_after_write(self):
+        def view(request):
+            self.router.db_for_write(Loan)
+            return HttpResponse()
+
+        response = ReplicaPinningMiddleware(view)(self.factory.post("/api/create-loan/"))
+        self.assertEqual(response.cookies[PIN_COOKIE]["max-age"], 5)
+
+        def read_view(request):
+            return HttpResponse(self.router.db_for_read(Loan))
+
+        pinned = self.factory.get("/api/view-loan/1/")
+        pinned.COOKIES[PIN_COOKIE] = "1"
+        self.assertEqual(ReplicaPinningMiddleware(read_view)(pinned).content, b"default")
+        self.assertEqual(ReplicaPinningMiddleware(read_view)(self.factory.get("/api/view-loan/1/")).content, b"replica")
+
+
+@override_settings(
+    READ_REPLICA_ALIAS='replica',
+    REPLICA_LAG_CHECK_INTERVAL=0,
+    REPLICA_LAG_TOLERANCE=5,
+)
+class ReplicaDatabaseTestCase(TransactionTestCase):
+    """
+    Routing through the API on two real aliases: `manage.py test` adds `replica` as a test mirror of
+    `default`, so both connections see the same rows and the queries each one ran show the routing.
+    """
+    databases = {'default', 'replica'}
+
+    def test_client_reads_its_writes_from_the_primary(self):
+        client = APIClient()
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            response = client.post("/api/register/", {
+                "first_name": "Read", "last_name": "Back", "age": 30, "phone_number": "7770001111",
+                "monthly_salary": 60000,
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(replica_queries), 0)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        url = f"/api/view-loan-customer/{response.json()['id']}/"
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            self.assertEqual(client.get(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(len(replica_queries), 0)
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            self.assertEqual(APIClient().get(url).status_code, status.HTTP_200_OK)
+        self.assertGreater(len(replica_queries), 0)
+
+    def test_writes_outside_a_request_leave_reads_on_the_replica(self):
+        Customer.objects.create(
+            first_name="Worker", last_name="Write", age=30, phone_number="7770002222",
+            monthly_salary=60000, approved_limit=2200000
+        )
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            self.assertTrue(Customer.objects.filter(phone_number="7770002222").exists())
+        self.assertEqual(len(replica_queries), 1)
+
+
+class FastLoanPayloadTestCase(TestCase):
+    """
+    The orjson renderer/parser round-trip like DRF's JSON classes, and the tuple-based loan list keeps its EMIs.
+    """
+    def test_renderer_matches_json_renderer(self):
+        data = {"amount": Decimal("12.50"), "day": date(2024, 3, 1), "name": "Ra\u2028m", "items": [1, 2.5, None], "errors": {0: ["bad"]}}
+        rendered = ORJSONRenderer().render(data)
+        self.assertEqual(json.loads(rendered), json.loads(JSONRenderer().render(data)))
+        self.assertNotIn("\u2028".encode(), rendered)
+        self.assertEqual(ORJSONParser().parse(io.BytesIO(rendered)), json.loads(rendered))
+
+    def test_loan_list_view(self):
+        customer = Customer.objects.create(
+            first_name="Fast", last_name="List", age=40, phone_number="5550001111",
+            monthly_salary=80000, approved_limit=2900000
+        )
+        for amount, rate in ((100000, 12), (50000, 0)):
+            Loan.objects.create(
+                customer=customer, loan_amount=amount, interest_rate=rate, tenure=24,
+                monthly_installment=calculate_emi(amount, rate, 24), emis_paid_on_time=0,
+                approval_date=date.today(), end_date=date.today() + relativedelta(months=24)
+            )
+        response = APIClient().get(f"/api/view-loan-customer/{customer.pk}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(loan["monthly_installment"] for loan in response.json()),
+            sorted([calculate_emi(100000, 12, 24), calculate_emi(50000, 0, 24)])
+        )
+        self.assertEqual({loan["repayments_left"] for loan in response.json()}, {24})
+
+
+class AdmissionControlTestCase(TestCase):
+    """
+    Scoring endpoints answer 429 past a client's token bucket and 503 once too many requests are in flight.
+    """
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.customer = Customer.objects.create(
+            first_name="Busy", last_name="Partner", age=38, phone_number="4440001111",
+            monthly_salary=90000, approved_limit=3200000
+        )
+        self.payload = {"customer_id": self.customer.pk, "loan_amount": 100000, "interest_rate": 12, "tenure": 12}
+
+    def tearDown(self):
+        cache.clear()
+
+    @override_settings(RATE_LIMIT_RATE=0.01, RATE_LIMIT_BURST=2)
+    def test_token_bucket(self):
+        for _ in range(2):
+            self.assertEqual(self.client.post("/api/check-eligibility/", self.payload, format='json').status_code, 200)
+        response = self.client.post("/api/check-eligibility/", self.payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(response["Retry-After"]), 0)
+        self.assertEqual(admission_counters()["throttled"], 1)
+        self.assertEqual(admission_counters()["admitted"], 2)
+
+    @override_settings(SCORING_MAX_IN_FLIGHT=1, SCORING_RETRY_AFTER=3)
+    def test_sheds_past_concurrency_limit(self):
+        cache.set(_counter_key("scoring", "in_flight"), 1)
+        response = self.client.post("/api/create-loan/", self.payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response["Retry-After"], "3")
+        self.assertEqual(admission_counters(), {"admitted": 0, "throttled": 0, "shed": 1, "in_flight": 1})
+        self.assertEqual(Loan.objects.count(), 0)
+
+    @override_settings(SCORING_MAX_IN_FLIGHT=2)
+    def test_in_flight_counter_survives_expiry_under_load(self):
+        # Nested views stand in for overlapping requests; the clock jumps past IN_FLIGHT_TTL while
+        # the first is still running. Each new request renews the counter, so the third is shed.
+        key = _counter_key("scoring", "in_flight")
+        clock = [time.time()]
+        responses = {}
+
+        def scoring_view(name, elapsed, then=None):
+            @limit_concurrency
+            def view(self, request):
+                clock[0] += elapsed
+                if then:
+                    then()
+                return HttpResponse(name)
+            return lambda: responses.setdefault(name, view(None, None).status_code)
+
+        third = scoring_view("third", 0)
+        second = scoring_view("second", IN_FLIGHT_TTL - 100, third)
+        first = scoring_view("first", 200, second)
+        with mock.patch("time.time", lambda: clock[0]):
+            first()
+            self.assertEqual(responses, {"first": 200, "second": 200, "third": 503})
+            self.assertEqual(cache.get(key), 0)
+
+            # A request outliving the counter does not drive the recreated one below zero.
+            expire = scoring_view("expire", IN_FLIGHT_TTL + 1, scoring_view("after", 0))
+            expire()
+            self.assertEqual(responses["after"], 200)
+            self.assertEqual(cache.get(key), 0)
+
+
+class MoneyMinorUnitsTestCase(TestCase):
+    """
+    Loan money is stored as integer paise / basis points; the float properties and EMIs stay as before.
+    """
+    def test_integer_emi_matches_float_emi(self):
+        for amount, rate, tenure in ((100000, 12, 12), (250000, 0, 24), (575000.5, 9.75, 60), (1000, 22.5, 6)):
+            self.assertAlmostEqual(
+                calculate_emi_paise(round(amount * 100), round(rate * 100), tenure) / 100,
+                calculate_emi(amount, rate, tenure),
+                places=2,
+            )
+        with self.assertRaises(ValueError):
+            calculate_emi_paise(100000, -1, 12)
+
+    def test_properties_round_trip(self):
+        customer = Customer.objects.create(
+            first_name="Exact", last_name="Paise", age=33, phone_number="2220001111",
+            monthly_salary=50000, approved_limit=1800000
+        )
+        loan = Loan.objects.create(
+            customer=customer, loan_amount=0.29, interest_rate=10.05, tenure=12,
+            monthly_installment=1234.565, emis_paid_on_time=0,
+            approval_date=date.today(), end_date=date.today() + relativedelta(months=12)
+        )
+        loan.refresh_from_db()
+        self.assertEqual((loan.loan_amount_paise, loan.interest_rate_bp, loan.monthly_installment_paise), (29, 1005, 123457))
+        self.assertEqual((loan.loan_amount, loan.interest_rate), (0.29, 10.05))
+
+    def test_salary_check_is_exact_at_the_boundary(self):
+        # Existing plus new EMI come to exactly half the salary, which is still allowed.
+        new_emi = calculate_emi_paise(10000000, 1200, 12)
+        customer = Customer.objects.create(
+            first_name="Edge", last_name="Case", age=41, phone_number="2220002222",
+            monthly_salary=100000, approved_limit=10000000
+        )
+        existing = Loan.objects.create(
+            customer=customer, loan_amount_paise=10000000, interest_rate_bp=0, tenure=24,
+            monthly_installment_paise=5000000 - new_emi, emis_paid_on_time=24,
+            approval_date=date(2020, 1, 1), end_date=date(2022, 1, 1)
+        )
+        payload = {"customer_id": customer.pk, "loan_amount": 100000, "interest_rate": 12, "tenure": 12}
+        response = APIClient().post("/api/check-eligibility/", payload, format='json')
+        self.assertEqual(response.json()["monthly_installment"], new_emi / 100)
+        self.assertNotIn("50%", response.json()["message"])
+        Loan.objects.exclude(pk=existing.pk).delete()
+        payload["loan_amount"] = 100000.5
+        response = APIClient().post("/api/check-eligibility/", payload, format='json')
+        self.assertIn("50%", response.json()["message"])
+
+    def test_terms_the_emi_cannot_be_computed_for_are_rejected(self):
+        customer = Customer.objects.create(
+            first_name="Odd", last_name="Terms", age=29, phone_number="2220003333",
+            monthly_salary=100000, approved_limit=3600000
+        )
+        for loan_amount, interest_rate, tenure in ((100000, 12, 1500), (0.001, 12, 12), (100000, 12, -3), (100000, 1e6, 12)):
+            payload = {"customer_id": customer.pk, "loan_amount": loan_amount, "interest_rate": interest_rate, "tenure": tenure}
+            response = APIClient().post("/api/check-eligibility/", payload, format='json')
+            self.assertEqual(response.status_code, 400, (loan_amount, interest_rate, tenure))
+        self.assertFalse(Loan.objects.filter(customer=customer).exists())
+
+    def test_create_loan_rejects_malformed_terms(self):
+        customer = Customer.objects.create(
+            first_name="Bad", last_name="Terms", age=29, phone_number="2220004444",
+            monthly_salary=100000, approved_limit=3600000
+        )
+        payload = {"customer_id": customer.pk, "loan_amount": 100000, "interest_rate": 12, "tenure": 12}
+        for field, value in (("loan_amount", "inf"), ("loan_amount", "abc"), ("tenure", 1500), ("interest_rate", None),
+                             ("customer_id", None)):
+            bad = {**payload, field: value} if value is not None else {k: v for k, v in payload.items() if k != field}
+            response = APIClient().post("/api/create-loan/", bad, format='json')
+            self.assertEqual(response.status_code, 400, (field, value))
+        self.assertFalse(Loan.objects.filter(customer=customer).exists())
+
+
+class MaxEligibleQuoteTestCase(TestCase):
+    """
+    The max-eligible quote is the largest amount /check-eligibility/ approves, for several tenures at once.
+    """
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            first_name="Top", last_name="Quote", age=36, phone_number="3330001111",
+            monthly_salary=100000, approved_limit=3600000
+        )
+        Loan.objects.create(
+            customer=self.customer, loan_amount_paise=10000000, interest_rate_bp=1000, tenure=24,
+            monthly_installment_paise=1234500, emis_paid_on_time=24,
+            approval_date=date(2020, 1, 1), end_date=date(2022, 1, 1)
+        )
+
+    def test_quote_is_the_approval_boundary(self):
+        response = APIClient().get(f"/api/customers/{self.customer.pk}/max-eligible/?interest_rate=12&tenure=12,24&tenure=36")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.json()
+        self.assertTrue(body["eligible"])
+        self.assertEqual(body["emi_headroom"], 50000 - 12345)
+        self.assertEqual([quote["tenure"] for quote in body["quotes"]], [12, 24, 36])
+        self.assertEqual(Loan.objects.count(), 1)
+
+        quote = body["quotes"][0]
+        payload = {"customer_id": self.customer.pk, "loan_amount": quote["max_loan_amount"], "interest_rate": 12, "tenure": 12}
+        response = APIClient().post("/api/check-eligibility/", payload, format='json')
+        self.assertTrue(response.json()["loan_approved"])
+        Loan.objects.filter(pk=response.json()["loan_id"]).delete()
+        payload["loan_amount"] = round(quote["max_loan_amount"] + 0.01, 2)
+        response = APIClient().post("/api/check-eligibility/", payload, format='json')
+        self.assertIn("50%", response.json()["message"])
+
+    def test_create_loan_accepts_the_quote(self):
+        # The stored installment (12345) is not what the loan's terms recompute to (~4614)
+        response = APIClient().get(f"/api/customers/{self.customer.pk}/max-eligible/?interest_rate=12&tenure=12")
+        quote = response.json()["quotes"][0]
+        payload = {"customer_id": self.customer.pk, "loan_amount": quote["max_loan_amount"], "interest_rate": 12, "tenure": 12}
+        response = APIClient().post("/api/create-loan/", payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        Loan.objects.filter(pk=response.json()["loan_id"]).delete()
+        payload["loan_amount"] = round(quote["max_loan_amount"] + 0.01, 2)
+        response = APIClient().post("/api/create-loan/", payload, format='json')
+        self.assertEqual(response.json()["message"], "EMI exceeds 50% of monthly salary")
+
+    def test_ineligible_and_invalid_requests(self):
+        self.customer.approved_limit = 50000
+        self.customer.save()
+        response = APIClient().get(f"/api/customers/{self.customer.pk}/max-eligible/?interest_rate=12&tenure=12")
+        self.assertFalse(response.json()["eligible"])
+        self.assertEqual(response.json()["quotes"], [])
+        self.assertEqual(APIClient().get(f"/api/customers/{self.customer.pk}/max-eligible/?tenure=0").status_code, 400)
+        self.assertEqual(APIClient().get(f"/api/customers/{self.customer.pk}/max-eligible/?interest_rate=101&tenure=12").status_code, 400)
+        self.assertEqual(APIClient().get("/api/customers/999999/max-eligible/?interest_rate=12&tenure=12").status_code, 404)
+
+
+class ConditionalLoanReadTestCase(TestCase):
+    """
+    Loan read endpoints answer revalidation with 304 from a version lookup and compress large lists.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = Customer.objects.create(
+            first_name="Poll", last_name="Often", age=29, phone_number="6660001111",
+            monthly_salary=70000, approved_limit=2500000
+        )
+        self.loan = Loan.objects.create(
+            customer=self.customer, loan_amount=100000, interest_rate=12, tenure=24,
+            monthly_installment=calculate_emi(100000, 12, 24), emis_paid_on_time=0,
+            approval_date=date.today(), end_date=date.today() + relativedelta(months=24)
+        )
+
+    def test_list_not_modified_until_a_loan_changes(self):
+        url = f"/api/view-loan-customer/{self.customer.pk}/"
+        response = self.client.get(url)
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+        self.loan.emis_paid_on_time = 1
+        self.loan.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertNotEqual(self.client.get(url + "?include_history=true")["ETag"], response["ETag"])
+
+    def test_archiving_a_loan_moves_last_modified_forward(self):
+        closed = Loan.objects.create(
+            customer=self.customer, loan_amount=50000, interest_rate=10, tenure=12,
+            monthly_installment=calculate_emi(50000, 10, 12), emis_paid_on_time=12,
+            approval_date=date(2020, 1, 1), end_date=date(2021, 1, 1)
+        )
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        Customer.objects.filter(pk=self.customer.pk).update(updated_at=an_hour_ago)
+        Loan.objects.filter(customer=self.customer).update(updated_at=an_hour_ago)
+        url = f"/api/view-loan-customer/{self.customer.pk}/"
+        last_modified = self.client.get(url)["Last-Modified"]
+
+        self.assertEqual(archive_closed_loans(), 1)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn(closed.pk, [loan["loan_id"] for loan in response.json()])
+
+    def test_detail_not_modified(self):
+        url = f"/api/view-loan/{self.loan.pk}/"
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.customer.first_name = "Renamed"
+        self.customer.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+        self.assertFalse(self.client.get("/api/view-loan/999999/").has_header("ETag"))
+
+    @override_settings(COMPRESSION_MIN_BYTES=100)
+    def test_large_list_is_compressed(self):
+        Loan.objects.bulk_create([
+            Loan(customer=self.customer, loan_amount_paise=5000000, interest_rate_bp=1200, tenure=12,
+                 monthly_installment_paise=calculate_emi_paise(5000000, 1200, 12), emis_paid_on_time=0,
+                 approval_date=date.today(), end_date=date.today() + relativedelta(months=12))
+            for _ in range(20)
+        ])
+        url = f"/api/view-loan-customer/{self.customer.pk}/"
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertTrue(response["ETag"].startswith('W/"'))
+        self.assertEqual(self.client.get(url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        with override_settings(COMPRESSION_MIN_BYTES=100000):
+            self.assertFalse(self.client.get(url, HTTP_ACCEPT_ENCODING="gzip").has_header("Content-Encoding"))
+
+
+class ShardRoutingTestCase(SimpleTestCase):
+    """
+    Ids route to SHARDS[id % N]; loans are looked up on their home shard first; one shard means no routing.
+    """
+    @override_settings(SHARDS=['default', 'shard1', 'shard2'])
+    def test_routing(self):
+        self.assertEqual([shard_for_id(customer_id) for customer_id in (3, 4, 5)], ['default', 'shard1', 'shard2'])
+        self.assertEqual(loan_shards(5), ['shard2', 'default', 'shard1'])
+        self.assertEqual(shard_for_new_customer("9990001111"), shard_for_new_customer("9990001111"))
+
+    @override_settings(SHARDS=['default'])
+    def test_single_shard_leaves_routing_to_the_router(self):
+        self.assertIsNone(shard_for_id(7))
+        self.assertEqual(loan_shards(7), [None])
+        self.assertEqual(allocate_ids(Customer, None, 2), [None, None])
+
+
+@override_settings(SHARDS=settings.TEST_SHARDS)
+class ShardedDatabaseTestCase(TransactionTestCase):
+    """
+    Customers and their loans land on one shard with shard-aware ids; reads find them and
+    portfolio-wide queries gather every shard. Runs on the SHARD_DATABASES shards if set, otherwise
+    on the second shard database `manage.py test` adds.
+    """
+    databases = '__all__'
+
+    def register(self, phone_number):
+        response = APIClient().post("/api/register/", {
+            "first_name": "Shard", "last_name": phone_number, "age": 30,
+            "phone_number": phone_number, "monthly_salary": 60000,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.json()["id"]
+
+    def test_customers_and_loans_stay_on_their_shard(self):
+        customer_ids = [self.register(f"80000000{number:02d}") for number in range(8)]
+        shards = {shard_for_id(customer_id) for customer_id in customer_ids}
+        self.assertGreater(len(shards), 1)
+        for customer_id in customer_ids:
+            self.assertEqual(
+                [Customer.objects.using(shard).filter(id=customer_id).exists() for shard in settings.SHARDS],
+                [shard == shard_for_id(customer_id) for shard in settings.SHARDS],
+            )
+
+        customer_id = customer_ids[0]
+        payload = {"customer_id": customer_id, "loan_amount": 50000, "interest_rate": 14, "tenure": 12}
+        loan_id = APIClient().post("/api/create-loan/", payload, format='json').json()["loan_id"]
+        self.assertEqual(shard_for_id(loan_id), shard_for_id(customer_id))
+        self.assertTrue(Loan.objects.using(shard_for_id(customer_id)).filter(id=loan_id).exists())
+        self.assertEqual(len(APIClient().get(f"/api/view-loan-customer/{customer_id}/").json()), 1)
+        self.assertEqual(APIClient().get(f"/api/view-loan/{loan_id}/").json()["customer"]["customer_id"], customer_id)
+
+        summary = post_repayments([pd.DataFrame({
+            "loan_id": [loan_id], "payment_date": [date.today()], "amount": [100000],
+        })])
+        self.assertEqual(summary["loans_updated"], 1)
+
+        response = APIClient().post("/api/register/bulk/", [
+            {"first_name": "Bulk", "last_name": str(number), "age": 30, "phone_number": f"81000000{number:02d}",
+             "monthly_salary": 60000}
+            for number in range(6)
+        ], format='json')
+        bulk_ids = [row["id"] for row in response.json()["results"]]
+        for bulk_id in bulk_ids:
+            self.assertTrue(Customer.objects.using(shard_for_id(bulk_id)).filter(id=bulk_id).exists())
+
+        snapshot = CustomerSnapshot.build()
+        self.assertEqual(snapshot.columns['customer_id'].tolist(), sorted(customer_ids + bulk_ids))
+        self.assertEqual(snapshot.lookup(customer_id).loan_count, 1)
+
+    def test_loan_ids_are_only_allocated_for_approved_loans(self):
+        customer_id = self.register("8200000001")
+        shard = shard_for_id(customer_id)
+        missing_id = customer_id + 100 * len(settings.SHARDS)
+        payload = {"customer_id": customer_id, "loan_amount": 5000000, "interest_rate": 14, "tenure": 12}
+        for path in ("/api/create-loan/", "/api/check-eligibility/"):
+            self.assertFalse(APIClient().post(path, payload, format='json').json()["loan_approved"])
+            response = APIClient().post(path, {**payload, "customer_id": missing_id}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(IdSequence.objects.using(shard).filter(name='core.loan').exists())
+
+        payload["loan_amount"] = 50000
+        loan_id = APIClient().post("/api/create-loan/", payload, format='json').json()["loan_id"]
+        self.assertEqual(IdSequence.objects.using(shard).get(name='core.loan').next_value, loan_id // len(settings.SHARDS) + 1)
+
+    def test_imported_ids_and_duplicate_phones(self):
+        customer_id = self.register("8100000000")
+        shard = shard_for_id(customer_id)
+        other = next(alias for alias in settings.SHARDS if alias != shard)
+        # A loan id from a file that points at another shard is still found.
+        loan_id = next(candidate for candidate in range(10_000, 10_100) if shard_for_id(candidate) == other)
+        Loan.objects.using(shard).create(
+            id=loan_id, customer_id=customer_id, loan_amount_paise=1000000, interest_rate_bp=1200, tenure=12,
+            monthly_installment_paise=calculate_emi_paise(1000000, 1200, 12), emis_paid_on_time=0,
+            approval_date=date.today(), end_date=date.today() + relativedelta(months=12)
+        )
+        self.assertEqual(APIClient().get(f"/api/view-loan/{loan_id}/").json()["loan_id"], loan_id)
+        self.assertGreater(allocate_ids(Loan, shard)[0], loan_id)
+
+        Customer.objects.using(other).create(
+            id=next(candidate for candidate in range(10_000, 10_100) if shard_for_id(candidate) == other),
+            first_name="Imported", last_name="Row", age=50, phone_number="8200000000",
+            monthly_salary=40000, approved_limit=1400000,
+        )
+        response = APIClient().post("/api/register/", {
+            "first_name": "Dup", "last_name": "Phone", "age": 30, "phone_number": "8200000000", "monthly_salary": 1,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class LoanOutboxTestCase(TestCase):
+    """
+    Creating a loan writes one outbox event with it; one drainer per shard delivers events in order and deletes them.
+    """
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            first_name="Out", last_name="Box", age=35, phone_number="7770001111",
+            monthly_salary=90000, approved_limit=3200000
+        )
+        self.payload = {"customer_id": self.customer.pk, "loan_amount": 60000, "interest_rate": 14, "tenure": 12}
+        while not LocalQueueSink.queue.empty():
+            LocalQueueSink.queue.get_nowait()
+
+    def test_loan_creation_records_an_event(self):
+        loan_ids = [APIClient().post(url, self.payload, format='json').json()["loan_id"]
+                    for url in ("/api/create-loan/", "/api/check-eligibility/")]
+        self.assertEqual(
+            [(event.topic, event.payload["loan_id"]) for event in OutboxEvent.objects.order_by('id')],
+            [(OutboxEvent.LOAN_CREATED, loan_id) for loan_id in loan_ids],
+        )
+        self.payload["loan_amount"] = 10**8
+        APIClient().post("/api/create-loan/", self.payload, format='json')
+        self.assertEqual(OutboxEvent.objects.count(), 2)
+
+    @override_settings(OUTBOX_SINK='core.outbox.LocalQueueSink', OUTBOX_BATCH_SIZE=2)
+    def test_drain_delivers_in_order(self):
+        for number in range(5):
+            OutboxEvent.objects.create(topic="test", key=str(number), payload={"n": number})
+        self.assertEqual(dispatch_outbox_events(), 5)
+        self.assertEqual([LocalQueueSink.queue.get_nowait()["payload"]["n"] for _ in range(5)], list(range(5)))
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_overlapping_drains_are_serialized(self):
+        for number in range(3):
+            OutboxEvent.objects.create(topic="test", key="1", payload={"n": number})
+        overlapping = []
+
+        def other_worker():
+            overlapping.append(drain_outbox(LocalQueueSink()))
+            connections.close_all()
+
+        class OverlappedSink(LocalQueueSink):
+            def send(self, events):
+                # Another worker's run starts while this batch is in flight
+                thread = threading.Thread(target=other_worker)
+                thread.start()
+                thread.join()
+                super().send(events)
+
+        self.assertEqual(drain_outbox(OverlappedSink(), batch_size=2), 3)
+        self.assertEqual(overlapping, [0, 0])
+        self.assertEqual([LocalQueueSink.queue.get_nowait()["payload"]["n"] for _ in range(3)], [0, 1, 2])
+
+    def test_failed_send_keeps_events(self):
+        class BrokenSink:
+            def send(self, events):
+                raise ConnectionError("sink down")
+
+        OutboxEvent.objects.create(topic="test", key="1", payload={})
+        with self.assertRaises(ConnectionError):
+            drain_outbox(BrokenSink())
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "events.jsonl")
+        self.assertEqual(drain_outbox(FileSink(path)), 1)
+        with open(path) as outbox_file:
+            self.assertEqual(json.loads(outbox_file.readline())["topic"], "test")
+
+
+class ExposureReportTestCase(TestCase):
+    """
+    The exposure report matches per-customer scoring and amortization, whatever the partitioning.
+    """
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.today = date(2025, 6, 15)
+        self.customers = [
+            Customer.objects.create(
+                first_name="Risk", last_name=str(number), age=40, phone_number=f"955000000{number}",
+                monthly_salary=100000, approved_limit=3600000
+            )
+            for number in range(3)
+        ]
+        amount, rate, tenure = 1200000, 1200, 24
+        self.loan = Loan.objects.create(
+            customer=self.customers[0], loan_amount_paise=amount * 100, interest_rate_bp=rate, tenure=tenure,
+            monthly_installment_paise=calculate_emi_paise(amount * 100, rate, tenure), emis_paid_on_time=9,
+            approval_date=date(2024, 9, 15), end_date=date(2026, 9, 15)
+        )
+        Loan.objects.create(
+            customer=self.customers[0], loan_amount_paise=5000000, interest_rate_bp=1000, tenure=12,
+            monthly_installment_paise=calculate_emi_paise(5000000, 1000, 12), emis_paid_on_time=12,
+            approval_date=date(2023, 1, 10), end_date=date(2024, 1, 10)
+        )
+        LoanHistorySummary.objects.create(
+            customer=self.customers[1], loan_count=3, total_loan_amount_paise=400000000, total_emis_paid=30, total_tenure=36
+        )
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_report_rows(self):
+        output = os.path.join(self.tmpdir.name, "exposure.csv")
+        summary = build_exposure_report(output, partitions=2, chunk_size=1, today=self.today)
+        self.assertEqual(summary["customers"], 3)
+        self.assertEqual(os.listdir(self.tmpdir.name), ["exposure.csv"])
+
+        report = pd.read_csv(output).set_index("customer_id")
+        self.assertEqual(report.index.tolist(), [customer.pk for customer in self.customers])
+        row = report.loc[self.customers[0].pk]
+        # 15 of 24 installments are left in June 2025, so 9 have been due.
+        schedule = amortization_schedule(1200000, 12.0, 24)
+        self.assertAlmostEqual(row["outstanding_principal"], schedule.balance[8], delta=1)
+        self.assertEqual(row["running_loans"], 1)
+        self.assertEqual(row["monthly_emi"], self.loan.monthly_installment)
+        self.assertAlmostEqual(row["emi_to_salary"], self.loan.monthly_installment / 100000, places=4)
+        for customer in self.customers:
+            self.assertEqual(report.loc[customer.pk, "credit_score"], calculate_credit_score(customer))
+        self.assertEqual(report["score_band"].tolist(), ["A", "D", "A"])
+
+    def test_vectorized_scores_match(self):
+        rng = np.random.default_rng(7)
+        columns = [rng.integers(0, high, 500) for high in (5_000_000, 12, 10**9, 200, 400, 3)]
+        expected = [credit_score_from_aggregates(*map(int, values)) for values in zip(*columns)]
+        self.assertEqual(credit_scores(*columns).tolist(), expected)
+
+
+class WarmupReadinessTestCase(TestCase):
+    """
+    Warm-up records a timing per step; /readyz/ holds traffic back until it has run when enabled.
+    """
+    # Warm-up and /readyz/ connect to every configured alias.
+    databases = '__all__'
+
+    def tearDown(self):
+        warmup.report.started_at = warmup.report.finished_at = None
+
+    def test_warm_up_times_every_step(self):
+        report = warmup.warm_up().as_dict()
+        self.assertTrue(report["finished"])
+        self.assertEqual(list(report["steps_ms"]), [name for name, _ in warmup.STEPS])
+        self.assertEqual(report["errors"], {})
+
+    @override_settings(WARMUP_ON_START=True)
+    def test_ready_only_after_warm_up(self):
+        client = APIClient()
+        self.assertEqual(client.get("/healthz/").status_code, 200)
+        response = client.get("/readyz/")
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.json()["ready"])
+
+        warmup.warm_up()
+        body = client.get("/readyz/").json()
+        self.assertTrue(body["ready"])
+        self.assertEqual(list(body["databases"]), list(settings.DATABASES))
+        self.assertIsNotNone(client.get("/healthz/").json()["warmup"]["total_ms"])
+
+    def test_ready_without_warm_up(self):
+        self.assertEqual(APIClient().get("/api/readyz/").status_code, 200)
+
+
+class SamplingProfilerTestCase(SimpleTestCase):
+    """
+    Slow or explicitly requested requests leave collapsed-stack and speedscope profiles behind, with rotation.
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.factory = RequestFactory()
+
+    def slow_view(self, request):
+        time.sleep(0.05)
+        return HttpResponse("ok")
+
+    def profiles(self):
+        return sorted(os.listdir(self.directory))
+
+    @override_settings(PROFILING_ENABLED=False, PROFILING_ALLOW_HEADER=False)
+    def test_disabled_middleware_is_not_loaded(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            SamplingProfilerMiddleware(self.slow_view)
+
+    def test_threshold_and_rotation(self):
+        with self.settings(PROFILING_ENABLED=True, PROFILING_THRESHOLD_MS=20, PROFILING_INTERVAL_MS=1,
+                           PROFILING_DIR=self.directory, PROFILING_KEEP=2):
+            middleware = SamplingProfilerMiddleware(self.slow_view)
+            for _ in range(3):
+                middleware(self.factory.get("/api/check-eligibility/"))
+            SamplingProfilerMiddleware(lambda request: HttpResponse())(self.factory.get("/api/fast/"))
+        profiles = self.profiles()
+        self.assertEqual(len(profiles), 4)
+        folded = [name for name in profiles if name.endswith(".folded")][0]
+        with open(os.path.join(self.directory, folded)) as profile_file:
+            self.assertIn("slow_view", profile_file.read())
+        speedscope = [name for name in profiles if name.endswith(".speedscope.json")][0]
+        with open(os.path.join(self.directory, speedscope)) as profile_file:
+            self.assertEqual(json.load(profile_file)["profiles"][0]["type"], "sampled")
+
+    def test_signed_header(self):
+        with self.settings(PROFILING_ENABLED=False, PROFILING_ALLOW_HEADER=True, PROFILING_THRESHOLD_MS=10000,
+                           PROFILING_INTERVAL_MS=1, PROFILING_DIR=self.directory, PROFILING_FORMATS=["collapsed"]):
+            middleware = SamplingProfilerMiddleware(self.slow_view)
+            forged = middleware(self.factory.get("/api/check-eligibility/", HTTP_X_PROFILE_TOKEN="profile:forged"))
+            self.assertNotIn("X-Profile", forged)
+            response = middleware(self.factory.get("/api/check-eligibility/", HTTP_X_PROFILE_TOKEN=sign_profile_token()))
+        self.assertEqual(self.profiles(), [response["X-Profile"] + ".folded"])
+
+
+class BulkRepaymentTestCase(TestCase):
+    """
+    Repayments are aggregated per loan and month and only on-time installments raise `emis_paid_on_time`.
+    """
+    def setUp(self):
+        customer = Customer.objects.create(
+            first_name="Pay", last_name="Er", age=36, phone_number="1110001111",
+            monthly_salary=70000, approved_limit=2500000
+        )
+        self.loan = Loan.objects.create(
+            customer=customer, loan_amount=12000, interest_rate=0, tenure=12,
+            monthly_installment=1000, emis_paid_on_time=0,
+            approval_date=date(2024, 1, 15), end_date=date(2025, 1, 15)
+        )
+        self.rows = [
+            {"loan_id": self.loan.pk, "payment_date": "2024-02-10", "amount": 1000},
+            {"loan_id": self.loan.pk, "payment_date": "2024-03-10", "amount": 600},
+            {"loan_id": self.loan.pk, "payment_date": "2024-03-14", "amount": 400},
+            {"loan_id": self.loan.pk, "payment_date": "2024-04-20", "amount": 1000},
+            {"loan_id": self.loan.pk, "payment_date": "2024-05-02", "amount": 500},
+            {"loan_id": self.loan.pk, "payment_date": "not a date", "amount": 1000},
+            {"loan_id": 999999, "payment_date": "2024-02-10", "amount": 1000},
+            {"loan_id": self.loan.pk, "payment_date": "2024-06-10", "amount": "inf"},
+        ]
+
+    def test_bulk_endpoint(self):
+        response = APIClient().post("/api/repayments/bulk/", self.rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.json()
+        self.assertEqual(
+            {key: body[key] for key in ("rows", "rejected", "unknown_loans", "loans_updated", "on_time", "late", "underpaid")},
+            {"rows": 8, "rejected": 2, "unknown_loans": 1, "loans_updated": 1, "on_time": 2, "late": 1, "underpaid": 1}
+        )
+        self.assertEqual(body["rejected_rows"], [5, 7])
+        self.loan.refresh_from_db()
+        self.assertEqual(self.loan.emis_paid_on_time, 2)
+        self.assertEqual(APIClient().post("/api/repayments/bulk/", {"loan_id": 1}, format='json').status_code, 400)
+
+    def test_rejected_rows_with_an_idempotency_key(self):
+        rows = self.rows[:1] + [
+            {"loan_id": self.loan.pk, "payment_date": "2024-03-10", "amount": 1e300},
+            {"loan_id": 1e30, "payment_date": "2024-03-10", "amount": 1000},
+        ]
+        client = APIClient()
+        response = client.post("/api/repayments/bulk/", rows, format='json', HTTP_IDEMPOTENCY_KEY="repay-1")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["rejected_rows"], [1, 2])
+        replay = client.post("/api/repayments/bulk/", rows, format='json', HTTP_IDEMPOTENCY_KEY="repay-1")
+        self.assertEqual(replay.json(), response.json())
+        self.loan.refresh_from_db()
+        self.assertEqual(self.loan.emis_paid_on_time, 1)
+
+    def test_file_task_combines_chunks_and_runs_once(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as repayment_file:
+            pd.DataFrame(self.rows[:3]).rename(
+                columns={"loan_id": "Loan ID", "payment_date": "Payment Date", "amount": "Amount"}
+            ).to_csv(repayment_file, index=False)
+        self.addCleanup(os.remove, repayment_file.name)
+
+        # March's two payments land in different chunks and still make one on-time installment.
+        summary = post_repayments(read_repayment_file(repayment_file.name, chunk_size=2))
+        self.assertEqual(summary["on_time"], 2)
+        Loan.objects.filter(pk=self.loan.pk).update(emis_paid_on_time=0)
+
+        self.assertEqual(post_repayment_file(repayment_file.name)["loans_updated"], 1)
+        self.assertIsNone(post_repayment_file(repayment_file.name))
+        self.loan.refresh_from_db()
+        self.assertEqual(self.loan.emis_paid_on_time, 2)
@@ -1,12 +1,23 @@
-from django.urls import path
-from . import views
-from .views import register_customer_view, CheckEligibilityView, CreateLoanView , ViewLoanBy_ID , ViewLoansBY_CustomerID
-
-urlpatterns = [
-    path('', views.home, name='home'),    
-    path('register/', register_customer_view.as_view(), name='register_customer'),
-    path('check-eligibility/', CheckEligibilityView.as_view(), name='check_eligibility'),
-    path('create-loan/', CreateLoanView.as_view(), name='create_loan'),
-    path('view-loan/<int:loan_id>/', ViewLoanBy_ID.as_view(), name='view_loan'),
-    path('view-loan-customer/<int:customer_id>/', ViewLoansBY_CustomerID.as_view(), name='view_loan_customerID')
+from django.urls import path
+from . import views
+from .views import register_customer_view, BulkRegisterCustomerView, CheckEligibilityView, CheckEligibilityAsyncView, JobStatusView, CreateLoanView , ViewLoanBy_ID , ViewLoansBY_CustomerID, LoanScheduleView, SimulateLoanView, BulkRepaymentView, MaxEligibleView, IngestUploadView, IngestJobStatusView, HealthView, ReadyView
+
+urlpatterns = [
+    path('', views.home, name='home'),    
+    path('healthz/', HealthView.as_view(), name='healthz'),
+    path('readyz/', ReadyView.as_view(), name='readyz'),
+    path('register/', register_customer_view.as_view(), name='register_customer'),
+    path('register/bulk/', BulkRegisterCustomerView.as_view(), name='bulk_register_customers'),
+    path('check-eligibility/', CheckEligibilityView.as_view(), name='check_eligibility'),
+    path('customers/<int:customer_id>/max-eligible/', MaxEligibleView.as_view(), name='max_eligible'),
+    path('check-eligibility/async/', CheckEligibilityAsyncView.as_view(), name='check_eligibility_async'),
+    path('jobs/<uuid:job_id>/', JobStatusView.as_view(), name='job_status'),
+    path('create-loan/', CreateLoanView.as_view(), name='create_loan'),
+    path('view-loan/<int:loan_id>/', ViewLoanBy_ID.as_view(), name='view_loan'),
+    path('view-loan-customer/<int:customer_id>/', ViewLoansBY_CustomerID.as_view(), name='view_loan_customerID'),
+    path('loans/<int:loan_id>/schedule/', LoanScheduleView.as_view(), name='loan_schedule'),
+    path('simulate/', SimulateLoanView.as_view(), name='simulate_loans'),
+    path('repayments/bulk/', BulkRepaymentView.as_view(), name='bulk_repayments'),
+    path('ingest/', IngestUploadView.as_view(), name='ingest_upload'),
+    path('ingest/<uuid:job_id>/', IngestJobStatusView.as_view(), name='ingest_job_status'),
 ]
\ No newline at end of file
@@ -1,45 +1,234 @@
-from datetime import date
-
-def calculate_emi(principal, annual_rate, tenure_months):
-    if principal <= 0 or annual_rate < 0 or tenure_months <= 0:
-        raise ValueError("Invalid input values.")
-
-    if annual_rate == 0:
-        return round(principal / tenure_months, 2)
-
-    try:
-        monthly_rate = (annual_rate / 12) / 100
-        emi = (principal * monthly_rate * (1 + monthly_rate) ** tenure_months) / \
-              ((1 + monthly_rate) ** tenure_months - 1)
-        return round(emi, 2)
-    except OverflowError:
-        raise ValueError("Interest rate or tenure too large.")
-
-def calculate_credit_score(customer):
-    loans = customer.loans.all()
-    total_loan_outstanding = sum(loan.loan_amount for loan in loans)
-    if total_loan_outstanding>customer.approved_limit:
-        return 0
-    if not loans.exists():
-        return 100
-    
-    score = 0
-
-    total_emi_paid = sum([loan.emis_paid_on_time for loan in loans])
-    total_emi_expected = sum([loan.tenure for loan in loans])
-    emi_score = (total_emi_paid / total_emi_expected * 100) if total_emi_expected > 0 else 0
-    score += emi_score
-
-    loan_count = loans.count()
-    loan_count_score = min(loan_count * 4, 100)
-    score += loan_count_score
-
-    current_year = date.today().year
-    current_year_loans = loans.filter(approval_date__year=current_year).count()
-    score += min(current_year_loans * 10, 20)
-
-    total_volume = sum([loan.loan_amount for loan in loans])
-    volume_score = min(total_volume / 100000, 20)
-    score += volume_score
-
-    return round(score)
+import math
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+import numpy as np
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+def calculate_emi(principal, annual_rate, tenure_months):
+    if principal <= 0 or annual_rate < 0 or tenure_months <= 0:
+        raise ValueError("Invalid input values.")
+
+    if annual_rate == 0:
+        return round(principal / tenure_months, 2)
+
+    try:
+        monthly_rate = (annual_rate / 12) / 100
+        emi = (principal * monthly_rate * (1 + monthly_rate) ** tenure_months) / \
+              ((1 + monthly_rate) ** tenure_months - 1)
+        return round(emi, 2)
+    except OverflowError:
+        raise ValueError("Interest rate or tenure too large.")
+
+# Money is stored in paise and rates in basis points (hundredths of a percent); see Loan.
+MINOR_UNITS = 100
+# Monthly rate denominator in basis points: 12 months x 100 percent x 100 bp.
+MONTHLY_RATE_BASE = 12 * 100 * MINOR_UNITS
+MAX_TENURE_MONTHS = 1200
+# Highest annual interest rate, in percent, accepted from requests and loan files.
+MAX_INTEREST_RATE = 100
+# Largest values the IntegerField / BigIntegerField columns (and int64 arrays) hold.
+MAX_INT = 2**31 - 1
+MAX_BIGINT = 2**63 - 1
+
+def to_minor_units(value):
+    """
+    Rupees to paise, or percent to basis points, rounding half up on the decimal value given.
+    """
+    if value is None:
+        return None
+    return int((Decimal(str(value)) * MINOR_UNITS).to_integral_value(rounding=ROUND_HALF_UP))
+
+@lru_cache(maxsize=4096)
+def _annuity_factor(rate_bp, tenure_months):
+    """
+    r*(1+r)^n / ((1+r)^n - 1) with r = rate_bp / MONTHLY_RATE_BASE, as an exact (numerator, denominator) pair.
+    """
+    if rate_bp == 0:
+        return 1, tenure_months
+    growth = (MONTHLY_RATE_BASE + rate_bp) ** tenure_months
+    numerator = rate_bp * growth
+    denominator = MONTHLY_RATE_BASE * (growth - MONTHLY_RATE_BASE ** tenure_months)
+    divisor = math.gcd(numerator, denominator)
+    return numerator // divisor, denominator // divisor
+
+def calculate_emi_paise(principal_paise, rate_bp, tenure_months):
+    """
+    EMI in paise for a principal in paise and an annual rate in basis points, computed with exact
+    integer arithmetic and rounded half up. Equals `calculate_emi` on the same terms up to its float error.
+    The rate/tenure factor is cached, so loans sharing terms only pay for one multiplication.
+    """
+    if principal_paise <= 0 or rate_bp < 0 or tenure_months <= 0:
+        raise ValueError("Invalid input values.")
+    if tenure_months > MAX_TENURE_MONTHS:
+        raise ValueError("Interest rate or tenure too large.")
+
+    numerator, denominator = _annuity_factor(rate_bp, tenure_months)
+    return (2 * principal_paise * numerator + denominator) // (2 * denominator)
+
+def max_principal_paise(emi_paise, rate_bp, tenure_months):
+    """
+    Largest principal in paise whose `calculate_emi_paise` installment does not exceed `emi_paise`;
+    the exact inverse of its half-up rounding, so the quoted amount never fails the EMI check.
+    """
+    if tenure_months <= 0 or rate_bp < 0:
+        raise ValueError("Invalid input values.")
+    if tenure_months > MAX_TENURE_MONTHS:
+        raise ValueError("Interest rate or tenure too large.")
+    if emi_paise <= 0:
+        return 0
+
+    # round(P * n / d) <= E  <=>  2 * P * n < d * (2E + 1)
+    numerator, denominator = _annuity_factor(rate_bp, tenure_months)
+    return (denominator * (2 * emi_paise + 1) - 1) // (2 * numerator)
+
+def calculate_approved_limit(monthly_salary):
+    """
+    36x monthly salary rounded to the nearest lakh. Accepts a scalar or a NumPy array of salaries.
+    """
+    if isinstance(monthly_salary, np.ndarray):
+        return (np.round(monthly_salary * 36 / 100000) * 100000).astype(np.int64)
+    return round((monthly_salary * 36) / 100000) * 100000
+
+def credit_score_from_aggregates(approved_limit, loan_count, total_loan_amount_paise, total_emis_paid,
+                                 total_tenure, current_year_loans):
+    if total_loan_amount_paise > approved_limit * MINOR_UNITS:
+        return 0
+    if loan_count == 0:
+        return 100
+
+    score = 0
+
+    emi_score = (total_emis_paid / total_tenure * 100) if total_tenure > 0 else 0
+    score += emi_score
+
+    loan_count_score = min(loan_count * 4, 100)
+    score += loan_count_score
+
+    score += min(current_year_loans * 10, 20)
+
+    volume_score = min(total_loan_amount_paise / (100000 * MINOR_UNITS), 20)
+    score += volume_score
+
+    return round(score)
+
+def calculate_credit_score(customer):
+    totals = customer.loans.aggregate(
+        loan_count=Count('id'),
+        total_loan_amount_paise=Coalesce(Sum('loan_amount_paise'), 0),
+        total_emis_paid=Coalesce(Sum('emis_paid_on_time'), 0),
+        total_tenure=Coalesce(Sum('tenure'), 0),
+        current_year_loans=Count('id', filter=Q(approval_date__year=date.today().year)),
+    )
+    # Archived loans only contribute through their per-customer summary
+    try:
+        history = customer.loan_history
+    except ObjectDoesNotExist:
+        history = None
+    if history is not None:
+        totals['loan_count'] += history.loan_count
+        totals['total_loan_amount_paise'] += history.total_loan_amount_paise
+        totals['total_emis_paid'] += history.total_emis_paid
+        totals['total_tenure'] += history.total_tenure
+    return credit_score_from_aggregates(customer.approved_limit, **totals)
+
+AMORTIZATION_CACHE_SIZE = 4096
+
+AmortizationSchedule = namedtuple(
+    'AmortizationSchedule', ['installment', 'interest', 'principal', 'balance']
+)
+
+@lru_cache(maxsize=AMORTIZATION_CACHE_SIZE)
+def amortization_schedule(principal, annual_rate, tenure_months):
+    """
+    Month-by-month schedule for a loan repaid with the `calculate_emi` installment.
+
+    Balances come from the closed form B_k = P(1+r)^k - EMI((1+r)^k - 1)/r for every month at once,
+    and the last installment absorbs the rounding of the EMI so the loan closes at zero. Results are
+    cached per (principal, annual_rate, tenure_months) and returned as read-only arrays.
+    """
+    emi = calculate_emi(principal, annual_rate, tenure_months)
+    monthly_rate = (annual_rate / 12) / 100
+    months = np.arange(1, tenure_months + 1)
+
+    if monthly_rate == 0:
+        balance = principal - emi * months
+    else:
+        growth = (1 + monthly_rate) ** months
+        balance = principal * growth - emi * (growth - 1) / monthly_rate
+    opening = np.concatenate(([principal], balance[:-1]))
+    interest = opening * monthly_rate
+    installment = np.full(tenure_months, emi)
+    installment[-1] = opening[-1] + interest[-1]
+    balance[-1] = 0.0
+
+    schedule = AmortizationSchedule(
+        installment=np.round(installment, 2),
+        interest=np.round(interest, 2),
+        principal=np.round(installment - interest, 2),
+        balance=np.round(np.maximum(balance, 0.0), 2),
+    )
+    for column in schedule:
+        column.flags.writeable = False
+    return schedule
+
+def simulate_loan(principal, annual_rate, tenure_months, month=0, prepayment=0, new_interest_rate=None,
+                  new_tenure=None):
+    """
+    What-if for a loan: after `month` installments, pay `prepayment` off the balance and/or move to
+    `new_interest_rate` and a total tenure of `new_tenure` months, then re-amortize what is left.
+    """
+    if not 0 <= month < tenure_months:
+        raise ValueError("month must be between 0 and the loan tenure.")
+    baseline = amortization_schedule(principal, annual_rate, tenure_months)
+    baseline_interest = float(baseline.interest.sum())
+
+    outstanding = principal if month == 0 else float(baseline.balance[month - 1])
+    remaining_balance = round(outstanding - prepayment, 2)
+    rate = annual_rate if new_interest_rate is None else new_interest_rate
+    remaining_months = (tenure_months if new_tenure is None else new_tenure) - month
+    if remaining_months <= 0:
+        raise ValueError("new_tenure must be longer than the months already paid.")
+
+    interest_paid = float(baseline.interest[:month].sum())
+    if remaining_balance <= 0:
+        scenario = None
+        total_interest = interest_paid
+        total_months = month
+        monthly_installment = 0.0
+    else:
+        scenario = amortization_schedule(remaining_balance, rate, remaining_months)
+        total_interest = interest_paid + float(scenario.interest.sum())
+        total_months = month + remaining_months
+        monthly_installment = float(scenario.installment[0])
+
+    return {
+        "baseline": {
+            "monthly_installment": float(baseline.installment[0]),
+            "total_interest": round(baseline_interest, 2),
+            "total_months": tenure_months,
+        },
+        "scenario": {
+            "outstanding_before": round(outstanding, 2),
+            "remaining_balance": max(remaining_balance, 0.0),
+            "monthly_installment": monthly_installment,
+            "total_interest": round(total_interest, 2),
+            "total_months": total_months,
+            "interest_saved": round(baseline_interest - total_interest, 2),
+        },
+        "schedule": scenario,
+    }
+
+def schedule_rows(schedule, first_month=1):
+    if schedule is None:
+        return []
+    return [
+        {"month": month, "installment": installment, "interest": interest, "principal": principal, "balance": balance}
+        for month, installment, interest, principal, balance in zip(
+            range(first_month, first_month + len(schedule.installment)),
+            *(column.tolist() for column in schedule),
+        )
+    ]
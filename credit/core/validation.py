@@ -0,0 +1,205 @@
+"""
+Column-at-a-time validation of customer and loan files before they are loaded.
+
+Every check is a boolean mask over a whole DataFrame (or one chunk of it), so a bad value costs a
+comparison rather than an exception deep in the ORM. Rows failing any check are returned with a
+`Reason` listing every failed check and their file row number, for the rejected-rows report;
+the remaining rows come back converted to model field values, ready for bulk loading.
+"""
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+
+from .models import Customer
+from .sharding import scatter_gather
+from .utils import MAX_BIGINT, MAX_INT, MAX_INTEREST_RATE, MAX_TENURE_MONTHS, MINOR_UNITS
+
+CUSTOMER_COLUMNS = ['Customer ID', 'First Name', 'Last Name', 'Age', 'Phone Number', 'Monthly Salary', 'Approved Limit']
+LOAN_COLUMNS = [
+    'Customer ID', 'Loan ID', 'Loan Amount', 'Tenure', 'Interest Rate', 'Monthly payment',
+    'EMIs paid on Time', 'Date of Approval', 'End Date',
+]
+NAME_MAX_LENGTH = 30
+PHONE_MAX_DIGITS = 15
+AGE_RANGE = (18, 100)
+LOOKUP_BATCH_SIZE = 5000
+# Bounds that keep every value within its column once converted (ids and paise are int64).
+MAX_ID = MAX_BIGINT
+MAX_RUPEES = MAX_BIGINT / MINOR_UNITS
+
+
+def require_columns(df, columns):
+    missing = [column for column in columns if column not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+
+def whole_numbers(series):
+    """
+    The column as floats, with NaN wherever a value is missing, not numeric or not a whole number.
+    """
+    numbers = pd.to_numeric(series, errors='coerce').astype('float64')
+    return numbers.where(numbers % 1 == 0)
+
+
+def to_minor_units(series):
+    """
+    Vectorized `utils.to_minor_units`; rounding to 6 places first keeps 1.005 * 100 at 100.5.
+    """
+    return np.floor(np.round(series * MINOR_UNITS, 6) + 0.5).astype('int64')
+
+
+def file_rows(df):
+    """
+    1-based row numbers in the source file, counting the header, for an index of 0-based data rows.
+    """
+    return df.index + 2
+
+
+def split_rows(df, checks):
+    """
+    Apply `checks` ({reason: invalid mask}) and return the valid rows and the rejected rows with
+    `Row` and `Reason` columns.
+    """
+    failed = pd.DataFrame(checks, index=df.index).fillna(True).astype(bool)
+    invalid = failed.any(axis=1)
+    rejected = df[invalid].copy()
+    rejected.insert(0, 'Row', file_rows(rejected))
+    rejected['Reason'] = failed[invalid].dot(failed.columns + '; ').str.rstrip('; ')
+    return df[~invalid], rejected
+
+
+def known_customer_ids():
+    """
+    Every customer id on every shard, fetched once so loan rows can be checked with one `isin`.
+    """
+    ids = scatter_gather(lambda shard: list(
+        Customer.objects.using(shard).values_list('id', flat=True).iterator(chunk_size=LOOKUP_BATCH_SIZE)
+    ))
+    return pd.Index(list(itertools.chain.from_iterable(ids)), dtype='int64')
+
+
+def phone_owners(phone_numbers):
+    """
+    Customer id registered on any shard for each of the given phone numbers, as a Series.
+    """
+    phone_numbers = list(phone_numbers)
+
+    def shard_owners(shard):
+        rows = []
+        for start in range(0, len(phone_numbers), LOOKUP_BATCH_SIZE):
+            batch = phone_numbers[start:start + LOOKUP_BATCH_SIZE]
+            rows.extend(Customer.objects.using(shard).filter(phone_number__in=batch).values_list('phone_number', 'id'))
+        return rows
+
+    rows = itertools.chain.from_iterable(scatter_gather(shard_owners))
+    return pd.Series(dict(rows), dtype='int64')
+
+
+def validate_customers(df):
+    """
+    Split customer rows into valid ones, as Customer field values, and rejected ones. Checks types
+    and ranges, repeated ids and phone numbers within `df`, and phone numbers already registered
+    to a different customer.
+    """
+    require_columns(df, CUSTOMER_COLUMNS)
+    customer_id = whole_numbers(df['Customer ID'])
+    age = whole_numbers(df['Age'])
+    phone = whole_numbers(df['Phone Number'])
+    phone = phone.where(phone.gt(0) & phone.lt(10 ** PHONE_MAX_DIGITS))
+    salary = pd.to_numeric(df['Monthly Salary'], errors='coerce')
+    limit = pd.to_numeric(df['Approved Limit'], errors='coerce')
+    first_name = df['First Name'].astype('string').str.strip()
+    last_name = df['Last Name'].astype('string').str.strip()
+
+    phone_text = phone.astype('Int64').astype('string')
+    has_phone = phone.notna()
+    owners = phone_owners(phone_text[has_phone].unique()).reindex(phone_text.to_numpy())
+    owners.index = df.index
+
+    valid, rejected = split_rows(df, {
+        'invalid Customer ID': ~(customer_id.gt(0) & customer_id.lt(MAX_ID)),
+        'repeated Customer ID': customer_id.duplicated() & customer_id.notna(),
+        'invalid First Name': ~first_name.str.len().between(1, NAME_MAX_LENGTH),
+        'invalid Last Name': ~last_name.str.len().between(1, NAME_MAX_LENGTH),
+        'Age out of range': ~age.between(*AGE_RANGE),
+        'invalid Phone Number': ~has_phone,
+        'repeated Phone Number': phone.duplicated() & phone.notna(),
+        'Phone Number belongs to another customer': owners.notna() & owners.ne(customer_id),
+        'invalid Monthly Salary': ~salary.between(0, MAX_INT),
+        'invalid Approved Limit': ~limit.between(0, MAX_INT),
+    })
+    clean = pd.DataFrame({
+        'id': customer_id[valid.index].astype('int64'),
+        'first_name': first_name[valid.index],
+        'last_name': last_name[valid.index],
+        'age': age[valid.index].astype('int64'),
+        'phone_number': phone_text[valid.index],
+        'monthly_salary': salary[valid.index].round().astype('int64'),
+        'approved_limit': limit[valid.index].round().astype('int64'),
+    })
+    return clean, rejected
+
+
+def validate_loans(df, customer_ids):
+    """
+    Split loan rows into valid ones, as Loan field values, and rejected ones. Checks types and
+    ranges, repeated loan ids within `df`, that the customer is in `customer_ids` (see
+    `known_customer_ids`) and that the end date falls after the approval date.
+    """
+    require_columns(df, LOAN_COLUMNS)
+    loan_id = whole_numbers(df['Loan ID'])
+    customer_id = whole_numbers(df['Customer ID'])
+    amount = pd.to_numeric(df['Loan Amount'], errors='coerce')
+    tenure = whole_numbers(df['Tenure'])
+    rate = pd.to_numeric(df['Interest Rate'], errors='coerce')
+    installment = pd.to_numeric(df['Monthly payment'], errors='coerce')
+    paid_on_time = whole_numbers(df['EMIs paid on Time'])
+    approval_date = pd.to_datetime(df['Date of Approval'], errors='coerce')
+    end_date = pd.to_datetime(df['End Date'], errors='coerce')
+
+    valid, rejected = split_rows(df, {
+        'invalid Loan ID': ~(loan_id.gt(0) & loan_id.lt(MAX_ID)),
+        'repeated Loan ID': loan_id.duplicated() & loan_id.notna(),
+        'invalid Customer ID': ~(customer_id.gt(0) & customer_id.lt(MAX_ID)),
+        'unknown customer': customer_id.gt(0) & ~customer_id.isin(customer_ids),
+        'invalid Loan Amount': ~(amount.gt(0) & amount.lt(MAX_RUPEES)),
+        'Tenure out of range': ~tenure.between(1, MAX_TENURE_MONTHS),
+        'Interest Rate out of range': ~rate.between(0, MAX_INTEREST_RATE),
+        'invalid Monthly payment': ~(installment.ge(0) & installment.lt(MAX_RUPEES)),
+        'EMIs paid on Time out of range': ~paid_on_time.between(0, tenure.fillna(-1)),
+        'invalid Date of Approval': approval_date.isna(),
+        'invalid End Date': end_date.isna(),
+        'End Date not after Date of Approval': end_date.le(approval_date),
+    })
+    clean = pd.DataFrame({
+        'id': loan_id[valid.index].astype('int64'),
+        'customer_id': customer_id[valid.index].astype('int64'),
+        'loan_amount_paise': to_minor_units(amount[valid.index]),
+        'tenure': tenure[valid.index].astype('int64'),
+        'interest_rate_bp': to_minor_units(rate[valid.index]),
+        'monthly_installment_paise': to_minor_units(installment[valid.index]),
+        'emis_paid_on_time': paid_on_time[valid.index].astype('int64'),
+        'approval_date': approval_date[valid.index].dt.date,
+        'end_date': end_date[valid.index].dt.date,
+    })
+    return clean, rejected
+
+
+class RejectedRowsReport:
+    """
+    CSV of rejected rows with their file row number and reasons, appended to chunk by chunk and
+    only created once there is something to report.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+
+    def write(self, rejected):
+        if rejected.empty:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        rejected.to_csv(self.path, mode='a' if self.rows else 'w', header=not self.rows, index=False)
+        self.rows += len(rejected)
@@ -1,401 +1,772 @@
-from django.shortcuts import render
-from django.http import HttpResponse
-from rest_framework import status
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from .serializers import CustomerSerializer
-from .models import Customer, Loan
-import math
-from datetime import datetime, timedelta
-from .utils import calculate_credit_score, calculate_emi 
-# Create your views here.
-
-def home(request):
-    return HttpResponse("Welcome to the Credit App Home Page!")
-
-class register_customer_view(APIView):
-    """
-    API view for registering a new customer.
-
-    POST:
-        Expects customer data in the request body.
-        Validates the data using CustomerSerializer.
-        If valid, creates and returns the new customer data with HTTP 201 status.
-        If invalid, returns validation errors with HTTP 400 status.
-    """
-    def post(self, request):
-        serializer = CustomerSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-
-
-class CheckEligibilityView(APIView):
-    """
-    CheckEligibilityView(APIView)
-    -----------------------------
-    POST /check-eligibility/
-    This API endpoint checks a customer's eligibility for a loan based on their credit score, salary, and requested loan parameters. It also applies business rules to approve, reject, or adjust the loan offer.
-    Request Body:
-        - customer_id (int, required): The unique identifier of the customer applying for the loan.
-        - loan_amount (float, required): The amount of loan requested.
-        - interest_rate (float, required): The interest rate requested for the loan.
-        - tenure (int, required): The tenure (in months) for the loan.
-    Process:
-        1. Validates that all required fields are present in the request.
-        2. Retrieves the customer by customer_id. Returns 404 if not found.
-        3. Validates the format of loan_amount, interest_rate, and tenure.
-        4. Calculates the customer's credit score.
-        5. Computes the sum of existing EMIs for the customer.
-        6. Calculates the EMI for the new loan request.
-        7. If total EMIs (existing + new) exceed 50% of the customer's monthly salary, the loan is rejected.
-        8. Applies approval rules based on credit score:
-            - If credit score > 50: Loan is approved at requested interest rate.
-            - If 30 < credit score <= 50: Loan is approved if interest_rate >= 12%, else interest rate is corrected to 12%.
-            - If 10 < credit score <= 30: Loan is approved if interest_rate >= 16%, else interest rate is corrected to 16%.
-            - If credit score <= 10: Loan is rejected.
-        9. If approved, creates a new Loan record with the appropriate parameters and returns the loan_id.
-        10. Returns a response with the approval status, message, and calculated monthly installment.
-    Responses:
-        - 200 OK: Returns loan approval status, message, loan_id (if approved), and monthly installment.
-        - 400 Bad Request: Missing or invalid fields in the request.
-        - 404 Not Found: Customer does not exist.
-        - 500 Internal Server Error: Error occurred while creating the loan record.
-    Response Example (Success):
-        {
-            "loan_id": 123,
-            "customer_id": 1,
-            "loan_approved": true,
-            "message": "Loan approved",
-            "monthly_installment": 2500.0
-        }
-    Response Example (Rejected):
-        {
-            "loan_id": null,
-            "customer_id": 1,
-            "loan_approved": false,
-            "monthly_installment": 3000.0
-        }
-    """
-    def post(self, request):
-        try:
-            customer_id = request.data.get('customer_id')
-            loan_amount = request.data.get('loan_amount')
-            interest_rate = request.data.get('interest_rate')
-            tenure = request.data.get('tenure')
-            
-            # Check for missing required fields
-            missing_fields = []
-            if not customer_id:
-                missing_fields.append('customer_id')
-            if not loan_amount:
-                missing_fields.append('loan_amount')
-            if not interest_rate:
-                missing_fields.append('interest_rate')
-            if not tenure:
-                missing_fields.append('tenure')
-            
-            if missing_fields:
-                return Response({
-                    "error": f"Missing required fields: {', '.join(missing_fields)}",
-                    "received_data": dict(request.data) if hasattr(request.data, 'items') else str(request.data)
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            customer = Customer.objects.get(id=customer_id)
-        except Customer.DoesNotExist:
-            return Response({
-                "error": f"Customer with id {customer_id} does not exist"
-            }, status=status.HTTP_404_NOT_FOUND)
-        except ValueError:
-            return Response({
-                "error": "Invalid customer_id format"
-            }, status=status.HTTP_400_BAD_REQUEST)
-
-        try:
-            loan_amount = float(loan_amount)
-            interest_rate = float(interest_rate)
-            tenure = int(tenure)
-        except (ValueError, TypeError):
-            return Response({
-                "error": "Invalid loan_amount, interest_rate, or tenure format"
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        credit_score = calculate_credit_score(customer)
-        
-        # Calculate existing EMIs
-        existing_loans = Loan.objects.filter(customer=customer)
-        existing_emis = sum([
-            calculate_emi(loan.interest_rate, loan.loan_amount, loan.tenure)
-            for loan in existing_loans
-        ])
-        
-        new_emi = calculate_emi(interest_rate, loan_amount, tenure)
-
-        # Hard reject if EMIs exceed 50% of salary
-        if (existing_emis + new_emi) > (0.5 * customer.monthly_salary):
-            return Response({
-                "loan_id": None,
-                "customer_id": customer.pk,
-                "loan_approved": False,
-                "message": "Loan not approved: EMI exceeds 50% of monthly salary",
-                "monthly_installment": new_emi
-            }, status=status.HTTP_200_OK)
-
-        # Apply approval rules
-        loan_approved = False
-        corrected_interest_rate = interest_rate
-        message = ""
-        loan_id = None
-
-        if credit_score > 50:
-            loan_approved = True
-            message = "Loan approved"
-        elif 30 < credit_score <= 50:
-            if interest_rate >= 12:
-                loan_approved = True
-                message = "Loan approved"
-            else:
-                corrected_interest_rate = 12
-                new_emi = calculate_emi(corrected_interest_rate, loan_amount, tenure)
-                loan_approved = True
-                message = f"Loan approved with corrected interest rate: {corrected_interest_rate}%"
-        elif 10 < credit_score <= 30:
-            if interest_rate >= 16:
-                loan_approved = True
-                message = "Loan approved"
-            else:
-                corrected_interest_rate = 16
-                new_emi = calculate_emi(corrected_interest_rate, loan_amount, tenure)
-                loan_approved = True
-                message = f"Loan approved with corrected interest rate: {corrected_interest_rate}%"
-        else:
-            loan_approved = False
-            message = f"Loan not approved: Credit score too low ({credit_score})"
-
-        # If loan is approved, create the loan record and get loan_id
-        if loan_approved:
-            try:
-                final_interest_rate = corrected_interest_rate if corrected_interest_rate != interest_rate else interest_rate
-                final_emi = calculate_emi(final_interest_rate, loan_amount, tenure)
-                
-                # We need to set approval_date and end_date for the loan
-                from datetime import date, timedelta
-                from dateutil.relativedelta import relativedelta
-                
-                approval_date = date.today()
-                end_date = approval_date + relativedelta(months=tenure)
-                
-                loan = Loan.objects.create(
-                    customer=customer,
-                    loan_amount=loan_amount,
-                    interest_rate=final_interest_rate,
-                    tenure=tenure,
-                    monthly_installment=final_emi,
-                    emis_paid_on_time=0,  # Start with 0
-                    approval_date=approval_date,
-                    end_date=end_date
-                )
-                loan_id = loan.pk
-                new_emi = final_emi
-            except Exception as e:
-                return Response({
-                    "loan_id": None,
-                    "customer_id": customer.pk,
-                    "loan_approved": False,
-                    "message": f"Error creating loan: {str(e)}",
-                    "monthly_installment": new_emi
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        return Response({
-            "loan_id": loan_id,
-            "customer_id": customer.pk,
-            "loan_approved": loan_approved,
-            "message": message,
-            "monthly_installment": new_emi
-        }, status=status.HTTP_200_OK)
-    
-
-class CreateLoanView(APIView):
-    """
-    APIView for creating a new loan for a customer.
-    POST:
-        Creates a loan for a customer based on their credit score, salary, and requested loan details.
-        The loan approval process includes:
-            - Validating the existence of the customer.
-            - Calculating the customer's credit score.
-            - Summing up existing EMIs and ensuring the new EMI does not exceed 50% of the customer's monthly salary.
-            - Adjusting the interest rate and approval status based on the credit score:
-                - Credit score > 50: Approve at requested interest rate.
-                - 30 < Credit score <= 50: Approve if interest rate >= 12%, otherwise adjust to 12%.
-                - 10 < Credit score <= 30: Approve if interest rate >= 16%, otherwise adjust to 16%.
-                - Credit score <= 10: Reject or adjust interest rate to at least 20%.
-            - Creating the loan if approved, or returning a rejection message.
-    Request Data:
-        - customer_id (int): ID of the customer applying for the loan.
-        - loan_amount (float): Requested loan amount.
-        - interest_rate (float): Requested interest rate.
-        - tenure (int): Loan tenure in months.
-    Responses:
-        - 201 Created: Loan approved and created. Returns loan details.
-        - 200 OK: Loan not approved. Returns reason and calculated EMI.
-        - 400 Bad Request: Invalid data format.
-        - 404 Not Found: Customer does not exist.
-    Returns:
-        JSON response with loan approval status, message, and EMI details.
-    """
-    def post(self, request):
-        try:
-            customer = Customer.objects.get(id=request.data['customer_id'])
-        except Customer.DoesNotExist:
-            return Response({
-                "error": f"Customer with id {request.data['customer_id']} does not exist"
-            }, status=status.HTTP_404_NOT_FOUND)
-        
-        loan_amount = float(request.data['loan_amount'])
-        interest_rate = float(request.data['interest_rate'])
-        tenure = int(request.data['tenure'])
-
-        credit_score = calculate_credit_score(customer)
-
-        try:
-            existing_emis = sum([
-                calculate_emi(loan.loan_amount, loan.interest_rate, loan.tenure)
-                for loan in Loan.objects.filter(customer=customer)
-            ])
-            new_emi = calculate_emi(loan_amount, interest_rate, tenure)
-        except ValueError as e:
-            return Response({
-                "error": f"Invalid data format: {str(e)}"
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        if (existing_emis + new_emi) > (0.5 * customer.monthly_salary):
-            return Response({
-                "loan_id": None,
-                "customer_id": customer.pk,
-                "loan_approved": False,
-                "message": "EMI exceeds 50% of monthly salary",
-                "monthly_installment": new_emi
-            }, status=200)
-        
-        approval = False
-        corrected_interest_rate = interest_rate
-
-        if credit_score > 50:
-            approval = True
-        elif 30 < credit_score <= 50:
-            approval = interest_rate >= 12
-            corrected_interest_rate = max(interest_rate, 12)
-        elif 10 < credit_score <= 30:
-            approval = interest_rate >= 16
-            corrected_interest_rate = max(interest_rate, 16)
-        else:
-            approval = False
-            corrected_interest_rate = max(interest_rate, 20)
-
-        corrected_emi = calculate_emi(loan_amount, corrected_interest_rate, tenure)
-
-        if approval:
-            # Loan approved – create it
-            loan = Loan.objects.create(
-                customer=customer,
-                loan_amount=loan_amount,
-                interest_rate=corrected_interest_rate,
-                tenure=tenure,
-                monthly_installment=corrected_emi,
-                emis_paid_on_time=0,
-                approval_date=datetime.today().date(),
-                end_date=(datetime.today() + timedelta(days=30*tenure)).date()
-            )
-
-            return Response({
-                "loan_id": loan.pk,
-                "customer_id": customer.pk,
-                "loan_approved": True,
-                "message": "Loan approved",
-                "monthly_installment": corrected_emi
-            }, status=201)
-
-        else:
-            return Response({
-                "loan_id": None,
-                "customer_id": customer.pk,
-                "loan_approved": False,
-                "message": "Loan not approved due to low credit score",
-                "monthly_installment": corrected_emi
-            }, status=200)
-
-class ViewLoanBy_ID(APIView):
-
-    def get(self,request, loan_id):
-        try:
-            loan = Loan.objects.get(id=loan_id)
-        except Loan.DoesNotExist:
-            return Response({
-                "error": "Loan not found"
-            })
-        
-        customer = loan.customer
-
-        return Response({
-            "loan_id": loan_id,
-            "customer": {
-                "customer_id": customer.pk,
-                "first_name": customer.first_name,
-                "last_name": customer.last_name,
-                "phone_number": customer.phone_number,
-                "age": customer.age
-            },
-            "loan_amount": loan.loan_amount,
-            "interest_rate": loan.interest_rate,
-            "monthly_installment": calculate_emi(loan.loan_amount, loan.interest_rate, loan.tenure),
-            "tenure": loan.tenure
-        }, status=status.HTTP_200_OK)
-
-
-class ViewLoansBY_CustomerID(APIView):
-    """
-    API view to retrieve all loans associated with a specific customer by their ID.
-    GET:
-        Retrieves a list of loans for the customer with the given customer_id.
-        Each loan entry includes:
-            - loan_id: Unique identifier of the loan.
-            - loan_amount: The principal amount of the loan.
-            - interest_rate: The interest rate applied to the loan.
-            - monthly_installment: The calculated EMI (Equated Monthly Installment) for the loan.
-            - repayments_left: Number of monthly repayments remaining until the loan end date.
-    Path Parameters:
-        customer_id (int): The unique identifier of the customer.
-    Responses:
-        200 OK:
-            Returns a list of loans with their details for the specified customer.
-        404 Not Found:
-            Returned if the customer with the given ID does not exist.
-    Raises:
-        Customer.DoesNotExist: If no customer is found with the provided customer_id.
-    """
-    def get(self, request, customer_id):
-        try:
-            customer = Customer.objects.get(id=customer_id)
-        except Customer.DoesNotExist:
-            return Response({"error": "Customer not found."}, status=status.HTTP_404_NOT_FOUND)
-        
-        loans = Loan.objects.filter(customer=customer)
-
-        loans_data = []
-        for loan in loans:
-            today = datetime.today()
-            repayments_left = max(0,(loan.end_date.year-today.year)*12+(loan.end_date.month - today.month))
-
-            loans_data.append({
-                "loan_id": loan.pk,
-                "loan_amount": loan.loan_amount,
-                "interest_rate": loan.interest_rate,
-                "monthly_installment": calculate_emi(loan.loan_amount, loan.interest_rate, loan.tenure),
-                "repayments_left": repayments_left
-            })
-
-        return Response(loans_data,status=status.HTTP_200_OK)    
-
-
+from django.shortcuts import render
+from django.http import HttpResponse
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from .serializers import CustomerSerializer, BulkCustomerSerializer, LoanSimulationSerializer, MaxEligibleQuerySerializer
+from .models import Customer, Loan, LoanArchive, EligibilityJob, IngestionJob
+import math
+from datetime import date, datetime, timedelta
+from dateutil.relativedelta import relativedelta
+from .snapshot import customer_aggregates
+from .utils import MINOR_UNITS, calculate_credit_score, calculate_emi_paise, to_minor_units, amortization_schedule, simulate_loan, schedule_rows
+from .idempotency import idempotent
+from .conditional import conditional, loan_detail_version, loan_list_version
+from .admission import TokenBucketThrottle, limit_concurrency
+from .eligibility import check_eligibility, max_eligible_quote, parse_loan_terms
+from .tasks import process_ingestion_job, score_eligibility
+from .repayments import REQUIRED_COLUMNS, post_repayments
+from .outbox import record_loan_created
+from .warmup import check_databases, report as warmup_report
+from .sharding import all_shards_atomic, allocate_ids, loan_shards, scatter_gather, shard_atomic, shard_for_id
+import os
+import pandas as pd
+# Create your views here.
+
+def wants_history(request):
+    """
+    True when the client asked for archived loans with `?include_history=true`.
+    """
+    return request.query_params.get('include_history', '').lower() in ('1', 'true', 'yes')
+
+LOAN_LIST_FIELDS = ('id', 'loan_amount_paise', 'interest_rate_bp', 'tenure', 'end_date')
+LOAN_DETAIL_FIELDS = (
+    'loan_amount_paise', 'interest_rate_bp', 'tenure', 'customer_id', 'customer__first_name',
+    'customer__last_name', 'customer__phone_number', 'customer__age',
+)
+
+def loan_list_payload(rows, today, archived=None):
+    """
+    Loan list entries from `values_list(*LOAN_LIST_FIELDS)` tuples, without instantiating models.
+    EMIs come from the cached integer path, so loans sharing terms share one computation.
+    `archived` adds the flag to every entry.
+    """
+    this_month = today.year * 12 + today.month
+    payload = []
+    for loan_id, amount, rate, tenure, end_date in rows:
+        entry = {
+            "loan_id": loan_id,
+            "loan_amount": amount / MINOR_UNITS,
+            "interest_rate": rate / MINOR_UNITS,
+            "monthly_installment": calculate_emi_paise(amount, rate, tenure) / MINOR_UNITS,
+            "repayments_left": 0 if archived else max(0, end_date.year * 12 + end_date.month - this_month),
+        }
+        if archived is not None:
+            entry["archived"] = archived
+        payload.append(entry)
+    return payload
+
+def loan_detail_payload(loan_id, row):
+    """
+    Loan detail response from a `values_list(*LOAN_DETAIL_FIELDS)` tuple.
+    """
+    loan_amount, interest_rate, tenure, customer_id, first_name, last_name, phone_number, age = row
+    return {
+        "loan_id": loan_id,
+        "customer": {
+            "customer_id": customer_id,
+            "first_name": first_name,
+            "last_name": last_name,
+            "phone_number": phone_number,
+            "age": age
+        },
+        "loan_amount": loan_amount / MINOR_UNITS,
+        "interest_rate": interest_rate / MINOR_UNITS,
+        "monthly_installment": calculate_emi_paise(loan_amount, interest_rate, tenure) / MINOR_UNITS,
+        "tenure": tenure
+    }
+
+def home(request):
+    return HttpResponse("Welcome to the Credit App Home Page!")
+
+class HealthView(APIView):
+    """
+    Liveness probe: answers 200 whenever the worker can serve a request, without touching the
+    database, and reports the start-up warm-up timings (see core/warmup.py).
+    """
+    def get(self, request):
+        return Response({"status": "ok", "warmup": warmup_report.as_dict()}, status=status.HTTP_200_OK)
+
+
+class ReadyView(APIView):
+    """
+    Readiness probe for the load balancer.
+    GET:
+        Returns `ready` with the warm-up timings and the `SELECT 1` round trip (ms) or error per
+        database. Not ready while WARMUP_ON_START is set and warm-up has not finished, or while
+        any database fails to answer.
+    Responses:
+        200 OK: Ready for traffic.
+        503 Service Unavailable: Not ready.
+    """
+    def get(self, request):
+        databases_ok, databases = check_databases()
+        ready = databases_ok and (warmup_report.finished or not settings.WARMUP_ON_START)
+        return Response(
+            {"ready": ready, "warmup": warmup_report.as_dict(), "databases": databases},
+            status=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+
+
+class register_customer_view(APIView):
+    """
+    API view for registering a new customer.
+
+    POST:
+        Expects customer data in the request body.
+        Validates the data using CustomerSerializer.
+        If valid, creates and returns the new customer data with HTTP 201 status.
+        If invalid, returns validation errors with HTTP 400 status.
+    """
+    def post(self, request):
+        serializer = CustomerSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+
+class BulkRegisterCustomerView(APIView):
+    """
+    API view for registering many customers in one request.
+
+    POST:
+        Expects a JSON list of customer objects (same fields as /register/, at most 10000).
+        Rows are validated individually; phone numbers are checked against the database with a
+        single IN query, approved limits are computed for the whole batch at once, and the valid
+        rows are inserted with one bulk_create (one per shard when sharded, committed together).
+        Returns `created`/`failed` counts and a per-row `results` list, in request order, holding
+        either the new customer `id` or the row's `errors`.
+        201 Created if at least one customer was created, 400 if none were, and 409 if a phone
+        number was registered concurrently while the batch was being inserted.
+    """
+    def post(self, request):
+        serializer = BulkCustomerSerializer(data=request.data, many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            with all_shards_atomic():
+                customers = serializer.save()
+        except IntegrityError:
+            return Response({
+                "error": "A phone number in this batch was registered concurrently; retry the batch."
+            }, status=status.HTTP_409_CONFLICT)
+
+        row_errors = serializer.row_errors
+        results = [{"index": index, "id": customer.pk} for index, customer in zip(serializer.row_indexes, customers)]
+        results += [{"index": index, "errors": errors} for index, errors in row_errors.items()]
+        results.sort(key=lambda row: row["index"])
+
+        return Response({
+            "created": len(customers),
+            "failed": len(row_errors),
+            "results": results
+        }, status=status.HTTP_201_CREATED if customers else status.HTTP_400_BAD_REQUEST)
+
+
+class BulkRepaymentView(APIView):
+    """
+    API view for posting many loan repayments at once.
+
+    POST:
+        Expects a JSON list of {"loan_id", "payment_date", "amount"} objects (at most 100000; use
+        the `post_repayment_file` Celery task for daily files). Payments are aggregated per loan
+        and month, each month's installment is classified as on time, late or underpaid against
+        the loan's due day, and on-time installments are added to `emis_paid_on_time` with one
+        set-based UPDATE per batch of loans. The whole request is applied in one transaction;
+        send an `Idempotency-Key` header to make retries safe.
+        Returns counts of rows, rejected rows (with the first 100 indexes), unknown loans, loans
+        updated and on-time/late/underpaid installments.
+    Responses:
+        - 200 OK: Repayments posted.
+        - 400 Bad Request: The body is not a list of repayment objects.
+    """
+    MAX_ROWS = 100000
+
+    @idempotent
+    def post(self, request):
+        rows = request.data
+        if not isinstance(rows, list) or not rows or not all(isinstance(row, dict) for row in rows):
+            return Response({"error": "Expected a non-empty list of repayment objects"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > self.MAX_ROWS:
+            return Response({"error": f"At most {self.MAX_ROWS} repayments per request"}, status=status.HTTP_400_BAD_REQUEST)
+        df = pd.DataFrame.from_records(rows, columns=REQUIRED_COLUMNS)
+        with all_shards_atomic():
+            summary = post_repayments([df])
+        return Response(summary, status=status.HTTP_200_OK)
+
+
+class CheckEligibilityView(APIView):
+    """
+    CheckEligibilityView(APIView)
+    -----------------------------
+    POST /check-eligibility/
+    This API endpoint checks a customer's eligibility for a loan based on their credit score, salary, and requested loan parameters. It also applies business rules to approve, reject, or adjust the loan offer.
+    Request Body:
+        - customer_id (int, required): The unique identifier of the customer applying for the loan.
+        - loan_amount (float, required): The amount of loan requested.
+        - interest_rate (float, required): The interest rate requested for the loan.
+        - tenure (int, required): The tenure (in months) for the loan.
+    Process:
+        1. Validates that all required fields are present in the request.
+        2. Retrieves the customer by customer_id. Returns 404 if not found.
+        3. Validates the format of loan_amount, interest_rate, and tenure.
+        4. Calculates the customer's credit score.
+        5. Computes the sum of existing EMIs for the customer.
+           Steps 2, 4 and 5 read the in-memory customer snapshot (core.snapshot) when it is enabled,
+           and otherwise run a single aggregate query.
+        6. Calculates the EMI for the new loan request.
+        7. If total EMIs (existing + new) exceed 50% of the customer's monthly salary, the loan is rejected.
+        8. Applies approval rules based on credit score:
+            - If credit score > 50: Loan is approved at requested interest rate.
+            - If 30 < credit score <= 50: Loan is approved if interest_rate >= 12%, else interest rate is corrected to 12%.
+            - If 10 < credit score <= 30: Loan is approved if interest_rate >= 16%, else interest rate is corrected to 16%.
+            - If credit score <= 10: Loan is rejected.
+        9. If approved, creates a new Loan record with the appropriate parameters and returns the loan_id.
+        10. Returns a response with the approval status, message, and calculated monthly installment.
+    Idempotency:
+        Send an `Idempotency-Key` header to make retries safe: the first response for a key is stored
+        and replayed for later requests with the same key, without re-scoring or creating another loan.
+    Admission control:
+        Rate limited per client (core.admission.TokenBucketThrottle) and shed when too many scoring
+        requests are already in flight (core.admission.limit_concurrency).
+    Responses:
+        - 200 OK: Returns loan approval status, message, loan_id (if approved), and monthly installment.
+        - 400 Bad Request: Missing or invalid fields in the request.
+        - 404 Not Found: Customer does not exist.
+        - 429 Too Many Requests: The client exceeded its rate limit; see `Retry-After`.
+        - 500 Internal Server Error: Error occurred while creating the loan record.
+        - 503 Service Unavailable: Too many scoring requests in progress; see `Retry-After`.
+    Response Example (Success):
+        {
+            "loan_id": 123,
+            "customer_id": 1,
+            "loan_approved": true,
+            "message": "Loan approved",
+            "monthly_installment": 2500.0
+        }
+    Response Example (Rejected):
+        {
+            "loan_id": null,
+            "customer_id": 1,
+            "loan_approved": false,
+            "monthly_installment": 3000.0
+        }
+    """
+    throttle_classes = [TokenBucketThrottle]
+
+    @limit_concurrency
+    @idempotent
+    def post(self, request):
+        body, status_code = check_eligibility(request.data)
+        return Response(body, status=status_code)
+    
+
+class MaxEligibleView(APIView):
+    """
+    API view quoting the largest loan a customer can be approved for.
+    GET /customers/<customer_id>/max-eligible/?interest_rate=10&tenure=12,24,36
+        Inverts the EMI formula instead of probing /check-eligibility/ with smaller and smaller
+        amounts. The headroom is 50% of the monthly salary minus the customer's current EMIs, and
+        the rate is the requested one raised to the score band's floor (12% for scores 31-50, 16%
+        for 11-30). Customers are read from the snapshot when enabled; nothing is written.
+    Query Parameters:
+        interest_rate (float, required): Requested annual interest rate in percent.
+        tenure (int, required): Tenure in months; repeat it or separate values with commas to quote
+            up to 60 tenures in one call.
+    Responses:
+        200 OK: The headroom, the rate used and one quote per tenure with `max_loan_amount` and its
+                `monthly_installment`. `eligible` is false, with a message, when the credit score is
+                too low or there is no headroom left.
+        400 Bad Request: Missing or invalid query parameters.
+        404 Not Found: Customer does not exist.
+    Response Example:
+        {
+            "customer_id": 1,
+            "credit_score": 42,
+            "current_emis": 12000.0,
+            "emi_headroom": 13000.0,
+            "interest_rate": 12.0,
+            "eligible": true,
+            "quotes": [{"tenure": 12, "max_loan_amount": 146316.06, "monthly_installment": 13000.0}],
+            "message": "Eligible at corrected interest rate: 12%"
+        }
+    """
+    def get(self, request, customer_id):
+        serializer = MaxEligibleQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        aggregates = customer_aggregates(customer_id)
+        if aggregates is None:
+            return Response({"error": f"Customer with id {customer_id} does not exist"}, status=status.HTTP_404_NOT_FOUND)
+
+        query = serializer.validated_data
+        body = max_eligible_quote(aggregates, to_minor_units(query['interest_rate']), query['tenure'])
+        return Response(body, status=status.HTTP_200_OK)
+
+
+class CheckEligibilityAsyncView(APIView):
+    """
+    Queue a /check-eligibility/ request for the Celery worker pool instead of scoring it in the web worker.
+
+    POST:
+        Accepts the same body as /check-eligibility/ and records an EligibilityJob. The scoring task is
+        enqueued once the job row is committed. Returns 202 Accepted with the `job_id` and a `Location`
+        header pointing at /jobs/<job_id>/. Supports the `Idempotency-Key` header, so a retried submit
+        returns the original job instead of queueing a second one.
+    """
+    @idempotent
+    def post(self, request):
+        data = request.data.dict() if hasattr(request.data, 'dict') else request.data
+        job = EligibilityJob.objects.create(request_data=data)
+        transaction.on_commit(lambda: score_eligibility.delay(str(job.pk)))
+
+        response = Response({
+            "job_id": str(job.pk),
+            "status": job.status
+        }, status=status.HTTP_202_ACCEPTED)
+        response['Location'] = f"/api/jobs/{job.pk}/"
+        return response
+
+
+class JobStatusView(APIView):
+    """
+    API view reporting the state of a queued eligibility job.
+    GET:
+        Returns the job `status` (pending, running, done or failed). Once done, `result` holds the
+        /check-eligibility/ response body and `status_code` its HTTP status.
+    Responses:
+        200 OK: Job state.
+        404 Not Found: Unknown job id.
+    """
+    def get(self, request, job_id):
+        try:
+            job = EligibilityJob.objects.get(pk=job_id)
+        except EligibilityJob.DoesNotExist:
+            return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            "job_id": str(job.pk),
+            "status": job.status,
+            "status_code": job.status_code,
+            "result": job.result,
+            "created_at": job.created_at,
+            "finished_at": job.finished_at
+        }, status=status.HTTP_200_OK)
+
+
+class IngestUploadView(APIView):
+    """
+    API view for loading a customer or loan file without tying up a web worker.
+
+    POST:
+        Expects a multipart form with `file` (.xlsx or .csv, same columns as the Excel imports) and
+        `kind` ("customers" or "loans"). The upload is streamed to a temporary file rather than
+        held in memory, moved under INGEST_UPLOAD_DIR and recorded as an IngestionJob; the Celery
+        task then loads it INGEST_CHUNK_SIZE rows at a time. Returns 202 Accepted with the `job_id`
+        and a `Location` header pointing at /ingest/<job_id>/.
+    Responses:
+        - 202 Accepted: File stored and queued.
+        - 400 Bad Request: Missing file, unsupported file type or unknown kind.
+    """
+    EXTENSIONS = ('.csv', '.xlsx')
+
+    def post(self, request):
+        request._request.upload_handlers = [TemporaryFileUploadHandler(request._request)]
+        upload = request.FILES.get('file')
+        kind = request.data.get('kind')
+        if upload is None:
+            return Response({"error": "Upload a file in the `file` field"}, status=status.HTTP_400_BAD_REQUEST)
+        extension = os.path.splitext(upload.name)[1].lower()
+        if extension not in self.EXTENSIONS:
+            return Response({"error": "Only .csv and .xlsx files are supported"}, status=status.HTTP_400_BAD_REQUEST)
+        if kind not in dict(IngestionJob.KIND_CHOICES):
+            return Response({"error": "kind must be 'customers' or 'loans'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        job = IngestionJob(kind=kind, file_name=upload.name)
+        os.makedirs(settings.INGEST_UPLOAD_DIR, exist_ok=True)
+        job.path = os.path.join(settings.INGEST_UPLOAD_DIR, f"{job.pk}{extension}")
+        file_move_safe(upload.temporary_file_path(), job.path)
+        job.save()
+        transaction.on_commit(lambda: process_ingestion_job.delay(str(job.pk)))
+
+        response = Response({
+            "job_id": str(job.pk),
+            "status": job.status
+        }, status=status.HTTP_202_ACCEPTED)
+        response['Location'] = f"/api/ingest/{job.pk}/"
+        return response
+
+
+class IngestJobStatusView(APIView):
+    """
+    API view reporting the progress of an uploaded ingestion file.
+    GET:
+        Returns the job `status`, `total_rows` (counted before loading starts), `rows_processed`,
+        `rows_rejected` (see core.validation) with the path of the `rejected_report` CSV, the average
+        `rows_per_second` since loading started and `eta_seconds` at that rate.
+    Responses:
+        200 OK: Job state.
+        404 Not Found: Unknown job id.
+    """
+    def get(self, request, job_id):
+        try:
+            job = IngestionJob.objects.get(pk=job_id)
+        except IngestionJob.DoesNotExist:
+            return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        rows_per_second = eta_seconds = None
+        if job.started_at is not None:
+            elapsed = ((job.finished_at or timezone.now()) - job.started_at).total_seconds()
+            if job.rows_processed and elapsed > 0:
+                rows_per_second = round(job.rows_processed / elapsed, 1)
+            if job.status == IngestionJob.DONE:
+                eta_seconds = 0
+            elif rows_per_second and job.total_rows is not None:
+                eta_seconds = round(max(job.total_rows - job.rows_processed, 0) / rows_per_second, 1)
+
+        return Response({
+            "job_id": str(job.pk),
+            "kind": job.kind,
+            "file_name": job.file_name,
+            "status": job.status,
+            "total_rows": job.total_rows,
+            "rows_processed": job.rows_processed,
+            "rows_rejected": job.rows_rejected,
+            "rejected_report": job.rejects_path or None,
+            "rows_per_second": rows_per_second,
+            "eta_seconds": eta_seconds,
+            "error": job.error or None,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at
+        }, status=status.HTTP_200_OK)
+
+
+class CreateLoanView(APIView):
+    """
+    APIView for creating a new loan for a customer.
+    POST:
+        Creates a loan for a customer based on their credit score, salary, and requested loan details.
+        The loan approval process includes:
+            - Validating the existence of the customer.
+            - Calculating the customer's credit score.
+            - Summing up existing EMIs and ensuring the new EMI does not exceed 50% of the customer's monthly salary.
+            - Adjusting the interest rate and approval status based on the credit score:
+                - Credit score > 50: Approve at requested interest rate.
+                - 30 < Credit score <= 50: Approve if interest rate >= 12%, otherwise adjust to 12%.
+                - 10 < Credit score <= 30: Approve if interest rate >= 16%, otherwise adjust to 16%.
+                - Credit score <= 10: Reject or adjust interest rate to at least 20%.
+            - Creating the loan if approved, or returning a rejection message.
+    Request Data:
+        - customer_id (int): ID of the customer applying for the loan.
+        - loan_amount (float): Requested loan amount.
+        - interest_rate (float): Requested interest rate.
+        - tenure (int): Loan tenure in months.
+    Responses:
+        - 201 Created: Loan approved and created. Returns loan details.
+        - 200 OK: Loan not approved. Returns reason and calculated EMI.
+        - 400 Bad Request: Invalid data format.
+        - 404 Not Found: Customer does not exist.
+        - 429 Too Many Requests / 503 Service Unavailable: Rate limited or shed, as for /check-eligibility/.
+    Idempotency:
+        An `Idempotency-Key` header makes retries replay the first response instead of creating another loan.
+    Sharding:
+        The checks and the insert run in one transaction on the customer's shard, with the customer
+        row locked, so concurrent requests for one customer cannot both pass the salary check.
+    Events:
+        A `loan.created` event is added to the transactional outbox in the same transaction
+        (core.outbox) and delivered to downstream systems by a background task.
+    Returns:
+        JSON response with loan approval status, message, and EMI details.
+    """
+    throttle_classes = [TokenBucketThrottle]
+
+    @limit_concurrency
+    @idempotent
+    def post(self, request):
+        try:
+            customer_id = int(request.data['customer_id'])
+        except (KeyError, TypeError, ValueError):
+            return Response({"error": "Invalid customer_id format"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            terms = parse_loan_terms(request.data)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        shard = shard_for_id(customer_id)
+        with shard_atomic(customer_id):
+            return self.create_loan(request, shard, customer_id, *terms)
+
+    def create_loan(self, request, shard, customer_id, loan_amount, interest_rate, tenure):
+        try:
+            customer = Customer.objects.using(shard).select_for_update().get(id=customer_id)
+        except Customer.DoesNotExist:
+            return Response({
+                "error": f"Customer with id {request.data['customer_id']} does not exist"
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        # Money in paise and rates in basis points (see Loan)
+        credit_score = calculate_credit_score(customer)
+
+        # Existing EMIs are the installments stored on the customer's loans, as in /check-eligibility/
+        # and the max-eligible quote, so an amount quoted there is approved here too.
+        existing_emis = customer.loans.aggregate(total=Coalesce(Sum('monthly_installment_paise'), 0))['total']
+        try:
+            new_emi = calculate_emi_paise(loan_amount, interest_rate, tenure)
+        except ValueError as e:
+            return Response({
+                "error": f"Invalid data format: {str(e)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if 2 * (existing_emis + new_emi) > customer.monthly_salary * MINOR_UNITS:
+            return Response({
+                "loan_id": None,
+                "customer_id": customer.pk,
+                "loan_approved": False,
+                "message": "EMI exceeds 50% of monthly salary",
+                "monthly_installment": new_emi / MINOR_UNITS
+            }, status=200)
+        
+        approval = False
+        corrected_interest_rate = interest_rate
+
+        if credit_score > 50:
+            approval = True
+        elif 30 < credit_score <= 50:
+            approval = interest_rate >= 1200
+            corrected_interest_rate = max(interest_rate, 1200)
+        elif 10 < credit_score <= 30:
+            approval = interest_rate >= 1600
+            corrected_interest_rate = max(interest_rate, 1600)
+        else:
+            approval = False
+            corrected_interest_rate = max(interest_rate, 2000)
+
+        corrected_emi = calculate_emi_paise(loan_amount, corrected_interest_rate, tenure)
+
+        if approval:
+            # Loan approved – create it
+            [loan_id] = allocate_ids(Loan, shard)
+            loan = Loan.objects.using(shard).create(
+                id=loan_id,
+                customer=customer,
+                loan_amount_paise=loan_amount,
+                interest_rate_bp=corrected_interest_rate,
+                tenure=tenure,
+                monthly_installment_paise=corrected_emi,
+                emis_paid_on_time=0,
+                approval_date=datetime.today().date(),
+                end_date=(datetime.today() + timedelta(days=30*tenure)).date()
+            )
+            record_loan_created(loan, shard)
+
+            return Response({
+                "loan_id": loan.pk,
+                "customer_id": customer.pk,
+                "loan_approved": True,
+                "message": "Loan approved",
+                "monthly_installment": corrected_emi / MINOR_UNITS
+            }, status=201)
+
+        else:
+            return Response({
+                "loan_id": None,
+                "customer_id": customer.pk,
+                "loan_approved": False,
+                "message": "Loan not approved due to low credit score",
+                "monthly_installment": corrected_emi / MINOR_UNITS
+            }, status=200)
+
+class ViewLoanBy_ID(APIView):
+    """
+    API view to retrieve a loan and its customer by loan ID.
+    Archived (closed) loans are only looked up with `?include_history=true`, in which case the
+    response also carries an `archived` flag.
+    Supports conditional GET: the ETag / Last-Modified come from the loan's and customer's
+    timestamps (core.conditional), so a client revalidating an unchanged loan gets 304.
+    """
+    @conditional(lambda request, loan_id: loan_detail_version(loan_id, wants_history(request)))
+    def get(self,request, loan_id):
+        history = wants_history(request)
+        row, archived = None, False
+        for shard in loan_shards(loan_id):
+            row = Loan.objects.using(shard).filter(id=loan_id).values_list(*LOAN_DETAIL_FIELDS).first()
+            if row is None and history:
+                row = LoanArchive.objects.using(shard).filter(id=loan_id).values_list(*LOAN_DETAIL_FIELDS).first()
+                archived = row is not None
+            if row is not None:
+                break
+        if row is None:
+            return Response({
+                "error": "Loan not found"
+            })
+
+        data = loan_detail_payload(loan_id, row)
+        if history:
+            data["archived"] = archived
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class ViewLoansBY_CustomerID(APIView):
+    """
+    API view to retrieve all loans associated with a specific customer by their ID.
+    GET:
+        Retrieves a list of loans for the customer with the given customer_id.
+        Each loan entry includes:
+            - loan_id: Unique identifier of the loan.
+            - loan_amount: The principal amount of the loan.
+            - interest_rate: The interest rate applied to the loan.
+            - monthly_installment: The calculated EMI (Equated Monthly Installment) for the loan.
+            - repayments_left: Number of monthly repayments remaining until the loan end date.
+    Path Parameters:
+        customer_id (int): The unique identifier of the customer.
+    Query Parameters:
+        include_history (bool): Also list archived (closed) loans, each with `archived: true`.
+            Without it only the hot `Loan` table is read.
+    Loans are read as `values_list` tuples rather than model instances, since customers with long
+    histories make this the largest response the API serves.
+    Conditional GET:
+        Responses carry an ETag and Last-Modified derived from the customer's loan count and latest
+        `updated_at` (see core.conditional). Clients polling with `If-None-Match` or
+        `If-Modified-Since` get 304 Not Modified after one version lookup, without the loans being read.
+        Large bodies are brotli- or gzip-compressed by core.middleware.CompressionMiddleware.
+    Responses:
+        200 OK:
+            Returns a list of loans with their details for the specified customer.
+        304 Not Modified:
+            The client's cached copy is current.
+        404 Not Found:
+            Returned if the customer with the given ID does not exist.
+    Raises:
+        Customer.DoesNotExist: If no customer is found with the provided customer_id.
+    """
+    @conditional(lambda request, customer_id: loan_list_version(customer_id, wants_history(request)))
+    def get(self, request, customer_id):
+        try:
+            customer = Customer.objects.using(shard_for_id(customer_id)).get(id=customer_id)
+        except Customer.DoesNotExist:
+            return Response({"error": "Customer not found."}, status=status.HTTP_404_NOT_FOUND)
+        
+        history = wants_history(request)
+        today = datetime.today()
+        loans_data = loan_list_payload(
+            list(customer.loans.values_list(*LOAN_LIST_FIELDS)),
+            today,
+            archived=False if history else None,
+        )
+        if history:
+            loans_data += loan_list_payload(
+                list(customer.archived_loans.values_list(*LOAN_LIST_FIELDS)),
+                today,
+                archived=True,
+            )
+
+        return Response(loans_data,status=status.HTTP_200_OK)
+
+
+class LoanScheduleView(APIView):
+    """
+    API view returning the full amortization schedule of a loan.
+    GET:
+        Returns the loan terms, how many installments have fallen due since the approval date,
+        and one row per month with the installment, its interest and principal split, and the
+        balance left after paying it. The schedule is computed in closed form and cached per
+        (loan_amount, interest_rate, tenure), so loans sharing terms share one computation.
+    Path Parameters:
+        loan_id (int): The unique identifier of the loan.
+    Responses:
+        200 OK: Loan terms and schedule.
+        404 Not Found: The loan does not exist.
+    """
+    def get(self, request, loan_id):
+        loan = None
+        for shard in loan_shards(loan_id):
+            loan = Loan.objects.using(shard).filter(id=loan_id).first()
+            if loan is not None:
+                break
+        if loan is None:
+            return Response({"error": "Loan not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        schedule = amortization_schedule(loan.loan_amount, loan.interest_rate, loan.tenure)
+        elapsed = relativedelta(date.today(), loan.approval_date)
+        payments_due = min(max(elapsed.years * 12 + elapsed.months, 0), loan.tenure)
+
+        return Response({
+            "loan_id": loan.pk,
+            "loan_amount": loan.loan_amount,
+            "interest_rate": loan.interest_rate,
+            "tenure": loan.tenure,
+            "monthly_installment": float(schedule.installment[0]),
+            "total_interest": round(float(schedule.interest.sum()), 2),
+            "payments_due": payments_due,
+            "schedule": schedule_rows(schedule),
+        }, status=status.HTTP_200_OK)
+
+
+class SimulateLoanView(APIView):
+    """
+    API view for what-if scenarios on one or many loans.
+    POST:
+        Accepts one scenario object or a list of them. Each scenario names an existing loan by
+        `loan_id`, or gives `loan_amount`, `interest_rate` and `tenure` directly, plus any of:
+            - month: installments already paid when the change applies (default 0).
+            - prepayment: amount paid off the outstanding balance at that point.
+            - new_interest_rate: rate for the remaining months.
+            - new_tenure: new total tenure in months.
+            - include_schedule: also return the re-amortized schedule.
+        Existing loans are fetched with one query; schedules come from the cached closed-form
+        amortization in core.utils.
+    Responses:
+        200 OK: A list with the baseline and scenario totals (installment, total interest,
+                months, interest saved) for each scenario, in request order.
+        400 Bad Request: Invalid scenario fields.
+        404 Not Found: A referenced loan does not exist.
+    """
+    def post(self, request):
+        items = request.data if isinstance(request.data, list) else [request.data]
+        serializer = LoanSimulationSerializer(data=items, many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        loan_ids = [item['loan_id'] for item in serializer.validated_data if 'loan_id' in item]
+        loans = {}
+        for shard_loans in scatter_gather(lambda shard: Loan.objects.using(shard).in_bulk(loan_ids)):
+            loans.update(shard_loans)
+        missing = sorted(set(loan_ids) - set(loans))
+        if missing:
+            return Response({"error": f"Loans not found: {missing}"}, status=status.HTTP_404_NOT_FOUND)
+
+        results = []
+        for item in serializer.validated_data:
+            if 'loan_id' in item:
+                loan = loans[item['loan_id']]
+                terms = (loan.loan_amount, loan.interest_rate, loan.tenure)
+            else:
+                terms = (item['loan_amount'], item['interest_rate'], item['tenure'])
+            try:
+                result = simulate_loan(
+                    *terms,
+                    month=item['month'],
+                    prepayment=item['prepayment'],
+                    new_interest_rate=item.get('new_interest_rate'),
+                    new_tenure=item.get('new_tenure'),
+                )
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            schedule = result.pop('schedule')
+            if item['include_schedule']:
+                result['schedule'] = schedule_rows(schedule, first_month=item['month'] + 1)
+            result['loan_id'] = item.get('loan_id')
+            results.append(result)
+
+        return Response(results, status=status.HTTP_200_OK)
+
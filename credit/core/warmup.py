@@ -0,0 +1,142 @@
+"""
+Worker warm-up and readiness.
+
+A fresh worker pays on its first requests for opening database connections, importing pandas and
+the rest of the view stack, building the URL resolver, DRF's lazily imported renderers and parsers
+and the model metadata serializers read, and connecting to the cache. With WARMUP_ON_START set,
+`CoreConfig.ready` does that work before the worker is given traffic and records how long each
+step took in `report`; /healthz/ shows the timings and /readyz/ answers 503 until warm-up has
+finished and every database answers, so a load balancer only routes to warmed workers.
+
+Connections belong to the thread that opens them: the ones opened here serve the thread that ran
+`ready()`, which is the request thread of a sync gunicorn worker. They are kept by CONN_MAX_AGE
+(with 0 Django closes them when the first request starts) and must not be opened in a parent that
+forks afterwards, so do not combine this with gunicorn's --preload.
+"""
+import importlib
+import time
+import warnings
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+WARM_MODULES = ('numpy', 'pandas', 'core.views', 'core.tasks')
+
+
+@dataclass
+class WarmupReport:
+    started_at: float = None
+    finished_at: float = None
+    steps: dict = field(default_factory=dict)
+    errors: dict = field(default_factory=dict)
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+    def as_dict(self):
+        return {
+            "enabled": settings.WARMUP_ON_START,
+            "finished": self.finished,
+            "total_ms": round((self.finished_at - self.started_at) * 1000, 1) if self.finished else None,
+            "steps_ms": self.steps,
+            "errors": self.errors,
+        }
+
+
+report = WarmupReport()
+
+
+def open_connections():
+    for alias in settings.DATABASES:
+        connections[alias].ensure_connection()
+
+
+def import_modules():
+    for module in WARM_MODULES:
+        importlib.import_module(module)
+
+
+def build_url_resolver():
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+    get_resolver().reverse_dict
+
+
+def prepare_serializers():
+    """
+    Resolve DRF's renderer and parser settings and build every serializer's fields once, which
+    imports DRF's field modules and fills the model _meta caches they read.
+    """
+    from rest_framework.settings import api_settings
+
+    from .renderers import ORJSONRenderer
+    from .serializers import BulkCustomerSerializer, CustomerSerializer, LoanSimulationSerializer, MaxEligibleQuerySerializer
+
+    api_settings.DEFAULT_RENDERER_CLASSES
+    api_settings.DEFAULT_PARSER_CLASSES
+    for serializer_class in (CustomerSerializer, BulkCustomerSerializer, LoanSimulationSerializer, MaxEligibleQuerySerializer):
+        serializer_class().fields
+    ORJSONRenderer().render({"warm": [1, 2.5, "three"]})
+
+
+def warm_caches():
+    """
+    Connect every configured cache and load the scoring snapshot if one is configured.
+    """
+    from .snapshot import get_snapshot
+
+    for alias in settings.CACHES:
+        caches[alias].get('core.warmup')
+    get_snapshot()
+
+
+STEPS = (
+    ('databases', open_connections),
+    ('imports', import_modules),
+    ('urls', build_url_resolver),
+    ('serializers', prepare_serializers),
+    ('caches', warm_caches),
+)
+
+
+def warm_up():
+    """
+    Run every warm-up step, timing each. A failing step is recorded and skipped rather than
+    stopping the worker from starting; /readyz/ still checks the databases on every call.
+    """
+    report.started_at = time.perf_counter()
+    report.steps.clear()
+    report.errors.clear()
+    with warnings.catch_warnings():
+        # Django warns about queries during app initialization because they usually run in every
+        # management command; this one is opt-in, and only loading the snapshot may query.
+        warnings.filterwarnings('ignore', message='Accessing the database during app initialization')
+        for name, step in STEPS:
+            started = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                report.errors[name] = str(e)
+            report.steps[name] = round((time.perf_counter() - started) * 1000, 1)
+    report.finished_at = time.perf_counter()
+    return report
+
+
+def check_databases():
+    """
+    Round-trip time in ms of `SELECT 1` on every database alias, or the error it raised.
+    """
+    results, healthy = {}, True
+    for alias in settings.DATABASES:
+        started = time.perf_counter()
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+            results[alias] = round((time.perf_counter() - started) * 1000, 1)
+        except Exception as e:
+            results[alias] = str(e)
+            healthy = False
+    return healthy, results
@@ -1,2 +1,2 @@
-from .celery import app as celery_app
+from .celery import app as celery_app
 __all__ = ['celery_app']
\ No newline at end of file
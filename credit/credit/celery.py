@@ -1,8 +1,8 @@
-import os
-from celery import Celery
-
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit.settings')
-
-app = Celery('credit')
-app.config_from_object('django.conf:settings', namespace='CELERY')
+import os
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit.settings')
+
+app = Celery('credit')
+app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
\ No newline at end of file
@@ -1,146 +1,300 @@
-"""
-Django settings for credit project.
-
-Generated by 'django-admin startproject' using Django 5.2.4.
-
-For more information on this file, see
-https://docs.djangoproject.com/en/5.2/topics/settings/
-
-For the full list of settings and their values, see
-https://docs.djangoproject.com/en/5.2/ref/settings/
-"""
-
-from pathlib import Path
-from token import NAME
-import os
-from decouple import config
-# Build paths inside the project like this: BASE_DIR / 'subdir'.
-BASE_DIR = Path(__file__).resolve().parent.parent
-
-
-# Quick-start development settings - unsuitable for production
-# See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
-
-# SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-*fu9plot*nziq&qgxn(@u+f9lgp76clxhbd9+ikx!#!3zbg!mb'
-
-# SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
-
-ALLOWED_HOSTS = []
-
-
-# Application definition
-
-INSTALLED_APPS = [
-    'django.contrib.admin',
-    'django.contrib.auth',
-    'django.contrib.contenttypes',
-    'django.contrib.sessions',
-    'django.contrib.messages',
-    'django.contrib.staticfiles',
-    'core',
-    'rest_framework',
-]
-
-MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
-]
-
-ROOT_URLCONF = 'credit.urls'
-
-TEMPLATES = [
-    {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
-        'APP_DIRS': True,
-        'OPTIONS': {
-            'context_processors': [
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
-            ],
-        },
-    },
-]
-
-WSGI_APPLICATION = 'credit.wsgi.application'
-
-
-# Database
-# https://docs.djangoproject.com/en/5.2/ref/settings/#databases
-
-DATABASES = {
-    'default': {
-        'ENGINE':'django.db.backends.postgresql',
-        'NAME': config('DB_NAME'),
-        'USER': config('DB_USER'),
-        'PASSWORD': config('DB_PASSWORD'),
-        'HOST': config('DB_HOST'),
-        'PORT': config('DB_PORT'),
-    }
-}
-
-
-# Password validation
-# https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
-
-AUTH_PASSWORD_VALIDATORS = [
-    {
-        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
-    },
-]
-
-
-# Internationalization
-# https://docs.djangoproject.com/en/5.2/topics/i18n/
-
-LANGUAGE_CODE = 'en-us'
-
-TIME_ZONE = 'UTC'
-
-USE_I18N = True
-
-USE_TZ = True
-
-
-# Static files (CSS, JavaScript, Images)
-# https://docs.djangoproject.com/en/5.2/howto/static-files/
-
-STATIC_URL = '/static/'
-STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
-
-# Media files
-MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-
-# Default primary key field type
-# https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
-
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
-
-# Celery Configuration
-# Using memory broker for development (not suitable for production)
-CELERY_TASK_ALWAYS_EAGER = True
-CELERY_TASK_EAGER_PROPAGATES = True
-CELERY_BROKER_URL = 'memory://'
-CELERY_RESULT_BACKEND = 'cache+memory://'
-CELERY_ACCEPT_CONTENT = ['json']
-CELERY_TASK_SERIALIZER = 'json'
-CELERY_RESULT_SERIALIZER = 'json'
-CELERY_TIMEZONE = 'UTC'
+"""
+Django settings for credit project.
+
+Generated by 'django-admin startproject' using Django 5.2.4.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/5.2/ref/settings/
+"""
+
+from pathlib import Path
+from token import NAME
+import os
+import sys
+from decouple import config, Csv
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = 'django-insecure-*fu9plot*nziq&qgxn(@u+f9lgp76clxhbd9+ikx!#!3zbg!mb'
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = True
+
+ALLOWED_HOSTS = []
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'core',
+    'rest_framework',
+]
+
+MIDDLEWARE = [
+    'core.middleware.SamplingProfilerMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ReplicaPinningMiddleware',
+]
+
+ROOT_URLCONF = 'credit.urls'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'credit.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+
+DATABASES = {
+    'default': {
+        'ENGINE':'django.db.backends.postgresql',
+        'NAME': config('DB_NAME'),
+        'USER': config('DB_USER'),
+        'PASSWORD': config('DB_PASSWORD'),
+        'HOST': config('DB_HOST'),
+        'PORT': config('DB_PORT'),
+        # Keep connections open across requests (seconds, 0 closes after each) and check them before reuse
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Optional streaming replica for read-only traffic (see core/routers.py)
+REPLICA_DB_HOST = config('REPLICA_DB_HOST', default='')
+if REPLICA_DB_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': REPLICA_DB_HOST,
+        'PORT': config('REPLICA_DB_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+READ_REPLICA_ALIAS = 'replica' if REPLICA_DB_HOST else ''
+
+# Horizontal sharding of customers and their loans (see core/sharding.py). SHARD_DATABASES lists the
+# databases after `default`, as `name` (on the default server) or `host:port/name`; they become the
+# aliases shard1, shard2, ... Changing the number of shards moves customers between databases.
+SHARD_DATABASES = config('SHARD_DATABASES', default='', cast=Csv())
+for number, target in enumerate(SHARD_DATABASES, start=1):
+    location, _, name = target.rpartition('/')
+    host, _, port = location.partition(':')
+    DATABASES[f'shard{number}'] = {
+        **DATABASES['default'],
+        'NAME': name,
+        'HOST': host or DATABASES['default']['HOST'],
+        'PORT': port or DATABASES['default']['PORT'],
+    }
+SHARDS = ['default'] + [f'shard{number}' for number in range(1, len(SHARD_DATABASES) + 1)]
+# Threads used to query the shards in parallel for portfolio-wide reads
+SHARD_MAX_WORKERS = config('SHARD_MAX_WORKERS', default=8, cast=int)
+
+DATABASE_ROUTERS = ['core.sharding.ShardRouter', 'core.routers.PrimaryReplicaRouter']
+
+# `manage.py test` adds a local replica alias mirroring `default` and, unless SHARD_DATABASES names
+# some, a second shard database on the default server, so the routing and sharding tests run against
+# real connections. Routing only uses them where a test sets READ_REPLICA_ALIAS or SHARDS=TEST_SHARDS.
+TESTING = sys.argv[1:2] == ['test']
+TEST_SHARDS = SHARDS if len(SHARDS) > 1 else ['default', 'shard1']
+if TESTING and 'replica' not in DATABASES:
+    DATABASES['replica'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+if TESTING and len(SHARDS) == 1:
+    DATABASES['shard1'] = {**DATABASES['default'], 'TEST': {'NAME': f"test_{DATABASES['default']['NAME']}_shard1"}}
+
+# Seconds a client stays on the primary after writing, and the replica lag above which reads go to the primary
+REPLICA_LAG_TOLERANCE = config('REPLICA_LAG_TOLERANCE', default=5, cast=int)
+REPLICA_LAG_CHECK_INTERVAL = config('REPLICA_LAG_CHECK_INTERVAL', default=5, cast=int)
+
+
+# Password validation
+# https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/5.2/topics/i18n/
+
+LANGUAGE_CODE = 'en-us'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/5.2/howto/static-files/
+
+STATIC_URL = '/static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# Media files
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Cache: local memory per process, or Redis shared by every worker when CACHE_URL is set
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Admission control for check-eligibility and create-loan (see core/admission.py).
+# Per-client token bucket: RATE_LIMIT_RATE requests/second sustained, RATE_LIMIT_BURST at once (rate 0 disables).
+RATE_LIMIT_RATE = config('RATE_LIMIT_RATE', default=5.0, cast=float)
+RATE_LIMIT_BURST = config('RATE_LIMIT_BURST', default=20, cast=int)
+if TESTING:
+    # Every test client shares one address and so one bucket; throttle tests set their own rate.
+    RATE_LIMIT_RATE = 0
+# Scoring requests allowed in flight (across every worker sharing the cache) before shedding with 503 (0 disables)
+SCORING_MAX_IN_FLIGHT = config('SCORING_MAX_IN_FLIGHT', default=32, cast=int)
+SCORING_RETRY_AFTER = config('SCORING_RETRY_AFTER', default=1, cast=int)
+
+# On-demand request profiling (see core/profiling.py). PROFILING_ENABLED samples every request and
+# keeps those slower than the threshold; PROFILING_ALLOW_HEADER lets a request with a signed
+# X-Profile-Token header opt in. With both off the middleware is not loaded.
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_ALLOW_HEADER = config('PROFILING_ALLOW_HEADER', default=False, cast=bool)
+PROFILING_TOKEN_MAX_AGE = config('PROFILING_TOKEN_MAX_AGE', default=3600, cast=int)
+PROFILING_THRESHOLD_MS = config('PROFILING_THRESHOLD_MS', default=500, cast=int)
+PROFILING_INTERVAL_MS = config('PROFILING_INTERVAL_MS', default=5, cast=int)
+PROFILING_DIR = config('PROFILING_DIR', default=os.path.join(BASE_DIR, 'profiles'))
+# 'collapsed' (.folded stacks for flamegraph tools) and/or 'speedscope' (.speedscope.json)
+PROFILING_FORMATS = config('PROFILING_FORMATS', default='collapsed,speedscope', cast=Csv())
+PROFILING_KEEP = config('PROFILING_KEEP', default=50, cast=int)
+
+# Response compression (see core.middleware.CompressionMiddleware): brotli when installed and
+# accepted by the client, gzip otherwise, for bodies of at least COMPRESSION_MIN_BYTES.
+COMPRESSION_MIN_BYTES = config('COMPRESSION_MIN_BYTES', default=1024, cast=int)
+BROTLI_QUALITY = config('BROTLI_QUALITY', default=4, cast=int)
+
+# Django REST framework
+# JSON goes through orjson when it is installed (see core/renderers.py); the browsable API stays available.
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Celery Configuration
+# Without CELERY_BROKER_URL tasks use the in-memory broker and run eagerly inside the calling process
+# (development and tests); point it at Redis to hand tasks to the worker pool.
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='memory://')
+CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default='cache+memory://')
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=CELERY_BROKER_URL == 'memory://', cast=bool)
+CELERY_TASK_EAGER_PROPAGATES = True
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_RESULT_SERIALIZER = 'json'
+CELERY_TIMEZONE = 'UTC'
+
+# Open database connections and warm imports and caches in CoreConfig.ready (see core/warmup.py);
+# /readyz/ reports 503 until it has finished
+WARMUP_ON_START = config('WARMUP_ON_START', default=False, cast=bool)
+
+# Idempotency-Key replay window for loan endpoints (seconds)
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=86400, cast=int)
+
+CELERY_BEAT_SCHEDULE = {
+    'purge-expired-idempotency-keys': {
+        'task': 'core.tasks.purge_expired_idempotency_keys',
+        'schedule': 3600.0,
+    },
+    'create-future-loan-partitions': {
+        'task': 'core.tasks.create_future_loan_partitions',
+        'schedule': 86400.0,
+    },
+    'archive-closed-loans': {
+        'task': 'core.tasks.archive_closed_loans',
+        'schedule': 86400.0,
+    },
+    'dispatch-outbox-events': {
+        'task': 'core.tasks.dispatch_outbox_events',
+        'schedule': config('OUTBOX_DRAIN_INTERVAL', default=5.0, cast=float),
+    },
+}
+
+# Transactional outbox for loan events (see core/outbox.py): the sink class events are delivered to
+# (core.outbox.FileSink appends JSON lines to OUTBOX_FILE; core.outbox.LocalQueueSink is an
+# in-process queue) and how many events one drain transaction sends.
+OUTBOX_SINK = config('OUTBOX_SINK', default='core.outbox.FileSink')
+OUTBOX_FILE = config('OUTBOX_FILE', default=os.path.join(BASE_DIR, 'outbox', 'events.jsonl'))
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=1000, cast=int)
+
+# Files uploaded to POST /api/ingest/ are streamed to this directory and loaded INGEST_CHUNK_SIZE rows at a time
+INGEST_UPLOAD_DIR = config('INGEST_UPLOAD_DIR', default=os.path.join(MEDIA_ROOT, 'uploads'))
+INGEST_CHUNK_SIZE = config('INGEST_CHUNK_SIZE', default=5000, cast=int)
+# CSV reports of rows rejected by ingestion validation (core/validation.py), one per file or upload
+INGEST_REJECTS_DIR = config('INGEST_REJECTS_DIR', default=os.path.join(MEDIA_ROOT, 'rejects'))
+
+# Days after the monthly due day (the loan's approval day) a repayment still counts as on time
+REPAYMENT_GRACE_DAYS = config('REPAYMENT_GRACE_DAYS', default=0, cast=int)
+
+# In-process columnar snapshot of per-customer scoring inputs (see core/snapshot.py)
+CREDIT_SNAPSHOT_ENABLED = config('CREDIT_SNAPSHOT_ENABLED', default=False, cast=bool)
+CREDIT_SNAPSHOT_MAX_AGE = config('CREDIT_SNAPSHOT_MAX_AGE', default=30, cast=int)
+# Directory of memory-mapped snapshot generations shared by all workers (written by `manage.py build_snapshot`)
+CREDIT_SNAPSHOT_PATH = config('CREDIT_SNAPSHOT_PATH', default='')
+
+# Optional PostgreSQL range partitioning of core_loan by approval_date: '' (off), 'year' or 'month'
+LOAN_PARTITION_INTERVAL = config('LOAN_PARTITION_INTERVAL', default='')
+LOAN_PARTITIONS_AHEAD = config('LOAN_PARTITIONS_AHEAD', default=2, cast=int)